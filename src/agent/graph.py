@@ -2,28 +2,53 @@ from langgraph.graph import StateGraph
 from .schema import State, AgentMode
 from src.config.manager import ConfigManager
 from langchain.chat_models import init_chat_model
-from dataclasses import asdict
+from dataclasses import asdict, replace
 from src.utils.multi_modal_utils import create_interleaved_multimodal_message, create_multimodal_message
 from src.utils.colored_logger import get_colored_logger, init_default_logger, log_agent, log_state, log_tool, log_success, log_warning, log_error, log_debug
 from langchain_core.messages import SystemMessage, HumanMessage
 from langgraph.graph import END
+from langgraph.types import StreamWriter
+import asyncio
 import base64
 import os
 from datetime import datetime
 from google import genai
+from google.genai import errors as genai_errors
 from google.genai.types import Part, GenerateContentConfig, ImageConfig, FinishReason
 from dotenv import load_dotenv
 from google.genai.types import HttpOptions
 from PIL import Image
 from src.utils.image_generation import image_generation_tool
 import json
+import re
 from pathlib import Path
+from typing import Any, Dict
 import subprocess
 import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from src.utils.material_tools import get_material_manager
+from src.utils.context_cache import get_context_cache
+from src.utils.code_workers import get_code_worker_pool
+from src.utils.execution_cache import get_execution_cache
+from src.utils.json_utils import extract_json_from_text
+from src.utils.linear_program import LinearProgram, LinearProgramError, parse_linear_program, solve_linear_program
 from .tools import create_material_tools, execute_tool_call
+from .history import ToolHistoryCompactor
 
 MAX_REFLECTIONS = 3
+# 单次 LLM 调用超时（秒），超时后取消请求
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+# 生成代码的执行超时（秒）
+CODE_EXEC_TIMEOUT = 30
+# 推测执行的候选解数量（> 1 时并发生成并执行多个候选，第一个可行的胜出）
+SOLVER_CANDIDATES = int(os.getenv("SOLVER_CANDIDATES", "1"))
+# 可识别的线性规划 / 整数线性规划在进程内直接求解，不生成代码
+SOLVER_FAST_PATH = os.getenv("SOLVER_FAST_PATH", "true").lower() not in ("0", "false", "no", "off")
+# 快速路径中模型提取问题描述的超时（秒），与代码生成并发进行，超时只放弃快速路径
+SOLVER_FAST_PATH_TIMEOUT = float(os.getenv("SOLVER_FAST_PATH_TIMEOUT", "20"))
+# 工具线程池大小（generate_diagram 只提交后台任务，不占用工具线程）
+TOOL_MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", "8"))
 config_path = Path(__file__).parent / "config.yaml"
 
 config = ConfigManager(config_path)
@@ -45,6 +70,203 @@ client = genai.Client()
 
 graph = StateGraph(State)
 
+# 线性规划快速路径：让模型输出问题描述（格式见 src/utils/linear_program.py）
+_LP_SPEC_PROMPT = """Decide whether the optimization problem below is a linear program (LP) or a mixed-integer linear program (MILP) whose numeric data is fully given, i.e. a linear objective and linear constraints with explicit coefficients.
+
+If it is NOT (nonlinear terms, missing data, or not an optimization problem), output exactly: {"linear": false}
+
+Otherwise output a JSON object:
+{"linear": true,
+ "sense": "maximize" or "minimize",
+ "objective": {"<variable>": <coefficient>, ...},
+ "objective_constant": <number, optional>,
+ "variables": [{"name": "<variable>", "lower": <number or null>, "upper": <number or null>, "integer": <true/false>}, ...],
+ "constraints": [{"name": "<short label>", "coefficients": {"<variable>": <coefficient>, ...}, "sense": "<=" or ">=" or "=", "rhs": <number>}, ...]}
+
+Declare every variable. Use null for a missing bound (so a nonnegative variable has "lower": 0). Output JSON only.
+
+Problem:
+"""
+
+# 推测执行时各候选附加的提示，与温度一起拉开候选之间的差异
+_CANDIDATE_HINTS = (
+    "",
+    "\nPrefer scipy.optimize in the Python code.",
+    "\nPrefer PuLP in the Python code.",
+    "\nPrefer CVXPY in the Python code.",
+)
+# 求解器输出中表示没有得到可行最优解的提示（scipy / PuLP / CVXPY）
+_INFEASIBLE_OUTPUT = re.compile(r"infeasible|unbounded|not solved|no feasible|optimization failed", re.IGNORECASE)
+
+_tool_executor = ThreadPoolExecutor(max_workers=TOOL_MAX_WORKERS, thread_name_prefix="tool")
+
+
+def _content_config(model_config, tools=None, system_instruction=None, cached_content=None,
+                    response_mime_type=None) -> GenerateContentConfig:
+    """构建请求配置；使用 cached content 时系统指令和工具已在缓存中，不能重复发送"""
+    if cached_content:
+        return GenerateContentConfig(
+            temperature=model_config.temperature,
+            cached_content=cached_content,
+            response_mime_type=response_mime_type
+        )
+    return GenerateContentConfig(
+        temperature=model_config.temperature,
+        system_instruction=system_instruction,
+        tools=tools,
+        response_mime_type=response_mime_type
+    )
+
+
+async def generate_content(model_config, contents, tools=None, timeout: float = LLM_TIMEOUT, response_mime_type=None):
+    """
+    异步调用 Gemini，不阻塞事件循环
+
+    超时或所在任务被取消时，进行中的请求会一并取消。
+
+    Args:
+        model_config: 模型配置（model / temperature）
+        contents: 消息列表
+        tools: 可选的工具声明
+        timeout: 超时秒数（<= 0 表示不限）
+        response_mime_type: 可选的输出格式（如 application/json）
+
+    Returns:
+        GenerateContentResponse
+
+    Raises:
+        asyncio.TimeoutError: 超时
+    """
+    request = client.aio.models.generate_content(
+        model=model_config.model,
+        contents=contents,
+        config=_content_config(model_config, tools, response_mime_type=response_mime_type)
+    )
+    return await asyncio.wait_for(request, timeout=timeout if timeout > 0 else None)
+
+
+async def stream_content(
+    model_config,
+    contents,
+    tools=None,
+    system_instruction=None,
+    cached_content=None,
+    timeout: float = LLM_TIMEOUT
+):
+    """
+    流式调用 Gemini，逐块产出 GenerateContentResponse
+
+    timeout 限制整次流式调用的总时长，超时或任务被取消时关闭流。
+    指定 cached_content 时只发送新增内容；服务端缓存已失效则回退为发送完整前缀。
+
+    Args:
+        model_config: 模型配置（model / temperature）
+        contents: 消息列表
+        tools: 可选的工具声明
+        system_instruction: 可选的系统指令
+        cached_content: 包含 system_instruction 和 tools 的服务端缓存名称
+        timeout: 超时秒数（<= 0 表示不限）
+
+    Yields:
+        GenerateContentResponse 增量块
+
+    Raises:
+        asyncio.TimeoutError: 超时
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout if timeout > 0 else None
+    
+    def remaining():
+        return None if deadline is None else max(deadline - loop.time(), 0)
+    
+    async def open_stream(cached):
+        """打开流并取出第一块：请求在第一次迭代时才发出，服务端错误（如缓存失效）在这里抛出"""
+        stream = await asyncio.wait_for(
+            client.aio.models.generate_content_stream(
+                model=model_config.model,
+                contents=contents,
+                config=_content_config(model_config, tools, system_instruction, cached)
+            ),
+            timeout=remaining()
+        )
+        iterator = stream.__aiter__()
+        try:
+            first = await asyncio.wait_for(iterator.__anext__(), timeout=remaining())
+        except StopAsyncIteration:
+            first = None
+        except BaseException:
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
+            raise
+        return iterator, first
+    
+    try:
+        iterator, first = await open_stream(cached_content)
+    except genai_errors.ClientError as e:
+        if not cached_content:
+            raise
+        log_warning(f"Cached content {cached_content} rejected, sending full prompt: {e}")
+        context_cache = get_context_cache(client)
+        if context_cache is not None:
+            context_cache.invalidate(cached_content)
+        iterator, first = await open_stream(None)
+    try:
+        if first is None:
+            return
+        yield first
+        while True:
+            try:
+                chunk = await asyncio.wait_for(iterator.__anext__(), timeout=remaining())
+            except StopAsyncIteration:
+                break
+            yield chunk
+    finally:
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
+
+
+async def stream_turn(
+    model_config,
+    contents,
+    writer: StreamWriter,
+    node: str,
+    tools=None,
+    system_instruction=None,
+    cached_content=None
+):
+    """
+    流式生成一轮回复，文本增量以 token 事件推送
+
+    Args:
+        model_config: 模型配置
+        contents: 消息列表
+        writer: LangGraph 自定义流写入器
+        node: 事件中标记的节点名
+        tools: 可选的工具声明
+        system_instruction: 可选的系统指令
+        cached_content: 可选的服务端缓存名称（见 stream_content）
+
+    Returns:
+        (完整文本, FunctionCall 列表)
+    """
+    text_parts = []
+    function_calls = []
+    
+    async for chunk in stream_content(
+        model_config, contents, tools=tools,
+        system_instruction=system_instruction, cached_content=cached_content
+    ):
+        if not chunk.candidates or not chunk.candidates[0].content:
+            continue
+        for part in chunk.candidates[0].content.parts or []:
+            if getattr(part, 'function_call', None):
+                function_calls.append(part.function_call)
+            elif getattr(part, 'text', None):
+                text_parts.append(part.text)
+                writer({"type": "token", "node": node, "text": part.text})
+    
+    return "".join(text_parts), function_calls
+
 
 async def init_context_node(state: State) -> State:
     """初始化上下文，设置默认值"""
@@ -72,7 +294,7 @@ def route_by_mode(state: State) -> str:
         return END
 
 
-async def tutor_node(state: State) -> State:
+async def tutor_node(state: State, writer: StreamWriter) -> State:
     """
     Tutor 模式：基于材料进行问答和交互式探索
     支持 PDF 检索和工具调用
@@ -99,7 +321,8 @@ async def tutor_node(state: State) -> State:
             path = Path(material)
             if path.exists():
                 try:
-                    info = material_manager.load_material(path)
+                    # 解析和 embedding 是阻塞操作，放到线程中执行
+                    info = await asyncio.to_thread(material_manager.load_material, path)
                     material_info.append(f"- {info['file_name']}: {info.get('total_pages', 1)} pages, {info['total_chunks']} chunks")
                     
                     if info.get('cached', False):
@@ -113,18 +336,17 @@ async def tutor_node(state: State) -> State:
     system_prompt = tutor_config.prompt or ""
     materials_summary = "\n".join(material_info)
     
-    initial_message = f"""
+    # 静态前缀：相同材料集合的所有提问和轮次共享，可使用服务端上下文缓存
+    static_prefix = f"""
 Available Materials:
 {materials_summary}
 
 You have access to the following tools to search and retrieve information from the materials:
-1. keyword_search: Search for specific keywords or terms
-2. semantic_search: Search for semantically related content
-3. get_page_content: Get full content of a specific page
-4. get_chunk_by_id: Get full content of a specific chunk (use the chunk_id from search results)
-
-Student Question:
-{question}
+1. hybrid_search: Keyword + semantic search in one call, results grouped by page (prefer this)
+2. keyword_search: Search for specific keywords or terms
+3. semantic_search: Search for semantically related content
+4. get_page_content: Get full content of a specific page
+5. get_chunk_by_id: Get full content of a specific chunk (use the chunk_id from search results)
 
 INSTRUCTIONS:
 - Use the tools MULTIPLE TIMES to gather comprehensive information
@@ -150,119 +372,111 @@ CITATION FORMAT (CRITICAL):
 - The search results show page numbers - use those for citations
 - Example: "根据第 5 页的内容..." NOT "根据 Chunk 13..."
 - Make your answer readable and professional for students
+"""
+    
+    initial_message = f"""
+Student Question:
+{question}
 
 Start by searching for relevant information, then continue gathering more details until you can provide a complete answer with proper page-based citations and proper Markdown/LaTeX formatting.
 """
     
     # 创建工具
     tools = create_material_tools()
+    system_instruction = system_prompt + "\n\n" + static_prefix
     
     # 调用 Gemini with tools - 连续工作模式
     try:
-        messages = [{"role": "user", "parts": [{"text": system_prompt + "\n\n" + initial_message}]}]
+        # 复用静态前缀的服务端缓存；不可用时每轮发送完整前缀
+        cached_content = None
+        context_cache = get_context_cache(client)
+        if context_cache is not None:
+            cached_content = await context_cache.get(tutor_config.model.model, system_instruction, tools)
+        
+        messages = [{"role": "user", "parts": [{"text": initial_message}]}]
         
         max_iterations = 10  # 增加最大迭代次数，允许更多工具调用
         iteration = 0
         tool_call_count = 0
+        # 工具结果去重和压缩，避免每轮提示随历史增长
+        history = ToolHistoryCompactor()
         
         while iteration < max_iterations:
             iteration += 1
             log_debug(f"Tutor iteration {iteration}/{max_iterations}")
+            writer({"type": "iteration", "node": "tutor", "iteration": iteration, "max_iterations": max_iterations})
             
-            response = client.models.generate_content(
-                model=tutor_config.model.model,
-                contents=messages,
-                config=GenerateContentConfig(
-                    temperature=tutor_config.model.temperature,
-                    tools=tools
-                )
+            result, function_calls = await stream_turn(
+                tutor_config.model, messages, writer, "tutor", tools=tools,
+                system_instruction=system_instruction, cached_content=cached_content
             )
             
-            # 检查是否有工具调用
-            if response.candidates[0].content.parts:
-                part = response.candidates[0].content.parts[0]
-                
-                # 如果有函数调用
-                if hasattr(part, 'function_call') and part.function_call:
-                    function_call = part.function_call
-                    tool_name = function_call.name
-                    tool_args = dict(function_call.args)
+            # 如果有函数调用：同一轮的所有调用并发执行，结果在一条消息中返回
+            if function_calls:
+                for function_call in function_calls:
                     tool_call_count += 1
+                    log_tool(function_call.name, f"Call #{tool_call_count} - Args: {dict(function_call.args or {})}")
+                
+                responses = await run_tool_calls(
+                    function_calls, material_manager, conversation_logger, writer, first_call=tool_call_count - len(function_calls) + 1
+                )
+                history.add(function_calls, responses)
+                
+                # 添加助手的函数调用到消息历史
+                messages.append({
+                    "role": "model",
+                    "parts": [{"function_call": function_call} for function_call in function_calls]
+                })
+                
+                # 添加函数响应，并提示继续工作
+                messages.append({
+                    "role": "user",
+                    "parts": [{"function_response": function_response} for function_response in responses]
+                })
+                
+                saved = history.compact()
+                if saved:
+                    log_debug(f"Compacted tool history, saved ~{saved} tokens ({history.stats()['history_tokens']} left)")
+                
+                log_success(f"{len(function_calls)} tool call(s) executed, continuing...")
+                
+                # 继续下一轮，让 Agent 决定是否需要更多信息
+                continue
+            
+            # 如果有文本响应
+            if result:
+                # 检查是否是中间思考（包含"让我"、"我将"等）
+                thinking_phrases = ["让我", "我将", "让我们", "首先", "接下来", "然后"]
+                is_thinking = any(phrase in result for phrase in thinking_phrases)
+                
+                # 如果是中间思考且还有工具调用次数，继续
+                if is_thinking and tool_call_count < 8 and iteration < max_iterations - 1:
+                    log_debug(f"Agent is thinking, continuing... ({result[:50]}...)")
+                    writer({"type": "thinking", "node": "tutor", "iteration": iteration})
                     
-                    log_tool(tool_name, f"Call #{tool_call_count} - Args: {tool_args}")
-                    
-                    # 执行工具（传入对话记录器）
-                    tool_result = execute_tool_call(tool_name, tool_args, material_manager, conversation_logger)
-                    
-                    # 添加助手的函数调用到消息历史
+                    # 将思考过程添加到消息历史
                     messages.append({
                         "role": "model",
-                        "parts": [{"function_call": function_call}]
+                        "parts": [{"text": result}]
                     })
                     
-                    # 添加函数响应，并提示继续工作
+                    # 提示继续工作
                     messages.append({
                         "role": "user",
-                        "parts": [{
-                            "function_response": {
-                                "name": tool_name,
-                                "response": {"result": str(tool_result)}
-                            }
-                        }]
+                        "parts": [{"text": "请继续查找信息并完成回答，不要停下来。"}]
                     })
                     
-                    log_success(f"Tool {tool_name} executed, continuing...")
-                    
-                    # 继续下一轮，让 Agent 决定是否需要更多信息
                     continue
                 
-                # 如果有文本响应
-                elif hasattr(part, 'text') and part.text:
-                    result = part.text
-                    
-                    # 检查是否是中间思考（包含"让我"、"我将"等）
-                    thinking_phrases = ["让我", "我将", "让我们", "首先", "接下来", "然后"]
-                    is_thinking = any(phrase in result for phrase in thinking_phrases)
-                    
-                    # 如果是中间思考且还有工具调用次数，继续
-                    if is_thinking and tool_call_count < 8 and iteration < max_iterations - 1:
-                        log_debug(f"Agent is thinking, continuing... ({result[:50]}...)")
-                        
-                        # 将思考过程添加到消息历史
-                        messages.append({
-                            "role": "model",
-                            "parts": [{"text": result}]
-                        })
-                        
-                        # 提示继续工作
-                        messages.append({
-                            "role": "user",
-                            "parts": [{"text": "请继续查找信息并完成回答，不要停下来。"}]
-                        })
-                        
-                        continue
-                    
-                    # 否则，这是最终答案
-                    state["result"] = result
-                    state["messages"].append({"role": "assistant", "content": result})
-                    
-                    # 收集生成的图片路径
-                    generated_images = []
-                    for msg in messages:
-                        if msg.get("role") == "user" and "function_response" in msg.get("parts", [{}])[0]:
-                            func_resp = msg["parts"][0]["function_response"]
-                            if func_resp.get("name") == "generate_diagram":
-                                result_data = func_resp.get("response", {}).get("result", {})
-                                if isinstance(result_data, dict) and result_data.get("success"):
-                                    img_path = result_data.get("image_path")
-                                    if img_path:
-                                        generated_images.append(img_path)
-                    
-                    # 记录回答
-                    conversation_logger.log_answer(result, images=generated_images)
-                    
-                    log_success(f"Tutor response generated (after {tool_call_count} tool calls)")
-                    break
+                # 否则，这是最终答案
+                state["result"] = result
+                state["messages"].append({"role": "assistant", "content": result})
+                
+                # 记录回答（后台图表完成后由记录器附加）
+                conversation_logger.log_answer(result)
+                
+                log_success(f"Tutor response generated (after {tool_call_count} tool calls)")
+                break
             
             # 如果没有更多操作，退出
             log_warning("No more actions from agent")
@@ -273,6 +487,9 @@ Start by searching for relevant information, then continue gathering more detail
             if "result" not in state:
                 state["result"] = "抱歉，处理超时。已调用工具 " + str(tool_call_count) + " 次，但未能完成回答。"
         
+    except asyncio.TimeoutError:
+        log_error(f"Tutor LLM call timed out after {LLM_TIMEOUT}s")
+        state["result"] = f"Error: LLM call timed out after {LLM_TIMEOUT}s"
     except Exception as e:
         log_error(f"Error in tutor node: {e}")
         state["result"] = f"Error: {str(e)}"
@@ -280,7 +497,61 @@ Start by searching for relevant information, then continue gathering more detail
     return state
 
 
-async def solver_node(state: State) -> State:
+async def run_tool_calls(function_calls, material_manager, conversation_logger, writer: StreamWriter, first_call: int = 1):
+    """
+    并发执行同一轮中的所有函数调用
+
+    所有调用在工具线程池中并发执行；generate_diagram 只向后台队列提交任务并返回任务句柄，
+    不会阻塞本轮。
+
+    Args:
+        function_calls: 模型返回的 FunctionCall 列表
+        material_manager: 材料管理器
+        conversation_logger: 对话记录器
+        writer: LangGraph 自定义流写入器，用于推送 tool_start / tool_end 事件
+        first_call: 第一个调用的全局序号
+
+    Returns:
+        与调用一一对应的 function_response 列表
+    """
+    loop = asyncio.get_running_loop()
+    
+    async def run(call_id, tool_name, tool_args):
+        writer({"type": "tool_start", "call": call_id, "name": tool_name, "args": tool_args})
+        started = time.perf_counter()
+        ok = False
+        try:
+            result = await loop.run_in_executor(
+                _tool_executor, execute_tool_call, tool_name, tool_args, material_manager, conversation_logger
+            )
+            ok = not (isinstance(result, dict) and result.get("success") is False)
+            return result
+        finally:
+            writer({
+                "type": "tool_end", "call": call_id, "name": tool_name,
+                "ok": ok, "elapsed": round(time.perf_counter() - started, 3)
+            })
+    
+    results = await asyncio.gather(
+        *(run(first_call + i, function_call.name, dict(function_call.args or {}))
+          for i, function_call in enumerate(function_calls)),
+        return_exceptions=True
+    )
+    
+    responses = []
+    for function_call, result in zip(function_calls, results):
+        if isinstance(result, Exception):
+            log_warning(f"Tool {function_call.name} failed: {result}")
+            result = f"工具执行失败: {result}"
+        responses.append({
+            "name": function_call.name,
+            "response": {"result": str(result)}
+        })
+    
+    return responses
+
+
+async def solver_node(state: State, writer: StreamWriter) -> State:
     """
     Solver 模式：自动求解数学优化问题
     """
@@ -317,20 +588,83 @@ Format your response as:
 [Explanation]
 """
     
+    prompt = system_prompt + "\n\n" + user_message
+    if not SOLVER_FAST_PATH:
+        return await code_solver_node(state, writer, prompt)
+    
+    spec = parse_linear_program(question)
+    if spec is not None:
+        report = await solve_fast_path(spec, "parser", writer)
+        if report is None:
+            return await code_solver_node(state, writer, prompt)
+        return apply_fast_path_report(state, report)
+    
+    # 解析器无法识别时，模型提取问题描述与代码生成并发进行，非线性问题不额外等待一次模型调用；
+    # 代码生成在状态副本上进行，事件先缓存，快速路径得到最优解时取消代码生成并丢弃其输出
+    draft = {**state, "messages": list(state["messages"])}
+    code_writer = BufferedWriter(writer)
+    fast_task = asyncio.create_task(model_fast_path(question, writer))
+    code_task = asyncio.create_task(code_solver_node(draft, code_writer, prompt))
+    try:
+        done, _ = await asyncio.wait({fast_task, code_task}, return_when=asyncio.FIRST_COMPLETED)
+        if fast_task in done:
+            if fast_task.exception() is None and fast_task.result() is not None:
+                log_agent("SOLVER", "Fast path solved the problem, cancelling code generation")
+                return apply_fast_path_report(state, fast_task.result())
+            if fast_task.exception() is not None:
+                log_warning(f"Fast path failed, using code generation: {fast_task.exception()!r}")
+        # 确定使用代码生成：推送缓存的事件，之后的事件直接推送
+        code_writer.flush()
+        draft = await code_task
+    finally:
+        for task in (fast_task, code_task):
+            task.cancel()
+        await asyncio.gather(fast_task, code_task, return_exceptions=True)
+    
+    state.update(draft)
+    return state
+
+
+class BufferedWriter:
+    """缓存事件直到 flush，之后直接转发给原写入器；用于结果可能被丢弃的并发流程"""
+    
+    def __init__(self, writer: StreamWriter):
+        self.writer = writer
+        self.events = []
+        self.buffering = True
+    
+    def __call__(self, event: Dict[str, Any]) -> None:
+        if self.buffering:
+            self.events.append(event)
+        else:
+            self.writer(event)
+    
+    def flush(self) -> None:
+        """推送缓存的事件并停止缓存"""
+        self.buffering = False
+        events, self.events = self.events, []
+        for event in events:
+            self.writer(event)
+
+
+async def code_solver_node(state: State, writer: StreamWriter, prompt: str) -> State:
+    """
+    代码生成流程：模型生成求解代码并执行（SOLVER_CANDIDATES > 1 时为推测执行）
+    """
+    # 提前启动代码执行 worker，在模型生成代码期间完成预导入
+    get_code_worker_pool()
+    
+    if SOLVER_CANDIDATES > 1:
+        return await speculative_solver_node(state, writer, prompt)
+    
     # 调用 Gemini
     try:
-        response = client.models.generate_content(
-            model=solver_config.model.model,
-            contents=[
-                {"role": "user", "parts": [{"text": system_prompt + "\n\n" + user_message}]}
-            ],
-            config=GenerateContentConfig(
-                temperature=solver_config.model.temperature
-            )
+        result, _ = await stream_turn(
+            solver_config.model,
+            [{"role": "user", "parts": [{"text": prompt}]}],
+            writer, "solver"
         )
         
-        result = response.text
-        
         # 提取代码
         code = extract_code_from_response(result)
         
@@ -342,10 +676,13 @@ Format your response as:
         
         # 如果有代码，尝试执行
         if code:
-            return await execute_code_node(state)
+            return await execute_code_node(state, writer)
         else:
             state["result"] = result
             
+    except asyncio.TimeoutError:
+        log_error(f"Solver LLM call timed out after {LLM_TIMEOUT}s")
+        state["result"] = f"Error: LLM call timed out after {LLM_TIMEOUT}s"
     except Exception as e:
         log_error(f"Error in solver node: {e}")
         state["result"] = f"Error: {str(e)}"
@@ -353,9 +690,196 @@ Format your response as:
     return state
 
 
-async def execute_code_node(state: State) -> State:
+async def model_fast_path(question: str, writer: StreamWriter) -> str | None:
+    """
+    让模型输出 JSON 问题描述后走快速路径
+
+    Returns:
+        得到最优解时返回求解报告，否则返回 None
+    """
+    spec = await extract_linear_program_spec(question)
+    if spec is None:
+        return None
+    return await solve_fast_path(spec, "model", writer)
+
+
+async def solve_fast_path(spec: Dict[str, Any], source: str, writer: StreamWriter) -> str | None:
+    """
+    线性规划快速路径：用 scipy.optimize.linprog / milp 在进程内求解问题描述
+
+    问题描述不合法或没有得到最优解时返回 None，由调用方走代码生成流程。
+
+    Args:
+        spec: 问题描述（格式见 src/utils/linear_program.py）
+        source: 问题描述来源（parser / model），随 fast_path 事件推送
+        writer: 事件写入器
+
+    Returns:
+        得到最优解时返回求解报告（模型、最优值和变量取值），否则返回 None
+    """
+    try:
+        program = LinearProgram.from_spec(spec)
+        solution = await asyncio.to_thread(solve_linear_program, program)
+    except (LinearProgramError, ValueError) as e:
+        log_warning(f"Invalid linear program spec from {source}, falling back to code generation: {e}")
+        return None
+    
+    writer({"type": "fast_path", "node": "solver", "source": source, "status": solution.status})
+    if not solution.optimal:
+        # 问题描述可能有误，交给代码生成流程复核
+        log_warning(f"Fast path returned {solution.status}, falling back to code generation")
+        return None
+    
+    log_success(f"Solved as {'MILP' if program.is_integer else 'LP'} in {solution.solve_time * 1000:.1f} ms")
+    
+    constraint_count = program.A_ub.shape[0] + program.A_eq.shape[0]
+    integer_variables = {name for name, integer in zip(program.variables, program.integrality) if integer}
+    values = "\n".join(
+        f"{name} = {round(value) if name in integer_variables else value:.6g}"
+        for name, value in solution.values.items()
+    )
+    return f"""## Problem Analysis
+{'Mixed-integer linear program (MILP)' if program.is_integer else 'Linear program (LP)'} with {len(program.variables)} variable(s) and {constraint_count} constraint(s), solved directly with HiGHS ({'scipy.optimize.milp' if program.is_integer else 'scipy.optimize.linprog'}).
+
+## Mathematical Formulation
+```
+{program.describe()}
+```
+
+## Solution
+Optimal objective value: {solution.objective:.6g}
+
+```
+{values}
+```
+
+Solve time: {solution.solve_time * 1000:.1f} ms"""
+
+
+def apply_fast_path_report(state: State, report: str) -> State:
+    """把快速路径的求解报告写入状态"""
+    state["solution_steps"] = [report]
+    state["messages"].append({"role": "assistant", "content": report})
+    state["result"] = report
+    return state
+
+
+async def extract_linear_program_spec(question: str) -> Dict[str, Any] | None:
+    """
+    让模型判断问题是否为数据完整的线性规划，是则输出 JSON 问题描述
+
+    Returns:
+        问题描述字典；不是线性规划或调用失败时返回 None
+    """
+    try:
+        response = await generate_content(
+            replace(solver_config.model, temperature=0),
+            [{"role": "user", "parts": [{"text": _LP_SPEC_PROMPT + question}]}],
+            timeout=SOLVER_FAST_PATH_TIMEOUT,
+            response_mime_type="application/json"
+        )
+        spec = extract_json_from_text(response.text or "")
+    except asyncio.TimeoutError:
+        log_warning(f"Linear program spec extraction timed out after {SOLVER_FAST_PATH_TIMEOUT}s")
+        return None
+    except Exception as e:
+        log_warning(f"Linear program spec extraction failed: {e}")
+        return None
+    
+    if not isinstance(spec, dict) or not spec.get("linear"):
+        return None
+    return spec
+
+
+async def speculative_solver_node(state: State, writer: StreamWriter, prompt: str) -> State:
+    """
+    推测执行：并发生成 SOLVER_CANDIDATES 个候选解（不同温度和提示）并各自执行代码，
+    第一个执行成功且输出看起来可行的候选胜出，其余候选的 LLM 请求和代码执行被取消；
+    全部失败时取编号最小的候选进入串行的反思修复流程
+    """
+    log_agent("SOLVER", f"Generating {SOLVER_CANDIDATES} candidate solutions in parallel")
+    
+    async def run_candidate(index: int) -> Dict[str, Any]:
+        model_config = replace(solver_config.model, temperature=round(min(solver_config.model.temperature + 0.3 * index, 1.0), 2))
+        hint = _CANDIDATE_HINTS[index % len(_CANDIDATE_HINTS)]
+        writer({"type": "candidate_start", "node": "solver", "candidate": index, "temperature": model_config.temperature})
+        
+        candidate = {"index": index, "text": "", "code": "", "result": None, "error": None}
+        try:
+            response = await generate_content(model_config, [{"role": "user", "parts": [{"text": prompt + hint}]}])
+            candidate["text"] = response.text or ""
+            candidate["code"] = extract_code_from_response(candidate["text"])
+            if candidate["code"]:
+                candidate["result"] = await run_code(candidate["code"], CODE_EXEC_TIMEOUT)
+        except asyncio.TimeoutError:
+            candidate["error"] = f"LLM call timed out after {LLM_TIMEOUT}s"
+        except Exception as e:
+            candidate["error"] = str(e)
+        
+        ok = candidate["result"] is not None and looks_feasible(candidate["result"])
+        writer({"type": "candidate_end", "node": "solver", "candidate": index, "ok": ok})
+        return candidate
+    
+    tasks = [asyncio.create_task(run_candidate(index)) for index in range(SOLVER_CANDIDATES)]
+    candidates = []
+    winner = None
+    try:
+        pending = set(tasks)
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                candidate = task.result()
+                candidates.append(candidate)
+                if winner is None and candidate["result"] is not None and looks_feasible(candidate["result"]):
+                    winner = candidate
+    finally:
+        # 取消未完成的候选：进行中的请求被取消，执行中的 worker 被终止
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    if winner is not None:
+        log_success(f"Candidate {winner['index']} produced a feasible solution")
+        state["solution_steps"] = [winner["text"]]
+        state["code"] = winner["code"]
+        state["messages"].append({"role": "assistant", "content": winner["text"]})
+        state["result"] = format_execution_result(state, winner["result"])
+        return state
+    
+    candidates.sort(key=lambda candidate: candidate["index"])
+    fallback = next((candidate for candidate in candidates if candidate["code"]), None)
+    if fallback is None:
+        errors = "; ".join(candidate["error"] for candidate in candidates if candidate["error"])
+        log_error(f"No candidate produced code: {errors}")
+        text = next((candidate["text"] for candidate in candidates if candidate["text"]), "")
+        state["result"] = text or f"Error: {errors}"
+        return state
+    
+    log_warning(f"No candidate succeeded, fixing candidate {fallback['index']}")
+    state["solution_steps"] = [fallback["text"]]
+    state["code"] = fallback["code"]
+    state["messages"].append({"role": "assistant", "content": fallback["text"]})
+    
+    result = fallback["result"]
+    if result is None:
+        error_msg = f"Execution error: {fallback['error']}"
+    elif result.returncode != 0:
+        error_msg = result.stderr
+    else:
+        error_msg = f"The code ran but its output does not show a feasible optimal solution:\n{result.stdout}"
+    
+    if state.get("reflection_count", 0) < MAX_REFLECTIONS:
+        state["reflection_count"] = state.get("reflection_count", 0) + 1
+        return await reflect_and_fix_node(state, error_msg, writer)
+    
+    state["result"] = f"Code execution failed after {MAX_REFLECTIONS} attempts:\n{error_msg}"
+    return state
+
+
+async def execute_code_node(state: State, writer: StreamWriter) -> State:
     """执行生成的代码"""
     log_agent("EXECUTOR", "Executing generated code")
+    writer({"type": "code_start", "node": "executor", "attempt": state.get("reflection_count", 0) + 1})
     
     code = state.get("code", "")
     
@@ -364,26 +888,18 @@ async def execute_code_node(state: State) -> State:
         return state
     
     try:
-        # 创建临时文件执行代码
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write(code)
-            temp_file = f.name
-        
-        # 执行代码
-        result = subprocess.run(
-            ['python', temp_file],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
+        result = await run_code(code, CODE_EXEC_TIMEOUT)
         
-        # 清理临时文件
-        os.unlink(temp_file)
+        writer({
+            "type": "code_end", "node": "executor", "ok": result.returncode == 0,
+            "cpu_time": getattr(result, "cpu_time", None),
+            "peak_rss_mb": getattr(result, "peak_rss_mb", None),
+            "cached": getattr(result, "cached", False),
+        })
         
         if result.returncode == 0:
-            execution_result = result.stdout
             log_success("Code executed successfully")
-            state["result"] = f"{state.get('solution_steps', [''])[0]}\n\n## Execution Result\n```\n{execution_result}\n```"
+            state["result"] = format_execution_result(state, result)
         else:
             error_msg = result.stderr
             log_error(f"Code execution failed: {error_msg}")
@@ -391,7 +907,7 @@ async def execute_code_node(state: State) -> State:
             # 如果执行失败且未超过反思次数，尝试修复
             if state.get("reflection_count", 0) < MAX_REFLECTIONS:
                 state["reflection_count"] = state.get("reflection_count", 0) + 1
-                return await reflect_and_fix_node(state, error_msg)
+                return await reflect_and_fix_node(state, error_msg, writer)
             else:
                 state["result"] = f"Code execution failed after {MAX_REFLECTIONS} attempts:\n{error_msg}"
                 
@@ -402,9 +918,10 @@ async def execute_code_node(state: State) -> State:
     return state
 
 
-async def reflect_and_fix_node(state: State, error_msg: str) -> State:
+async def reflect_and_fix_node(state: State, error_msg: str, writer: StreamWriter) -> State:
     """反思并修复代码错误"""
     log_agent("REFLECTOR", f"Reflecting on error (attempt {state['reflection_count']}/{MAX_REFLECTIONS})")
+    writer({"type": "reflection", "node": "reflector", "attempt": state["reflection_count"], "max_attempts": MAX_REFLECTIONS})
     
     code = state.get("code", "")
     
@@ -424,14 +941,9 @@ Please fix the code and provide only the corrected Python code without explanati
 """
     
     try:
-        response = client.models.generate_content(
-            model=executor_config.model.model,
-            contents=[
-                {"role": "user", "parts": [{"text": fix_prompt}]}
-            ],
-            config=GenerateContentConfig(
-                temperature=executor_config.model.temperature
-            )
+        response = await generate_content(
+            executor_config.model,
+            [{"role": "user", "parts": [{"text": fix_prompt}]}]
         )
         
         fixed_code = extract_code_from_response(response.text)
@@ -439,10 +951,13 @@ Please fix the code and provide only the corrected Python code without explanati
         if fixed_code:
             state["code"] = fixed_code
             log_success("Code fixed, retrying execution")
-            return await execute_code_node(state)
+            return await execute_code_node(state, writer)
         else:
             state["result"] = f"Failed to fix code: {error_msg}"
             
+    except asyncio.TimeoutError:
+        log_error(f"Reflection LLM call timed out after {LLM_TIMEOUT}s")
+        state["result"] = f"Reflection error: LLM call timed out after {LLM_TIMEOUT}s"
     except Exception as e:
         log_error(f"Error in reflection: {e}")
         state["result"] = f"Reflection error: {str(e)}"
@@ -450,6 +965,116 @@ Please fix the code and provide only the corrected Python code without explanati
     return state
 
 
+async def run_code(code: str, timeout: float) -> subprocess.CompletedProcess:
+    """
+    执行生成的代码：启用执行结果缓存时，规范化后相同的代码直接返回之前成功执行的结果；
+    否则优先使用预热的 worker 池（可启用资源限制的沙箱模式），禁用时写入临时文件并启动新的解释器
+
+    Args:
+        code: Python 源码
+        timeout: 超时秒数
+
+    Returns:
+        CompletedProcess（stdout / stderr 为文本）；worker 池返回的 ExecutionResult 还带有 CPU 时间和峰值内存
+
+    Raises:
+        subprocess.TimeoutExpired: 超时
+    """
+    pool = get_code_worker_pool()
+    cache = get_execution_cache()
+    
+    cache_key = None
+    if cache is not None:
+        # 执行方式和沙箱的资源限制会影响结果（如 MemoryError），作为键的一部分
+        context = f"worker-pool limits={pool.limits!r}" if pool is not None else "subprocess"
+        cache_key = cache.make_key(code, context)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            log_debug(f"Execution cache hit ({cache_key[:12]})")
+            return cached
+    
+    if pool is not None:
+        result = await pool.run_async(code, timeout)
+    else:
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
+            f.write(code)
+            temp_file = f.name
+        
+        try:
+            result = await run_python_file(temp_file, timeout)
+        finally:
+            os.unlink(temp_file)
+    
+    if cache is not None:
+        cache.put(cache_key, result)
+    return result
+
+
+async def run_python_file(path: str, timeout: float) -> subprocess.CompletedProcess:
+    """
+    在子进程中运行 Python 文件
+
+    超时或任务被取消时终止子进程。
+
+    Args:
+        path: 脚本路径
+        timeout: 超时秒数
+
+    Returns:
+        CompletedProcess（stdout / stderr 为文本）
+
+    Raises:
+        subprocess.TimeoutExpired: 超时
+    """
+    proc = await asyncio.create_subprocess_exec(
+        'python', path,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise subprocess.TimeoutExpired(['python', path], timeout)
+    except asyncio.CancelledError:
+        proc.kill()
+        await proc.wait()
+        raise
+    
+    return subprocess.CompletedProcess(
+        ['python', path], proc.returncode,
+        stdout.decode('utf-8', errors='replace'), stderr.decode('utf-8', errors='replace')
+    )
+
+
+def looks_feasible(result: subprocess.CompletedProcess) -> bool:
+    """执行结果是否像一个可行解：退出码为 0、有输出，且输出中没有不可行 / 无界 / 求解失败的提示"""
+    return result.returncode == 0 and bool(result.stdout.strip()) and not _INFEASIBLE_OUTPUT.search(result.stdout)
+
+
+def format_execution_result(state: State, result: subprocess.CompletedProcess) -> str:
+    """最终结果：求解步骤 + 执行输出（+ 资源使用情况）"""
+    report = f"{state.get('solution_steps', [''])[0]}\n\n## Execution Result\n```\n{result.stdout}\n```"
+    usage = format_resource_usage(result)
+    if usage:
+        log_debug(f"Code execution resources: {usage}")
+        report += f"\n\nResources: {usage}"
+    return report
+
+
+def format_resource_usage(result: subprocess.CompletedProcess) -> str:
+    """执行结果的资源使用情况（如 "CPU 0.42 s, peak RSS 85.3 MB"），没有统计信息时返回空字符串"""
+    parts = []
+    cpu_time = getattr(result, "cpu_time", None)
+    peak_rss_mb = getattr(result, "peak_rss_mb", None)
+    if cpu_time is not None:
+        parts.append(f"CPU {cpu_time:.2f} s")
+    if peak_rss_mb is not None:
+        parts.append(f"peak RSS {peak_rss_mb:.1f} MB")
+    return ", ".join(parts)
+
+
 def extract_code_from_response(text: str) -> str:
     """从响应中提取 Python 代码"""
     import re
@@ -0,0 +1,228 @@
+"""
+Tutor 工具调用历史压缩
+- 新的工具结果中已出现过的文本块 / 页面替换为引用
+- 历史工具结果超出 token 预算时，从最早的开始压缩为只保留页码和块标识的摘要
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Set
+
+# 搜索结果中每个文本块以单独一行的该标记结尾，见 tools.format_search_results / format_hybrid_results
+_CHUNK_MARK = re.compile(r"^\(内部标识: chunk_(\d+)[^)\n]*\)$", re.MULTILINE)
+# 结果的标题行："[结果 i] 第 N 页"（format_search_results）/ "[第 N 页]"（format_hybrid_results）；
+# 材料正文中以 "[" 开头的行（如引用 "[1]"、矩阵）不是标题
+_RESULT_HEADER = re.compile(r"^(?:\[结果 \d+\] 第 \d+ 页|\[第 \d+ 页\])$")
+_PAGE_REF = re.compile(r"第 (\d+) 页")
+_CJK_CHAR = re.compile(r"[㐀-鿿豈-﫿぀-ヿ가-힯]")
+
+# 只返回检索内容的工具；其他工具（如 generate_diagram）的结果不做处理
+_SEARCH_TOOLS = ("hybrid_search", "keyword_search", "semantic_search")
+# get_page_content 未找到页面时的返回值，见 tools.execute_tool_call
+_PAGE_NOT_FOUND = "页面未找到或为空"
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中日韩字符按 1 个计，其余按 4 个字符 1 个计"""
+    cjk = len(_CJK_CHAR.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+@dataclass
+class _Entry:
+    """一次工具调用在历史中的记录"""
+    name: str
+    args: Dict[str, Any]
+    response: Dict[str, Any]
+    turn: int
+    pages: List[int] = field(default_factory=list)
+    chunk_ids: List[int] = field(default_factory=list)
+    tokens: int = 0
+    compacted: bool = False
+
+
+class ToolHistoryCompactor:
+    """tutor 循环中的工具结果去重与压缩"""
+
+    def __init__(self, token_budget: int | None = None, keep_recent_turns: int = 1):
+        """
+        初始化压缩器
+
+        Args:
+            token_budget: 历史工具结果的 token 预算（None 则读取 TUTOR_HISTORY_TOKEN_BUDGET，默认 8000）
+            keep_recent_turns: 最近几轮的结果始终保留原文
+        """
+        if token_budget is None:
+            token_budget = int(os.getenv("TUTOR_HISTORY_TOKEN_BUDGET", "8000"))
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+
+        self.entries: List[_Entry] = []
+        self.turn = 0
+        self.deduplicated_tokens = 0
+        self.compacted_tokens = 0
+
+        # 已在历史中出现过的内容：搜索预览过的块、完整获取过的块和页面
+        self._previewed_chunks: Set[int] = set()
+        self._full_chunks: Set[int] = set()
+        self._full_pages: Set[int] = set()
+
+    def add(self, function_calls, responses: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        登记一轮工具调用的结果，并就地去除重复内容
+
+        Args:
+            function_calls: 本轮的 FunctionCall 列表
+            responses: 与调用一一对应的 function_response 字典（会被就地修改）
+
+        Returns:
+            responses
+        """
+        self.turn += 1
+
+        for function_call, response in zip(function_calls, responses):
+            args = dict(function_call.args or {})
+            result = response["response"]["result"]
+            deduped = self._deduplicate(function_call.name, args, result)
+            if deduped != result:
+                self.deduplicated_tokens += estimate_tokens(result) - estimate_tokens(deduped)
+                response["response"]["result"] = deduped
+
+            entry = _Entry(name=function_call.name, args=args, response=response, turn=self.turn)
+            entry.pages = self._pages_of(function_call.name, args, deduped)
+            entry.chunk_ids = [int(chunk_id) for chunk_id in _CHUNK_MARK.findall(deduped)]
+            if function_call.name == "get_chunk_by_id" and args.get("chunk_id") is not None:
+                entry.chunk_ids.append(int(args["chunk_id"]))
+            entry.tokens = estimate_tokens(deduped)
+            self.entries.append(entry)
+
+        return responses
+
+    def _deduplicate(self, name: str, args: Dict[str, Any], result: str) -> str:
+        """把已经出现过的内容替换为引用，并记录新出现的内容"""
+        if name in _SEARCH_TOOLS:
+            return self._deduplicate_search(result)
+
+        if name == "get_chunk_by_id" and args.get("chunk_id") is not None:
+            chunk_id = int(args["chunk_id"])
+            page = _PAGE_REF.match(result)
+            if page is None:
+                # 未找到该块
+                return result
+            if chunk_id in self._full_chunks:
+                return f"第 {page.group(1)} 页的 chunk_{chunk_id} 的完整内容已在之前的结果中给出，请直接参考。"
+            self._full_chunks.add(chunk_id)
+
+        elif name == "get_page_content" and args.get("page_num") is not None:
+            page_num = int(args["page_num"])
+            if result == _PAGE_NOT_FOUND:
+                return result
+            if page_num in self._full_pages:
+                return f"第 {page_num} 页的完整内容已在之前的结果中给出，请直接参考。"
+            self._full_pages.add(page_num)
+
+        return result
+
+    def _deduplicate_search(self, result: str) -> str:
+        """逐块检查搜索结果，已预览或已完整获取过的块只保留标题行和引用"""
+        parts = []
+        start = 0
+        for match in _CHUNK_MARK.finditer(result):
+            segment = result[start:match.end()]
+            start = match.end()
+            chunk_id = int(match.group(1))
+
+            if chunk_id in self._previewed_chunks or chunk_id in self._full_chunks:
+                # 保留 "[结果 i] 第 N 页" / "[第 N 页]" 这类标题行，页码引用不丢失
+                lead = segment[:len(segment) - len(segment.lstrip("\n"))]
+                headers = [line for line in segment.splitlines() if _RESULT_HEADER.match(line)]
+                segment = lead + "\n".join(headers + [f"(chunk_{chunk_id} 已在之前的结果中出现，内容省略)"])
+            else:
+                self._previewed_chunks.add(chunk_id)
+            parts.append(segment)
+
+        parts.append(result[start:])
+        return "".join(parts)
+
+    @staticmethod
+    def _pages_of(name: str, args: Dict[str, Any], result: str) -> List[int]:
+        """结果涉及的页码（按出现顺序去重）；只看工具输出的标题，不看材料正文中提到的页码"""
+        pages = []
+        if name in _SEARCH_TOOLS:
+            pages = [int(_PAGE_REF.search(line).group(1)) for line in result.splitlines() if _RESULT_HEADER.match(line)]
+        elif name == "get_chunk_by_id":
+            # "第 N 页的内容：..."
+            page = _PAGE_REF.match(result)
+            pages = [int(page.group(1))] if page else []
+        elif name == "get_page_content" and args.get("page_num") is not None:
+            pages = [int(args["page_num"])]
+        return list(dict.fromkeys(pages))
+
+    def compact(self) -> int:
+        """
+        历史超出预算时，从最早的结果开始压缩为摘要
+
+        最近 keep_recent_turns 轮的结果不压缩。
+
+        Returns:
+            本次节省的估算 token 数
+        """
+        total = sum(entry.tokens for entry in self.entries)
+        saved = 0
+
+        for entry in self.entries:
+            if total <= self.token_budget:
+                break
+            if entry.compacted or entry.turn > self.turn - self.keep_recent_turns:
+                continue
+
+            summary = self._summarize(entry)
+            tokens = estimate_tokens(summary)
+            if tokens >= entry.tokens:
+                continue
+
+            entry.response["response"]["result"] = summary
+            entry.compacted = True
+            self._forget(entry)
+            total -= entry.tokens - tokens
+            saved += entry.tokens - tokens
+            entry.tokens = tokens
+
+        self.compacted_tokens += saved
+        return saved
+
+    def _forget(self, entry: _Entry) -> None:
+        """压缩后原文不再在历史中，之后再出现时不再去重"""
+        if entry.name in _SEARCH_TOOLS:
+            self._previewed_chunks.difference_update(entry.chunk_ids)
+        elif entry.name == "get_chunk_by_id":
+            self._full_chunks.difference_update(entry.chunk_ids)
+        elif entry.name == "get_page_content":
+            self._full_pages.difference_update(entry.pages[:1])
+
+    @staticmethod
+    def _summarize(entry: _Entry) -> str:
+        """只保留调用参数、页码和块标识的摘要，模型仍可据此引用页码或重新获取原文"""
+        args = ", ".join(f"{key}={value!r}" for key, value in entry.args.items())
+        lines = [f"[已压缩的早期结果] {entry.name}({args})"]
+        if entry.pages:
+            lines.append("涉及页面：" + "、".join(f"第 {page} 页" for page in entry.pages))
+        if entry.chunk_ids:
+            lines.append("涉及文本块：" + ", ".join(f"chunk_{chunk_id}" for chunk_id in dict.fromkeys(entry.chunk_ids)))
+        lines.append("如需原文，请用 get_chunk_by_id / get_page_content 重新获取。")
+        return "\n".join(lines)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        获取压缩统计信息
+
+        Returns:
+            包含 entries / history_tokens / deduplicated_tokens / compacted_tokens 的字典
+        """
+        return {
+            "entries": len(self.entries),
+            "history_tokens": sum(entry.tokens for entry in self.entries),
+            "deduplicated_tokens": self.deduplicated_tokens,
+            "compacted_tokens": self.compacted_tokens,
+        }
@@ -7,6 +7,7 @@ Math Agent 主入口
 
 import asyncio
 from pathlib import Path
+from typing import Any, AsyncIterator, Dict
 from .graph import app
 from .schema import AgentMode, State
 from src.utils.colored_logger import get_colored_logger, log_success, log_error
@@ -70,6 +71,99 @@ async def run_solver(problem: str) -> dict:
         }
 
 
+async def _stream_graph(initial_state: State) -> AsyncIterator[Dict[str, Any]]:
+    """
+    流式运行图，产出节点推送的自定义事件，最后产出 {"type": "result", "state": 最终状态}
+    """
+    final_state: Dict[str, Any] = {}
+    async for mode, chunk in app.astream(initial_state, stream_mode=["custom", "values"]):
+        if mode == "custom":
+            yield chunk
+        else:
+            final_state = chunk
+    yield {"type": "result", "state": final_state}
+
+
+async def stream_tutor(question: str, materials: list[str | Path]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    流式运行 Tutor 模式
+    
+    事件类型：
+    - iteration: 开始第 N 轮模型调用（iteration / max_iterations）
+    - token: 模型输出的文本增量（text）
+    - thinking: 本轮文本是中间思考，不是最终回答
+    - tool_start / tool_end: 工具调用开始 / 结束（call / name / args 或 ok / elapsed）
+    - result: 最终回答（result），总是最后一个事件
+    
+    Args:
+        question: 学生的问题
+        materials: 学习材料路径列表
+    
+    Yields:
+        事件字典
+    """
+    initial_state: State = {
+        "mode": AgentMode.TUTOR,
+        "question": question,
+        "materials": materials
+    }
+    
+    try:
+        async for event in _stream_graph(initial_state):
+            if event["type"] == "result":
+                yield {"type": "result", "result": event["state"].get("result", "No response generated")}
+            else:
+                yield event
+    except Exception as e:
+        log_error(f"Error in tutor mode: {e}")
+        yield {"type": "result", "result": f"Error: {str(e)}"}
+
+
+async def stream_solver(problem: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    流式运行 Solver 模式
+    
+    事件类型：
+    - token: 模型输出的文本增量（text）
+    - fast_path: 线性规划快速路径的求解结果（source / status）
+    - candidate_start / candidate_end: 推测执行模式下候选解开始 / 结束（candidate 和 temperature 或 ok）
+    - code_start / code_end: 代码执行开始 / 结束（attempt 或 ok / cpu_time / peak_rss_mb / cached）
+    - reflection: 执行失败后开始第 N 次修复（attempt / max_attempts）
+    - result: 与 run_solver 返回值相同的字典（solution / code / steps），总是最后一个事件
+    
+    Args:
+        problem: 优化问题描述
+    
+    Yields:
+        事件字典
+    """
+    initial_state: State = {
+        "mode": AgentMode.SOLVER,
+        "question": problem
+    }
+    
+    try:
+        async for event in _stream_graph(initial_state):
+            if event["type"] == "result":
+                state = event["state"]
+                yield {
+                    "type": "result",
+                    "solution": state.get("result", "No solution generated"),
+                    "code": state.get("code", ""),
+                    "steps": state.get("solution_steps", [])
+                }
+            else:
+                yield event
+    except Exception as e:
+        log_error(f"Error in solver mode: {e}")
+        yield {
+            "type": "result",
+            "solution": f"Error: {str(e)}",
+            "code": "",
+            "steps": []
+        }
+
+
 async def interactive_tutor(materials: list[str | Path]):
     """交互式 Tutor 模式"""
     from src.utils.conversation_logger import get_conversation_logger, reset_conversation_logger
@@ -90,6 +184,13 @@ async def interactive_tutor(materials: list[str | Path]):
         question = input("Your question: ").strip()
         
         if question.lower() in ['exit', 'quit', 'q']:
+            # 等待仍在后台生成的图表，保证它们写入对话记录
+            from src.utils.diagram_jobs import get_diagram_queue
+            diagram_queue = get_diagram_queue()
+            if not diagram_queue.wait(logger_instance.session_id, timeout=0):
+                print("Waiting for diagrams still being generated...")
+                await asyncio.to_thread(diagram_queue.wait, logger_instance.session_id, 120)
+            
             # 显示会话摘要
             summary = logger_instance.get_session_summary()
             print("\n" + "=" * 60)
@@ -97,6 +198,8 @@ async def interactive_tutor(materials: list[str | Path]):
             print("=" * 60)
             print(f"Total Q&A exchanges: {summary['total_exchanges']}")
             print(f"Total images generated: {summary['total_images']}")
+            print(f"Tool calls: {summary['tool_calls']} "
+                  f"(cache hits: {summary['tool_cache_hits']}, misses: {summary['tool_cache_misses']})")
             print(f"Conversation saved to: {summary['markdown_file']}")
             print(f"Session directory: {summary['session_dir']}")
             
@@ -119,8 +222,24 @@ async def interactive_tutor(materials: list[str | Path]):
             continue
         
         print("\n🤔 Thinking...\n")
-        answer = await run_tutor(question, materials)
-        print(f"📚 Tutor: {answer}\n")
+        # 边生成边输出；中间思考和最终回答都会实时显示
+        streamed = ""
+        async for event in stream_tutor(question, materials):
+            if event["type"] == "iteration":
+                streamed = ""
+            elif event["type"] == "token":
+                if not streamed:
+                    print("📚 Tutor: ", end="", flush=True)
+                streamed += event["text"]
+                print(event["text"], end="", flush=True)
+            elif event["type"] == "thinking":
+                print("\n")
+            elif event["type"] == "tool_start":
+                print(f"🔧 {event['name']} ...", flush=True)
+            elif event["type"] == "result" and event["result"] != streamed:
+                # 出错等情况下最终结果不是流式输出的文本
+                print(f"📚 Tutor: {event['result']}", end="")
+        print("\n")
         print("-" * 60 + "\n")
 
 
@@ -144,11 +263,23 @@ async def interactive_solver():
             continue
         
         print("\n🔍 Analyzing problem...\n")
-        result = await run_solver(problem)
-        
         print("=" * 60)
-        print(result["solution"])
-        print("=" * 60 + "\n")
+        streamed = ""
+        async for event in stream_solver(problem):
+            if event["type"] == "token":
+                streamed += event["text"]
+                print(event["text"], end="", flush=True)
+            elif event["type"] == "candidate_end":
+                print(f"{'✅' if event['ok'] else '❌'} Candidate {event['candidate']} finished", flush=True)
+            elif event["type"] == "code_start":
+                print(f"\n\n▶️  Executing code (attempt {event['attempt']})...", flush=True)
+            elif event["type"] == "reflection":
+                print(f"🔁 Fixing code ({event['attempt']}/{event['max_attempts']})...", flush=True)
+            elif event["type"] == "result":
+                # 最终结果包含执行输出，只补打流式文本之后的部分
+                solution = event["solution"]
+                print(solution[len(streamed):] if solution.startswith(streamed) else "\n\n" + solution, end="")
+        print("\n" + "=" * 60 + "\n")
 
 
 if __name__ == "__main__":
@@ -3,7 +3,12 @@ Agent 工具定义
 为 Gemini 提供可调用的工具
 """
 
-from typing import List, Dict, Any
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import List, Dict, Any, Hashable, Optional, Tuple
 from google.genai.types import Tool, FunctionDeclaration
 
 
@@ -51,6 +56,26 @@ def create_material_tools() -> List[Tool]:
         }
     )
     
+    hybrid_search_tool = FunctionDeclaration(
+        name="hybrid_search",
+        description="混合检索：一次调用同时完成关键词搜索和语义搜索，合并去重后按页分组返回。通常应优先使用此工具，而不是分别调用 keyword_search 和 semantic_search。",
+        parameters={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "搜索查询，可以是关键词、短语或对所需内容的描述"
+                },
+                "top_k": {
+                    "type": "integer",
+                    "description": "返回的文本块数量，默认为 5",
+                    "default": 5
+                }
+            },
+            "required": ["query"]
+        }
+    )
+    
     get_page_content_tool = FunctionDeclaration(
         name="get_page_content",
         description="获取材料中指定页面的完整内容。当你知道信息在哪一页时使用。",
@@ -103,6 +128,7 @@ def create_material_tools() -> List[Tool]:
     
     return [
         Tool(function_declarations=[
+            hybrid_search_tool,
             keyword_search_tool,
             semantic_search_tool,
             get_page_content_tool,
@@ -112,10 +138,158 @@ def create_material_tools() -> List[Tool]:
     ]
 
 
+# 结果只取决于材料和参数、可以缓存的工具，及其参数默认值
+_CACHEABLE_TOOL_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    "keyword_search": {"top_k": 3},
+    "semantic_search": {"top_k": 3},
+    "hybrid_search": {"top_k": 5},
+    "get_page_content": {},
+    "get_chunk_by_id": {},
+}
+
+
+def normalize_tool_args(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    规范化工具参数：补全默认值，整数值的浮点数转为 int，查询文本全角转半角、大小写折叠、合并空白
+    
+    Args:
+        tool_name: 工具名称
+        args: 模型给出的参数
+        
+    Returns:
+        规范化后的参数
+    """
+    normalized = dict(_CACHEABLE_TOOL_DEFAULTS.get(tool_name, {}))
+    for key, value in args.items():
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        elif key == "query" and isinstance(value, str):
+            value = re.sub(r"\s+", " ", unicodedata.normalize("NFKC", value).casefold()).strip()
+        normalized[key] = value
+    return normalized
+
+
+class ToolResultCache:
+    """工具结果的 LRU 缓存，材料版本变化时整体失效"""
+    
+    def __init__(self, max_entries: int = 256):
+        """
+        初始化工具结果缓存
+        
+        Args:
+            max_entries: 最多保留的条目数
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        
+        self._lock = threading.Lock()
+        self._version: Optional[Hashable] = None
+        self._entries: "OrderedDict[Tuple[str, Tuple], Any]" = OrderedDict()
+    
+    @staticmethod
+    def make_key(tool_name: str, args: Dict[str, Any]) -> Tuple[str, Tuple]:
+        """由工具名和规范化参数构造缓存键"""
+        return tool_name, tuple(sorted((key, repr(value)) for key, value in args.items()))
+    
+    def get(self, version: Hashable, key: Tuple[str, Tuple]) -> Tuple[bool, Any]:
+        """
+        查询缓存
+        
+        Args:
+            version: 当前材料版本
+            key: make_key 构造的键
+            
+        Returns:
+            (是否命中, 结果)
+        """
+        with self._lock:
+            if version != self._version:
+                # 材料重新加载或切换后，旧结果全部失效
+                self._entries.clear()
+                self._version = version
+            
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            
+            self.misses += 1
+            return False, None
+    
+    def put(self, version: Hashable, key: Tuple[str, Tuple], result: Any) -> None:
+        """
+        写入缓存（版本已变化时丢弃）
+        
+        Args:
+            version: 计算结果时的材料版本
+            key: make_key 构造的键
+            result: 工具结果
+        """
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def stats(self) -> Dict[str, float]:
+        """
+        获取缓存统计信息
+        
+        Returns:
+            包含 hits / misses / hit_rate / entries 的字典
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+    
+    def clear(self) -> None:
+        """清空条目和统计"""
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+            self.hits = 0
+            self.misses = 0
+
+
+# 全局工具结果缓存实例
+_tool_result_cache: Optional[ToolResultCache] = None
+
+
+def get_tool_result_cache() -> Optional[ToolResultCache]:
+    """
+    获取全局工具结果缓存实例
+    
+    通过环境变量配置：
+    - TOOL_CACHE_SIZE: 条目上限（默认 256，0 表示禁用）
+    
+    Returns:
+        ToolResultCache 实例，禁用时返回 None
+    """
+    global _tool_result_cache
+    
+    max_entries = int(os.getenv("TOOL_CACHE_SIZE", "256"))
+    if max_entries <= 0:
+        return None
+    
+    if _tool_result_cache is None:
+        _tool_result_cache = ToolResultCache(max_entries=max_entries)
+    return _tool_result_cache
+
+
 def execute_tool_call(tool_name: str, args: Dict[str, Any], material_manager, conversation_logger=None) -> Any:
     """
     执行工具调用
     
+    检索类工具的结果按 (材料管理器, 材料版本, 工具, 规范化参数) 缓存；命中情况记录到对话记录器。
+    
     Args:
         tool_name: 工具名称
         args: 工具参数
@@ -125,6 +299,31 @@ def execute_tool_call(tool_name: str, args: Dict[str, Any], material_manager, co
     Returns:
         工具执行结果
     """
+    cache = get_tool_result_cache()
+    if cache is None or tool_name not in _CACHEABLE_TOOL_DEFAULTS:
+        if conversation_logger:
+            conversation_logger.record_tool_call(tool_name)
+        return _run_tool(tool_name, args, material_manager, conversation_logger)
+    
+    # 规范化参数只用于缓存键，工具本身收到模型给出的原始参数（如区分大小写的关键词）
+    key = ToolResultCache.make_key(tool_name, normalize_tool_args(tool_name, args))
+    # 未指定 material_key 的工具作用于当前材料，当前材料也是版本的一部分；
+    # 用管理器的实例标识而不是 id()，已回收对象的 id 可能被新的管理器复用
+    version = (material_manager.instance_id, material_manager.version, material_manager.current_material)
+    
+    hit, result = cache.get(version, key)
+    if conversation_logger:
+        conversation_logger.record_tool_call(tool_name, cached=hit)
+    if hit:
+        return result
+    
+    result = _run_tool(tool_name, args, material_manager, conversation_logger)
+    cache.put(version, key, result)
+    return result
+
+
+def _run_tool(tool_name: str, args: Dict[str, Any], material_manager, conversation_logger=None) -> Any:
+    """执行工具调用（不经过缓存）"""
     if tool_name == "keyword_search":
         results = material_manager.keyword_search(
             query=args.get("query"),
@@ -139,6 +338,13 @@ def execute_tool_call(tool_name: str, args: Dict[str, Any], material_manager, co
         )
         return format_search_results(results)
     
+    elif tool_name == "hybrid_search":
+        results = material_manager.hybrid_search(
+            query=args.get("query"),
+            top_k=args.get("top_k", 5)
+        )
+        return format_hybrid_results(results)
+    
     elif tool_name == "get_page_content":
         content = material_manager.get_page_content(
             page_num=args.get("page_num")
@@ -155,8 +361,7 @@ def execute_tool_call(tool_name: str, args: Dict[str, Any], material_manager, co
             return "未找到指定的文本块"
     
     elif tool_name == "generate_diagram":
-        from src.utils.image_generation import image_generation_tool
-        import os
+        from src.utils.diagram_jobs import DiagramQuotaExceeded, get_diagram_queue
         
         description = args.get("description", "")
         diagram_type = args.get("diagram_type", "diagram")
@@ -165,36 +370,30 @@ def execute_tool_call(tool_name: str, args: Dict[str, Any], material_manager, co
         prompt = f"Create a clear and educational {diagram_type} that illustrates: {description}. "
         prompt += "Use clear labels, annotations, and visual elements. Make it suitable for teaching and learning."
         
+        if not conversation_logger:
+            return {
+                "success": False,
+                "message": "图表未生成（没有会话记录器，无法保存）",
+                "description": description
+            }
+        
+        # 提交到后台队列，立即返回任务句柄；图片完成后由对话记录器附加到回答
         try:
-            # 使用配置的模型生成图片
-            model = os.getenv("IMAGE_GEN_MODEL", "gemini-2.5-flash-image")
-            image = image_generation_tool(
-                text_prompt=prompt,
-                image_paths=[],
-                model=model
-            )
-            
-            # 保存图片
-            if conversation_logger:
-                image_path = conversation_logger.save_image(image, description=diagram_type)
-                return {
-                    "success": True,
-                    "message": f"图表已生成并保存",
-                    "image_path": image_path,
-                    "description": description
-                }
-            else:
-                return {
-                    "success": True,
-                    "message": "图表已生成（未保存，因为没有会话记录器）",
-                    "description": description
-                }
-        except Exception as e:
+            job = get_diagram_queue().submit(prompt, diagram_type, conversation_logger)
+        except DiagramQuotaExceeded:
             return {
                 "success": False,
-                "message": f"图表生成失败: {str(e)}",
+                "message": "本次会话生成的图表数量已达上限，请用文字说明",
                 "description": description
             }
+        
+        return {
+            "success": True,
+            "job_id": job.job_id,
+            "status": job.status,
+            "message": "图表已加入后台生成队列，完成后会自动附在回答中",
+            "description": description
+        }
     
     else:
         return f"未知工具: {tool_name}"
@@ -214,3 +413,22 @@ def format_search_results(results: List[Dict[str, Any]]) -> str:
         )
     
     return "\n".join(formatted)
+
+
+
+def format_hybrid_results(page_groups: List[Dict[str, Any]]) -> str:
+    """格式化按页分组的混合检索结果"""
+    if not page_groups:
+        return "未找到相关内容"
+    
+    formatted = []
+    for group in page_groups:
+        lines = [f"[第 {group['page_num']} 页]"]
+        for chunk in group["chunks"]:
+            lines.append(
+                f"{chunk['preview']}\n"
+                f"(内部标识: chunk_{chunk['chunk_id']}，匹配方式: {'+'.join(chunk['sources'])})"
+            )
+        formatted.append("\n".join(lines) + "\n")
+    
+    return "\n".join(formatted)
@@ -0,0 +1,143 @@
+"""
+后端客户端注册表
+按配置懒加载并复用 genai / OpenAI / Ark 客户端和带连接池的 requests.Session，
+连续调用时跳过客户端构造和 TLS 握手；获取函数可在任意线程调用。
+requests.Session 不保证线程安全（cookie 和连接适配器状态），因此每个线程各用一个
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, List
+
+_clients: Dict[Hashable, Any] = {}
+_clients_lock = threading.Lock()
+# 每个线程自己的 requests.Session；另外登记一份，供 close_clients 关闭
+_thread_local = threading.local()
+_http_sessions: List[Any] = []
+# close_clients 后递增，各线程发现代数变化时重新创建 Session
+_http_generation = 0
+
+
+def _get_or_create(key: Hashable, factory: Callable[[], Any]) -> Any:
+    """返回 key 对应的客户端，不存在时在锁内创建（双重检查，命中时不加锁）"""
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = factory()
+                _clients[key] = client
+    return client
+
+
+def get_http_session():
+    """
+    获取当前线程的 requests.Session（HTTP keep-alive 连接池）
+
+    同一线程（如图片生成线程池、图表生成线程中的某个线程）的连续请求复用连接；
+    不同线程使用各自的 Session，不共享 cookie 和连接池状态。
+
+    通过环境变量配置：
+    - HTTP_POOL_SIZE: 每个 Session 缓存连接的主机数和每个主机的最大连接数（默认 16）
+
+    Returns:
+        requests.Session 实例
+    """
+    session = getattr(_thread_local, "http_session", None)
+    if session is None or _thread_local.generation != _http_generation:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        pool_size = int(os.getenv("HTTP_POOL_SIZE", "16"))
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        with _clients_lock:
+            _http_sessions.append(session)
+            _thread_local.http_session = session
+            _thread_local.generation = _http_generation
+    return session
+
+
+def get_genai_client(vertexai: bool = False):
+    """
+    获取共享的 genai.Client
+
+    Args:
+        vertexai: 是否使用 Vertex AI（v1 API）
+
+    Returns:
+        genai.Client 实例
+    """
+    def create():
+        from google import genai
+        from google.genai.types import HttpOptions
+
+        if vertexai:
+            return genai.Client(http_options=HttpOptions(api_version="v1"))
+        return genai.Client()
+
+    return _get_or_create(("genai", vertexai), create)
+
+
+def get_openai_client(base_url: str, api_key: str, api_version: str):
+    """
+    获取共享的 OpenAI 客户端（内部的 httpx 连接池随客户端复用）
+
+    Args:
+        base_url: API 地址
+        api_key: API key
+        api_version: 通过 api_version 请求头传递的版本
+
+    Returns:
+        openai.OpenAI 实例
+    """
+    def create():
+        from openai import OpenAI
+
+        return OpenAI(
+            base_url=base_url,
+            api_key=api_key,
+            default_headers={"api_version": api_version}
+        )
+
+    return _get_or_create(("openai", base_url, api_key, api_version), create)
+
+
+def get_ark_client(base_url: str, api_key: str):
+    """
+    获取共享的火山引擎 Ark 客户端
+
+    Args:
+        base_url: API 地址
+        api_key: API key
+
+    Returns:
+        volcenginesdkarkruntime.Ark 实例
+    """
+    def create():
+        from volcenginesdkarkruntime import Ark
+
+        return Ark(base_url=base_url, api_key=api_key)
+
+    return _get_or_create(("ark", base_url, api_key), create)
+
+
+def close_clients() -> None:
+    """关闭并移除所有已创建的客户端（例如进程退出前或切换凭据后）"""
+    global _http_generation
+
+    with _clients_lock:
+        clients = list(_clients.values()) + _http_sessions
+        _clients.clear()
+        _http_sessions.clear()
+        _http_generation += 1
+
+    for client in clients:
+        close = getattr(client, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception:
+                pass
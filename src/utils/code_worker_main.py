@@ -0,0 +1,263 @@
+"""
+代码执行 worker 进程入口
+由 code_workers.CodeWorkerPool 以独立解释器启动（不导入 src 包），启动时预导入求解常用的库，
+之后循环接收代码并在全新的命名空间中执行
+
+用法: python code_worker_main.py <工作目录> [预导入模块 ...]
+
+协议：stdin / stdout 上收发 4 字节长度前缀的 JSON 消息
+- 启动完成：{"ready": true, "preloaded": [...]}
+- 请求：{"code": "...", "limits": {...} | null}
+- 响应：{"returncode": int, "cpu_time": float, "peak_rss_mb": float | null}，
+  stdout / stderr 写在工作目录的 stdout.txt / stderr.txt 中，worker 崩溃时父进程仍可从文件中读到已输出的内容
+
+每次执行都 fork 出子进程：子进程继承已预导入的模块，代码对模块全局状态（如 numpy.pi = 4）的修改
+随子进程退出而丢弃，不影响后续执行；退出后由 worker 统计其 CPU 时间和峰值内存。
+请求带 limits 时为沙箱模式：子进程另外设置资源限制、切换到独立的临时工作目录后执行
+"""
+
+import builtins
+import importlib
+import json
+import linecache
+import os
+import shutil
+import signal
+import struct
+import sys
+import tempfile
+import traceback
+
+# 代码在 traceback 中显示的文件名
+CODE_FILENAME = "<solver>"
+# limits 中的键 → (resource 常量名, 换算到 setrlimit 单位的倍数)
+_LIMITS = {
+    "memory_mb": ("RLIMIT_AS", 1024 * 1024),
+    "cpu_seconds": ("RLIMIT_CPU", 1),
+    "open_files": ("RLIMIT_NOFILE", 1),
+    "processes": ("RLIMIT_NPROC", 1),  # 余量：在用户当前进程 / 线程数之上还能新建多少
+}
+
+
+def _send(fd: int, message: dict) -> None:
+    data = json.dumps(message).encode("utf-8")
+    data = struct.pack(">I", len(data)) + data
+    while data:
+        written = os.write(fd, data)
+        data = data[written:]
+
+
+def _read_exact(fd: int, size: int) -> bytes | None:
+    chunks = []
+    while size > 0:
+        chunk = os.read(fd, size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv(fd: int) -> dict | None:
+    header = _read_exact(fd, 4)
+    if header is None:
+        return None
+    data = _read_exact(fd, struct.unpack(">I", header)[0])
+    if data is None:
+        return None
+    return json.loads(data.decode("utf-8"))
+
+
+def _exit_code(exc: SystemExit) -> int:
+    """与解释器退出时的处理一致：None 为 0，整数原样返回，其他值打印到 stderr 并返回 1"""
+    if exc.code is None:
+        return 0
+    if isinstance(exc.code, int):
+        return exc.code
+    print(exc.code, file=sys.stderr)
+    return 1
+
+
+def _execute(code: str, stdout_fd: int, stderr_fd: int) -> int:
+    """
+    在全新的 __main__ 命名空间中执行代码，输出重定向到 stdout_fd / stderr_fd
+
+    在文件描述符层面重定向，求解器子进程（如 CBC）和 C 扩展的输出也会被捕获。
+    """
+    for fd in (stdout_fd, stderr_fd):
+        os.ftruncate(fd, 0)
+        os.lseek(fd, 0, os.SEEK_SET)
+    os.dup2(stdout_fd, 1)
+    os.dup2(stderr_fd, 2)
+
+    cwd = os.getcwd()
+    saved_path = list(sys.path)
+    saved_argv = list(sys.argv)
+    sys.argv = [CODE_FILENAME]
+
+    # 注册源码，traceback 能显示出错的代码行
+    linecache.cache[CODE_FILENAME] = (len(code), None, code.splitlines(True), CODE_FILENAME)
+    namespace = {"__name__": "__main__", "__file__": CODE_FILENAME, "__builtins__": builtins}
+
+    try:
+        exec(compile(code, CODE_FILENAME, "exec"), namespace)
+        returncode = 0
+    except SystemExit as e:
+        returncode = _exit_code(e)
+    except BaseException as e:
+        # 跳过 worker 自身的栈帧，与直接运行脚本的 traceback 一致
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        returncode = 1
+    finally:
+        # 代码可能替换了 sys.stdout / sys.stderr
+        sys.stdout = sys.__stdout__
+        sys.stderr = sys.__stderr__
+        sys.stdout.flush()
+        sys.stderr.flush()
+        sys.argv = saved_argv
+        sys.path[:] = saved_path
+        os.chdir(cwd)
+        namespace.clear()
+
+    return returncode
+
+
+def _user_task_count() -> int | None:
+    """当前真实 UID 拥有的进程 + 线程总数（RLIMIT_NPROC 的计数口径），无法统计时返回 None"""
+    uid = os.getuid()
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return None
+
+    total = 0
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        owner = threads = None
+        try:
+            with open(f"/proc/{entry}/status", "r") as f:
+                for line in f:
+                    if line.startswith("Uid:"):
+                        owner = int(line.split()[1])
+                    elif line.startswith("Threads:"):
+                        threads = int(line.split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        if owner == uid and threads:
+            total += threads
+    return total
+
+
+def _apply_limits(limits: dict) -> None:
+    """在当前进程设置资源限制；只会收紧，平台不支持的限制被忽略"""
+    import resource
+
+    for key, value in limits.items():
+        if key not in _LIMITS or value is None or value <= 0:
+            continue
+        name, scale = _LIMITS[key]
+        if not hasattr(resource, name):
+            continue
+        which = getattr(resource, name)
+        soft = int(value * scale)
+        if key == "processes":
+            # RLIMIT_NPROC 统计的是整个用户的进程和线程（包括 agent 自身的线程池），
+            # 因此按 "当前数量 + 余量" 设置；root 不受该限制，无法统计时不设置
+            if os.getuid() == 0:
+                continue
+            current = _user_task_count()
+            if current is None:
+                continue
+            soft += current
+        # CPU 超过软限制时收到 SIGXCPU，再多 1 秒仍未退出则被 SIGKILL
+        hard = soft + 1 if key == "cpu_seconds" else soft
+        _, current_hard = resource.getrlimit(which)
+        if current_hard != resource.RLIM_INFINITY:
+            soft, hard = min(soft, current_hard), min(hard, current_hard)
+        try:
+            resource.setrlimit(which, (soft, hard))
+        except (ValueError, OSError):
+            pass
+
+
+def _execute_forked(code: str, limits: dict | None, workdir: str, stdout_fd: int, stderr_fd: int,
+                    private_fds: tuple) -> dict:
+    """在 fork 出的子进程中执行（limits 不为空时设置资源限制并使用临时工作目录），返回退出码和资源使用情况"""
+    scratch = tempfile.mkdtemp(prefix="run-", dir=workdir) if limits else None
+    pid = os.fork()
+    if pid == 0:
+        returncode = 1
+        try:
+            for fd in private_fds:
+                os.close(fd)
+            if limits:
+                os.chdir(scratch)
+                os.environ["TMPDIR"] = scratch
+                tempfile.tempdir = scratch
+                _apply_limits(limits)
+            returncode = _execute(code, stdout_fd, stderr_fd)
+        finally:
+            os._exit(returncode)
+
+    _, status, usage = os.wait4(pid, 0)
+    if scratch is not None:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    returncode = os.waitstatus_to_exitcode(status)
+    if limits and returncode in (-signal.SIGXCPU, -signal.SIGKILL) and limits.get("cpu_seconds"):
+        os.write(stderr_fd, f"\nCPU time limit exceeded ({limits['cpu_seconds']} s)\n".encode("utf-8"))
+
+    # ru_maxrss 在 Linux 上以 KB 为单位，macOS 上以字节为单位
+    rss_unit = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "returncode": returncode,
+        "cpu_time": usage.ru_utime + usage.ru_stime,
+        "peak_rss_mb": usage.ru_maxrss / rss_unit,
+    }
+
+
+def main() -> None:
+    workdir = sys.argv[1]
+    preimports = sys.argv[2:]
+
+    # 脚本所在目录（src/utils）不应遮蔽用户代码的导入
+    sys.path.pop(0)
+
+    # 协议管道移到私有描述符，0 / 1 / 2 留给用户代码（预导入时的输出也不会混入协议）
+    proto_in = os.dup(0)
+    proto_out = os.dup(1)
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.close(devnull)
+
+    flags = os.O_RDWR | os.O_CREAT | os.O_TRUNC
+    stdout_fd = os.open(os.path.join(workdir, "stdout.txt"), flags, 0o600)
+    stderr_fd = os.open(os.path.join(workdir, "stderr.txt"), flags, 0o600)
+    os.dup2(stdout_fd, 1)
+    os.dup2(stderr_fd, 2)
+
+    preloaded = []
+    for name in preimports:
+        try:
+            importlib.import_module(name)
+            preloaded.append(name)
+        except Exception:
+            pass
+
+    # 预导入时缓冲的输出不能留给子进程，否则会出现在代码的输出中
+    sys.stdout.flush()
+    sys.stderr.flush()
+    _send(proto_out, {"ready": True, "preloaded": preloaded})
+
+    while True:
+        message = _recv(proto_in)
+        if message is None:
+            break
+        result = _execute_forked(message["code"], message.get("limits"), workdir, stdout_fd, stderr_fd,
+                                 (proto_in, proto_out))
+        _send(proto_out, result)
+
+
+if __name__ == "__main__":
+    main()
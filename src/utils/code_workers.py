@@ -0,0 +1,388 @@
+"""
+预热的代码执行 worker 池
+worker 是预先启动、已导入 numpy / scipy / pulp 的 Python 解释器，通过管道接收代码执行，
+省去每次执行（包括每次反思重试）启动解释器和导入求解库的开销；每次执行在 worker fork 出的子进程中进行，
+代码对已导入模块的修改不会带到后续执行
+
+沙箱模式下子进程另外设置资源限制（内存、CPU 时间、文件数、进程数），在独立的临时目录中运行
+"""
+
+import asyncio
+import atexit
+import json
+import os
+import select
+import shutil
+import signal
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from .colored_logger import log_debug, log_warning
+
+# worker 入口脚本（以独立解释器运行，不导入 src 包）
+WORKER_SCRIPT = Path(__file__).with_name("code_worker_main.py")
+DEFAULT_PREIMPORTS = ("numpy", "scipy", "scipy.optimize", "pulp")
+# 等待超时 / 取消时轮询的间隔（秒）
+_POLL_INTERVAL = 0.1
+
+
+@dataclass
+class ResourceLimits:
+    """沙箱模式的资源限制（None 或 <= 0 表示不限制）"""
+    memory_mb: Optional[int] = 2048  # 地址空间（RLIMIT_AS，包含预导入库的占用）
+    cpu_seconds: Optional[int] = 30  # CPU 时间（RLIMIT_CPU）
+    open_files: Optional[int] = 256  # 打开的文件数（RLIMIT_NOFILE）
+    # 可新建的进程 / 线程数余量（RLIMIT_NPROC 按用户计数，fork 时设为用户当前数量 + 余量；对 root 无效）
+    processes: Optional[int] = None
+
+
+class ExecutionResult(subprocess.CompletedProcess):
+    """CompletedProcess 加上资源使用情况"""
+
+    def __init__(self, args, returncode: int, stdout: str, stderr: str, duration: float = 0.0,
+                 cpu_time: Optional[float] = None, peak_rss_mb: Optional[float] = None, cached: bool = False):
+        super().__init__(args, returncode, stdout, stderr)
+        self.duration = duration  # 墙钟时间（秒）
+        self.cpu_time = cpu_time  # CPU 时间（秒，用户态 + 内核态）
+        self.peak_rss_mb = peak_rss_mb  # 峰值常驻内存（MB，仅 worker 池执行时统计）
+        self.cached = cached  # 是否来自执行结果缓存（耗时等为首次执行时的统计）
+
+
+class _Cancelled(Exception):
+    """执行被调用方取消"""
+
+
+class _Worker:
+    """一个 worker 进程"""
+
+    def __init__(self, preimports: Sequence[str]):
+        self.workdir = tempfile.mkdtemp(prefix="code-worker-")
+        self.process = subprocess.Popen(
+            [sys.executable, str(WORKER_SCRIPT), self.workdir, *preimports],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            # 独立的进程组，终止时连同代码启动的子进程一起结束
+            start_new_session=True,
+        )
+        self.runs = 0
+        self.ready = False
+        self.broken = False
+
+    @property
+    def alive(self) -> bool:
+        return not self.broken and self.process.poll() is None
+
+    def _send(self, message: dict) -> None:
+        data = json.dumps(message).encode("utf-8")
+        self.process.stdin.write(struct.pack(">I", len(data)) + data)
+        self.process.stdin.flush()
+
+    def _read_exact(self, size: int, deadline: float, cancel_event: Optional[threading.Event]) -> Optional[bytes]:
+        """读取 size 字节；超时抛出 TimeoutError，worker 退出时返回 None"""
+        fd = self.process.stdout.fileno()
+        chunks = []
+        while size > 0:
+            if cancel_event is not None and cancel_event.is_set():
+                raise _Cancelled()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError()
+            readable, _, _ = select.select([fd], [], [], min(remaining, _POLL_INTERVAL))
+            if not readable:
+                continue
+            chunk = os.read(fd, size)
+            if not chunk:
+                return None
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def _recv(self, deadline: float, cancel_event: Optional[threading.Event] = None) -> Optional[dict]:
+        header = self._read_exact(4, deadline, cancel_event)
+        if header is None:
+            return None
+        data = self._read_exact(struct.unpack(">I", header)[0], deadline, cancel_event)
+        if data is None:
+            return None
+        return json.loads(data.decode("utf-8"))
+
+    def wait_ready(self, timeout: float, cancel_event: Optional[threading.Event] = None) -> None:
+        """
+        等待 worker 完成预导入
+
+        Raises:
+            RuntimeError: worker 无法启动
+            _Cancelled: 等待期间被取消（worker 已失效，需要丢弃）
+        """
+        if self.ready:
+            return
+        try:
+            message = self._recv(time.monotonic() + timeout, cancel_event)
+        except TimeoutError:
+            message = None
+        except _Cancelled:
+            self.broken = True
+            raise
+        if not message or not message.get("ready"):
+            self.broken = True
+            raise RuntimeError("Code worker failed to start")
+        self.ready = True
+        log_debug(f"Code worker {self.process.pid} ready, preloaded: {', '.join(message.get('preloaded', []))}")
+
+    def _read_output(self, name: str) -> str:
+        try:
+            with open(os.path.join(self.workdir, name), "rb") as f:
+                return f.read().decode("utf-8", errors="replace")
+        except OSError:
+            return ""
+
+    def execute(self, code: str, timeout: float, cancel_event: Optional[threading.Event] = None,
+                limits: Optional[ResourceLimits] = None) -> ExecutionResult:
+        """
+        执行代码
+
+        Raises:
+            subprocess.TimeoutExpired: 超时（worker 已失效，需要丢弃）
+            _Cancelled: 被取消（worker 已失效，需要丢弃）
+        """
+        args = [sys.executable, "<solver>"]
+        self.runs += 1
+        started = time.monotonic()
+        try:
+            self._send({"code": code, "limits": asdict(limits) if limits is not None else None})
+            message = self._recv(time.monotonic() + timeout, cancel_event)
+        except TimeoutError:
+            self.broken = True
+            raise subprocess.TimeoutExpired(args, timeout)
+        except _Cancelled:
+            self.broken = True
+            raise
+        except (BrokenPipeError, OSError):
+            message = None
+
+        if message is None:
+            # worker 本身在执行中退出（如被系统终止），按其退出码返回
+            self.broken = True
+            message = {"returncode": self.process.wait()}
+
+        return ExecutionResult(
+            args, message["returncode"], self._read_output("stdout.txt"), self._read_output("stderr.txt"),
+            duration=time.monotonic() - started,
+            cpu_time=message.get("cpu_time"),
+            peak_rss_mb=message.get("peak_rss_mb"),
+        )
+
+    def kill(self) -> None:
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        self.process.wait()
+        for pipe in (self.process.stdin, self.process.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+class CodeWorkerPool:
+    """预先启动的代码执行 worker 池"""
+
+    def __init__(self, size: int = 2, max_runs: int = 20, preimports: Sequence[str] = DEFAULT_PREIMPORTS,
+                 startup_timeout: float = 60.0, limits: Optional[ResourceLimits] = None):
+        """
+        初始化 worker 池，立即在后台启动 size 个 worker
+
+        Args:
+            size: worker 数量（同时执行的代码数量上限）
+            max_runs: 每个 worker 执行多少次后替换（代码在 fork 出的子进程中执行，替换只是防御性的）
+            preimports: worker 启动时预导入的模块（导入失败的会被忽略）
+            startup_timeout: 等待 worker 完成预导入的超时秒数（不计入代码执行超时）
+            limits: 沙箱模式的资源限制（None 则不限制，仍在 fork 出的子进程中执行）
+        """
+        self.size = size
+        self.max_runs = max_runs
+        self.preimports = list(preimports)
+        self.startup_timeout = startup_timeout
+        self.limits = limits
+
+        self.runs = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self.recycled = 0
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+        self._idle: List[_Worker] = [_Worker(self.preimports) for _ in range(size)]
+
+        atexit.register(self.shutdown)
+
+    def _acquire(self) -> _Worker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop(0)
+                if worker.alive:
+                    return worker
+                self.crashes += 1
+                worker.kill()
+        return _Worker(self.preimports)
+
+    def _release(self, worker: _Worker) -> None:
+        """归还 worker；已失效或达到执行次数上限的换成新启动的 worker"""
+        replace = not worker.alive or worker.runs >= self.max_runs
+        if replace:
+            worker.kill()
+        with self._lock:
+            if self._closed:
+                if not replace:
+                    worker.kill()
+                return
+            if replace:
+                self.recycled += 1
+                # 新 worker 在后台预导入，下次执行时已就绪
+                worker = _Worker(self.preimports)
+            self._idle.append(worker)
+
+    def run(self, code: str, timeout: float, cancel_event: Optional[threading.Event] = None) -> ExecutionResult:
+        """
+        在 worker 中执行代码（阻塞）
+
+        Args:
+            code: Python 源码，以 __main__ 身份在 fork 出的子进程中执行（模块状态与其他执行隔离）
+            timeout: 执行超时秒数
+            cancel_event: 被设置时终止执行
+
+        Returns:
+            ExecutionResult（stdout / stderr 为文本）
+
+        Raises:
+            subprocess.TimeoutExpired: 超时
+            RuntimeError: worker 无法启动
+        """
+        with self._slots:
+            worker = self._acquire()
+            try:
+                worker.wait_ready(self.startup_timeout, cancel_event)
+                result = worker.execute(code, timeout, cancel_event, self.limits)
+            except subprocess.TimeoutExpired:
+                with self._lock:
+                    self.timeouts += 1
+                raise
+            finally:
+                self._release(worker)
+
+            with self._lock:
+                self.runs += 1
+                if worker.broken:
+                    self.crashes += 1
+            return result
+
+    async def run_async(self, code: str, timeout: float) -> ExecutionResult:
+        """
+        run 的异步版本，在线程中等待结果，不阻塞事件循环；任务被取消时终止 worker
+
+        Args:
+            code: Python 源码
+            timeout: 执行超时秒数
+
+        Returns:
+            ExecutionResult（stdout / stderr 为文本）
+        """
+        cancel_event = threading.Event()
+        try:
+            return await asyncio.to_thread(self.run, code, timeout, cancel_event)
+        except asyncio.CancelledError:
+            cancel_event.set()
+            raise
+
+    def stats(self) -> Dict[str, int]:
+        """
+        获取 worker 池统计信息
+
+        Returns:
+            包含 size / idle / runs / timeouts / crashes / recycled 的字典
+        """
+        with self._lock:
+            return {
+                "size": self.size,
+                "idle": len(self._idle),
+                "runs": self.runs,
+                "timeouts": self.timeouts,
+                "crashes": self.crashes,
+                "recycled": self.recycled,
+            }
+
+    def shutdown(self) -> None:
+        """终止所有空闲 worker；执行中的 worker 在归还时终止"""
+        with self._lock:
+            self._closed = True
+            workers, self._idle = self._idle, []
+        for worker in workers:
+            worker.kill()
+
+
+def _sandbox_limits() -> Optional[ResourceLimits]:
+    """从环境变量读取沙箱模式的资源限制，未启用时返回 None"""
+    if os.getenv("CODE_SANDBOX", "false").lower() not in ("1", "true", "yes", "on"):
+        return None
+
+    defaults = ResourceLimits()
+    return ResourceLimits(
+        memory_mb=int(os.getenv("CODE_SANDBOX_MEMORY_MB", str(defaults.memory_mb))),
+        cpu_seconds=int(os.getenv("CODE_SANDBOX_CPU_SECONDS", str(defaults.cpu_seconds))),
+        open_files=int(os.getenv("CODE_SANDBOX_OPEN_FILES", str(defaults.open_files))),
+        processes=int(os.getenv("CODE_SANDBOX_PROCESSES", "0")) or None,
+    )
+
+
+# 全局 worker 池实例
+_code_worker_pool: Optional[CodeWorkerPool] = None
+_code_worker_pool_lock = threading.Lock()
+
+
+def get_code_worker_pool() -> Optional[CodeWorkerPool]:
+    """
+    获取全局代码执行 worker 池（首次调用时启动 worker）
+
+    通过环境变量配置：
+    - CODE_WORKER_POOL: 设为 0 / false 时禁用，每次执行启动新的解释器
+    - CODE_WORKER_POOL_SIZE: worker 数量（默认 2）
+    - CODE_WORKER_MAX_RUNS: 每个 worker 执行多少次后替换（默认 20）
+    - CODE_WORKER_PREIMPORT: 逗号分隔的预导入模块（默认 numpy,scipy,scipy.optimize,pulp）
+    - CODE_SANDBOX: 设为 1 / true 时启用沙箱模式（默认关闭）
+    - CODE_SANDBOX_MEMORY_MB / CODE_SANDBOX_CPU_SECONDS / CODE_SANDBOX_OPEN_FILES / CODE_SANDBOX_PROCESSES:
+      沙箱模式的资源限制（默认 2048 / 30 / 256 / 不限制，0 表示不限制；进程数为在用户当前进程数之上的余量）
+
+    Returns:
+        CodeWorkerPool 实例，禁用或平台不支持（Windows 管道不支持 select）时返回 None
+    """
+    global _code_worker_pool
+
+    if os.name == "nt" or os.getenv("CODE_WORKER_POOL", "true").lower() in ("0", "false", "no", "off"):
+        return None
+
+    with _code_worker_pool_lock:
+        if _code_worker_pool is None:
+            preimports = os.getenv("CODE_WORKER_PREIMPORT")
+            try:
+                _code_worker_pool = CodeWorkerPool(
+                    size=int(os.getenv("CODE_WORKER_POOL_SIZE", "2")),
+                    max_runs=int(os.getenv("CODE_WORKER_MAX_RUNS", "20")),
+                    preimports=[name.strip() for name in preimports.split(",") if name.strip()]
+                    if preimports is not None else DEFAULT_PREIMPORTS,
+                    limits=_sandbox_limits(),
+                )
+            except OSError as e:
+                log_warning(f"Code worker pool unavailable, falling back to subprocesses: {e}")
+                return None
+    return _code_worker_pool
@@ -0,0 +1,184 @@
+"""
+Gemini 显式上下文缓存
+将 tutor 的静态前缀（系统提示 + 材料摘要 + 工具声明）上传为服务端 cached content，
+相同前缀的后续请求只引用缓存名，只为新增 token 计费
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.genai import errors as genai_errors
+from google.genai.types import CreateCachedContentConfig, UpdateCachedContentConfig
+
+from .colored_logger import log_debug, log_warning
+
+
+class ContextCache:
+    """按 (模型, 前缀内容) 复用服务端 cached content"""
+
+    def __init__(self, client, ttl: float = 3600.0, refresh_margin: float = 300.0, retry_after: float = 600.0):
+        """
+        初始化上下文缓存
+
+        Args:
+            client: genai.Client
+            ttl: 服务端缓存有效期（秒）
+            refresh_margin: 距过期不足该秒数时续期
+            retry_after: 创建失败（如前缀低于模型最小缓存 token 数）后，多久内不再尝试
+        """
+        self.client = client
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.retry_after = retry_after
+
+        self.hits = 0
+        self.creates = 0
+        self.refreshes = 0
+        self.failures = 0
+
+        # key → (缓存名, 过期时间戳)；创建失败时缓存名为 None，过期时间为下次重试时间
+        self._entries: Dict[str, Tuple[Optional[str], float]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    @staticmethod
+    def make_key(model: str, system_instruction: str, tools: Optional[List[Any]] = None) -> str:
+        """
+        计算前缀的缓存键
+
+        材料集合通过摘要体现在 system_instruction 中，材料变化会得到新的键。
+        """
+        digest = hashlib.sha256()
+        digest.update(model.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(system_instruction.encode("utf-8"))
+        for tool in tools or []:
+            digest.update(b"\0")
+            dumped = tool.model_dump(exclude_none=True) if hasattr(tool, "model_dump") else tool
+            digest.update(json.dumps(dumped, sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()
+
+    async def get(self, model: str, system_instruction: str, tools: Optional[List[Any]] = None) -> Optional[str]:
+        """
+        获取前缀对应的 cached content 名称，必要时创建或续期
+
+        Args:
+            model: 模型名称
+            system_instruction: 静态系统指令（含材料摘要）
+            tools: 工具声明
+
+        Returns:
+            缓存名称；无法缓存时返回 None，调用方应发送完整前缀
+        """
+        key = self.make_key(model, system_instruction, tools)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+
+        async with lock:
+            now = time.time()
+            name, expires_at = self._entries.get(key, (None, 0.0))
+
+            if name is None and now < expires_at:
+                # 最近创建失败，暂不重试
+                return None
+
+            if name is not None and now < expires_at - self.refresh_margin:
+                self.hits += 1
+                return name
+
+            if name is not None and now < expires_at:
+                if await self._refresh(key, name):
+                    self.hits += 1
+                    return name
+
+            return await self._create(key, model, system_instruction, tools)
+
+    async def _refresh(self, key: str, name: str) -> bool:
+        """延长缓存有效期（调用方需持有该键的锁）"""
+        try:
+            await self.client.aio.caches.update(
+                name=name,
+                config=UpdateCachedContentConfig(ttl=f"{int(self.ttl)}s")
+            )
+        except genai_errors.APIError as e:
+            log_debug(f"Context cache refresh failed for {name}: {e}")
+            self._entries.pop(key, None)
+            return False
+
+        self.refreshes += 1
+        self._entries[key] = (name, time.time() + self.ttl)
+        return True
+
+    async def _create(self, key: str, model: str, system_instruction: str, tools: Optional[List[Any]]) -> Optional[str]:
+        """创建服务端缓存（调用方需持有该键的锁）"""
+        try:
+            cached = await self.client.aio.caches.create(
+                model=model,
+                config=CreateCachedContentConfig(
+                    display_name=f"tutor-{key[:16]}",
+                    system_instruction=system_instruction,
+                    tools=tools,
+                    ttl=f"{int(self.ttl)}s"
+                )
+            )
+        except genai_errors.APIError as e:
+            log_warning(f"Context cache unavailable, sending full prompt: {e}")
+            self.failures += 1
+            self._entries[key] = (None, time.time() + self.retry_after)
+            return None
+
+        self.creates += 1
+        self._entries[key] = (cached.name, time.time() + self.ttl)
+        log_debug(f"Created context cache {cached.name}")
+        return cached.name
+
+    def invalidate(self, name: str) -> None:
+        """服务端报告缓存不可用时移除本地记录，下次 get 会重新创建"""
+        for key, (entry_name, _) in list(self._entries.items()):
+            if entry_name == name:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            包含 hits / creates / refreshes / failures / entries 的字典
+        """
+        return {
+            "hits": self.hits,
+            "creates": self.creates,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "entries": sum(1 for name, _ in self._entries.values() if name is not None),
+        }
+
+
+# 全局上下文缓存实例
+_context_cache: Optional[ContextCache] = None
+
+
+def get_context_cache(client) -> Optional[ContextCache]:
+    """
+    获取全局上下文缓存实例
+
+    通过环境变量配置：
+    - CONTEXT_CACHE: 设为 0 / false 时禁用
+    - CONTEXT_CACHE_TTL: 服务端缓存有效期秒数（默认 3600）
+
+    Args:
+        client: genai.Client
+
+    Returns:
+        ContextCache 实例，禁用时返回 None
+    """
+    global _context_cache
+
+    if os.getenv("CONTEXT_CACHE", "true").lower() in ("0", "false", "no", "off"):
+        return None
+
+    if _context_cache is None:
+        _context_cache = ContextCache(client, ttl=float(os.getenv("CONTEXT_CACHE_TTL", "3600")))
+    return _context_cache
@@ -4,6 +4,7 @@
 """
 
 import os
+import threading
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Optional
@@ -40,6 +41,19 @@ class ConversationLogger:
         # 对话历史
         self.conversation_history: List[Dict] = []
         
+        # 工具调用统计
+        self.tool_calls = 0
+        self.tool_cache_hits = 0
+        self.tool_cache_misses = 0
+        
+        # 后台图表任务：job_id → 所属回答在 conversation_history 中的下标（回答尚未记录时为 None）
+        self._pending_images: Dict[str, Optional[int]] = {}
+        # 已完成、但所属回答尚未记录的图片
+        self._unclaimed_images: List[str] = []
+        
+        # 工具和图表任务在线程池中执行，修改上述状态和 Markdown 文件需加锁
+        self._lock = threading.RLock()
+        
         # Markdown 文件路径
         self.markdown_file = self.session_dir / "conversation.md"
         
@@ -71,45 +85,104 @@ class ConversationLogger:
             "content": question,
             "timestamp": datetime.now().isoformat()
         }
-        self.conversation_history.append(entry)
         
-        # 追加到 Markdown
-        with open(self.markdown_file, 'a', encoding='utf-8') as f:
-            f.write(f"## 🎓 Student Question\n\n")
-            f.write(f"{question}\n\n")
-            f.write(f"*Time: {datetime.now().strftime('%H:%M:%S')}*\n\n")
+        with self._lock:
+            self.conversation_history.append(entry)
+            
+            # 追加到 Markdown
+            with open(self.markdown_file, 'a', encoding='utf-8') as f:
+                f.write(f"## 🎓 Student Question\n\n")
+                f.write(f"{question}\n\n")
+                f.write(f"*Time: {datetime.now().strftime('%H:%M:%S')}*\n\n")
     
     def log_answer(self, answer: str, images: Optional[List[str]] = None):
         """
         记录 Tutor 回答
         
+        本轮提交、尚未完成的后台图表会先写入占位符，完成后由 attach_image 替换为图片。
+        
         Args:
             answer: Tutor 的回答（Markdown 格式）
             images: 生成的图片路径列表
         """
-        entry = {
-            "role": "tutor",
-            "content": answer,
-            "images": images or [],
-            "timestamp": datetime.now().isoformat()
-        }
-        self.conversation_history.append(entry)
+        with self._lock:
+            images = list(images or []) + self._unclaimed_images
+            self._unclaimed_images = []
+            
+            index = len(self.conversation_history)
+            pending = [job_id for job_id, owner in self._pending_images.items() if owner is None]
+            for job_id in pending:
+                self._pending_images[job_id] = index
+            
+            entry = {
+                "role": "tutor",
+                "content": answer,
+                "images": images,
+                "timestamp": datetime.now().isoformat()
+            }
+            self.conversation_history.append(entry)
+            
+            # 追加到 Markdown
+            with open(self.markdown_file, 'a', encoding='utf-8') as f:
+                f.write(f"## 📚 Tutor Answer\n\n")
+                f.write(f"{answer}\n\n")
+                
+                # 添加图片引用
+                if images or pending:
+                    f.write(f"### Generated Images\n\n")
+                    for img_path in images:
+                        f.write(self._image_markdown(img_path))
+                    for job_id in pending:
+                        f.write(self._placeholder(job_id))
+                
+                f.write(f"*Time: {datetime.now().strftime('%H:%M:%S')}*\n\n")
+                f.write("---\n\n")
+    
+    def _image_markdown(self, img_path: str) -> str:
+        """图片的 Markdown 引用（使用相对路径）"""
+        rel_path = Path(img_path).relative_to(self.session_dir)
+        return f"![Generated Image]({rel_path})\n\n"
+    
+    @staticmethod
+    def _placeholder(job_id: str) -> str:
+        """后台图表的 Markdown 占位符"""
+        return f"<!-- diagram:{job_id} -->*图表生成中…*\n\n"
+    
+    def add_pending_image(self, job_id: str):
+        """
+        登记一个后台图表任务，之后的 log_answer 会为它预留位置
         
-        # 追加到 Markdown
-        with open(self.markdown_file, 'a', encoding='utf-8') as f:
-            f.write(f"## 📚 Tutor Answer\n\n")
-            f.write(f"{answer}\n\n")
+        Args:
+            job_id: 图表任务 ID
+        """
+        with self._lock:
+            self._pending_images[job_id] = None
+    
+    def attach_image(self, job_id: str, image_path: Optional[str]):
+        """
+        后台图表完成后附加到所属回答
+        
+        Args:
+            job_id: 图表任务 ID
+            image_path: 图片路径，生成失败时为 None
+        """
+        with self._lock:
+            if job_id not in self._pending_images:
+                return
+            index = self._pending_images.pop(job_id)
+            
+            if index is None:
+                # 回答尚未记录，随下一次 log_answer 写入
+                if image_path:
+                    self._unclaimed_images.append(image_path)
+                return
             
-            # 添加图片引用
-            if images:
-                f.write(f"### Generated Images\n\n")
-                for img_path in images:
-                    # 使用相对路径
-                    rel_path = Path(img_path).relative_to(self.session_dir)
-                    f.write(f"![Generated Image]({rel_path})\n\n")
+            if image_path:
+                self.conversation_history[index]["images"].append(image_path)
             
-            f.write(f"*Time: {datetime.now().strftime('%H:%M:%S')}*\n\n")
-            f.write("---\n\n")
+            replacement = self._image_markdown(image_path) if image_path else "*图表生成失败*\n\n"
+            content = self.markdown_file.read_text(encoding='utf-8')
+            self.markdown_file.write_text(content.replace(self._placeholder(job_id), replacement, 1), encoding='utf-8')
     
     def save_image(self, image, description: str = "") -> str:
         """
@@ -139,6 +212,21 @@ class ConversationLogger:
         
         return str(image_path)
     
+    def record_tool_call(self, tool_name: str, cached: Optional[bool] = None):
+        """
+        记录一次工具调用
+        
+        Args:
+            tool_name: 工具名称
+            cached: 结果是否来自工具结果缓存（None 表示工具不经过缓存，不计入命中 / 未命中）
+        """
+        with self._lock:
+            self.tool_calls += 1
+            if cached is True:
+                self.tool_cache_hits += 1
+            elif cached is False:
+                self.tool_cache_misses += 1
+    
     def get_session_summary(self) -> Dict:
         """
         获取会话摘要
@@ -150,6 +238,10 @@ class ConversationLogger:
             "session_id": self.session_id,
             "total_exchanges": len([e for e in self.conversation_history if e["role"] == "student"]),
             "total_images": sum(len(e.get("images", [])) for e in self.conversation_history),
+            "tool_calls": self.tool_calls,
+            "tool_cache_hits": self.tool_cache_hits,
+            "tool_cache_misses": self.tool_cache_misses,
+            "pending_images": len(self._pending_images),
             "markdown_file": str(self.markdown_file),
             "session_dir": str(self.session_dir)
         }
@@ -157,7 +249,7 @@ class ConversationLogger:
     def export_json(self):
         """导出对话历史为 JSON"""
         json_file = self.session_dir / "conversation.json"
-        with open(json_file, 'w', encoding='utf-8') as f:
+        with self._lock, open(json_file, 'w', encoding='utf-8') as f:
             json.dump({
                 "session_id": self.session_id,
                 "conversation": self.conversation_history
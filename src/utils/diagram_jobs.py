@@ -0,0 +1,165 @@
+"""
+后台图表生成队列
+generate_diagram 只提交任务并立即返回任务句柄；图片生成完成后由 ConversationLogger 附加到对应回答
+"""
+
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .colored_logger import log_success, log_warning
+
+
+class DiagramQuotaExceeded(Exception):
+    """会话的图表数量已达上限"""
+
+
+@dataclass
+class DiagramJob:
+    """一个图表生成任务"""
+    job_id: str
+    session_id: str
+    prompt: str
+    diagram_type: str
+    model: str
+    status: str = "queued"  # queued / running / done / failed
+    image_path: Optional[str] = None
+    error: Optional[str] = None
+    future: Optional[Future] = field(default=None, repr=False)
+
+
+class DiagramJobQueue:
+    """线程池实现的图表生成队列"""
+
+    def __init__(self, max_concurrency: int = 2, session_cap: int = 10):
+        """
+        初始化队列
+
+        Args:
+            max_concurrency: 同时生成的图表数量上限
+            session_cap: 每个会话最多提交的图表数量（<= 0 表示不限）
+        """
+        self.max_concurrency = max_concurrency
+        self.session_cap = session_cap
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="diagram")
+        self._lock = threading.Lock()
+        # 尚未完成的任务；完成后移除，不保留结果和图片路径（它们已交给对话记录器）
+        self._jobs_by_session: Dict[str, List[DiagramJob]] = {}
+        # 每个会话已提交的任务数，用于数量上限
+        self._submitted: Dict[str, int] = {}
+
+    def submit(self, prompt: str, diagram_type: str, conversation_logger, model: Optional[str] = None) -> DiagramJob:
+        """
+        提交图表生成任务，立即返回
+
+        Args:
+            prompt: 图片生成提示
+            diagram_type: 图表类型（用于文件名）
+            conversation_logger: 保存图片并附加到回答的对话记录器
+            model: 图片生成模型（None 则读取 IMAGE_GEN_MODEL）
+
+        Returns:
+            DiagramJob 任务句柄
+
+        Raises:
+            DiagramQuotaExceeded: 会话的图表数量已达上限
+        """
+        session_id = conversation_logger.session_id
+        job = DiagramJob(
+            job_id=uuid.uuid4().hex[:12],
+            session_id=session_id,
+            prompt=prompt,
+            diagram_type=diagram_type,
+            model=model or os.getenv("IMAGE_GEN_MODEL", "gemini-2.5-flash-image"),
+        )
+
+        with self._lock:
+            submitted = self._submitted.get(session_id, 0)
+            if self.session_cap > 0 and submitted >= self.session_cap:
+                raise DiagramQuotaExceeded(f"Session {session_id} reached the diagram cap ({self.session_cap})")
+            self._submitted[session_id] = submitted + 1
+            self._jobs_by_session.setdefault(session_id, []).append(job)
+
+        # 先登记再提交，避免任务在登记前完成
+        conversation_logger.add_pending_image(job.job_id)
+        job.future = self._executor.submit(self._run, job, conversation_logger)
+        return job
+
+    def _run(self, job: DiagramJob, conversation_logger) -> None:
+        """生成图片、保存并通知对话记录器，完成后从未完成任务中移除"""
+        from .image_generation import image_generation_tool
+
+        job.status = "running"
+        try:
+            image = image_generation_tool(text_prompt=job.prompt, image_paths=[], model=job.model)
+            job.image_path = conversation_logger.save_image(image, description=job.diagram_type)
+            job.status = "done"
+            log_success(f"Diagram {job.job_id} generated: {job.image_path}")
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            log_warning(f"Diagram {job.job_id} failed: {e}")
+        finally:
+            conversation_logger.attach_image(job.job_id, job.image_path)
+            self._forget(job)
+
+    def _forget(self, job: DiagramJob) -> None:
+        """移除已完成的任务"""
+        with self._lock:
+            jobs = self._jobs_by_session.get(job.session_id)
+            if jobs is None:
+                return
+            if job in jobs:
+                jobs.remove(job)
+            if not jobs:
+                del self._jobs_by_session[job.session_id]
+
+    def jobs(self, session_id: str) -> List[DiagramJob]:
+        """会话尚未完成的任务"""
+        with self._lock:
+            return list(self._jobs_by_session.get(session_id, []))
+
+    def wait(self, session_id: str, timeout: Optional[float] = None) -> bool:
+        """
+        等待会话的所有任务完成
+
+        Args:
+            session_id: 会话 ID
+            timeout: 超时秒数（None 表示一直等待）
+
+        Returns:
+            是否全部完成
+        """
+        futures = [job.future for job in self.jobs(session_id) if job.future is not None]
+        _, not_done = wait(futures, timeout=timeout)
+        return not not_done
+
+
+# 全局图表队列实例
+_diagram_queue: Optional[DiagramJobQueue] = None
+_diagram_queue_lock = threading.Lock()
+
+
+def get_diagram_queue() -> DiagramJobQueue:
+    """
+    获取全局图表生成队列
+
+    通过环境变量配置：
+    - DIAGRAM_MAX_CONCURRENCY: 同时生成的图表数量（默认 2）
+    - DIAGRAM_SESSION_CAP: 每个会话最多生成的图表数量（默认 10，0 表示不限）
+
+    Returns:
+        DiagramJobQueue 实例
+    """
+    global _diagram_queue
+
+    with _diagram_queue_lock:
+        if _diagram_queue is None:
+            _diagram_queue = DiagramJobQueue(
+                max_concurrency=int(os.getenv("DIAGRAM_MAX_CONCURRENCY", "2")),
+                session_cap=int(os.getenv("DIAGRAM_SESSION_CAP", "10")),
+            )
+    return _diagram_queue
@@ -0,0 +1,360 @@
+"""
+Embedding 缓存
+- EmbeddingCache: 以 (embedding 模型, 文本 sha256) 为键，将向量持久化到本地 SQLite
+- QueryEmbeddingCache: 查询 embedding 的内存 LRU（带 TTL，可溢出到 EmbeddingCache）
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """基于 SQLite 的内容寻址 embedding 缓存"""
+
+    # SQLite 单条语句的参数数量有限，批量查询时分段
+    _QUERY_BATCH = 500
+
+    def __init__(self, cache_dir: str | Path = ".cache/embeddings", max_bytes: int = 1024 * 1024 * 1024):
+        """
+        初始化 embedding 缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 向量数据总大小上限，超出后按最近最少使用淘汰
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.cache_dir / "embeddings.sqlite3"
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                nbytes INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON embeddings (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        """计算文本的 sha256"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        批量查询 embedding
+
+        Args:
+            model: embedding 模型名称
+            texts: 文本列表
+
+        Returns:
+            与 texts 一一对应的向量列表，未命中的位置为 None
+        """
+        hashes = [self.text_hash(t) for t in texts]
+        found: Dict[str, np.ndarray] = {}
+
+        with self._lock:
+            unique = list(dict.fromkeys(hashes))
+            for i in range(0, len(unique), self._QUERY_BATCH):
+                part = unique[i:i + self._QUERY_BATCH]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *part],
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, h) for h in found],
+                )
+                self._conn.commit()
+
+            results = [found.get(h) for h in hashes]
+            hit_count = sum(1 for r in results if r is not None)
+            self.hits += hit_count
+            self.misses += len(results) - hit_count
+
+        return results
+
+    def put_many(self, model: str, texts: List[str], embeddings: List[np.ndarray]) -> None:
+        """
+        批量写入 embedding
+
+        Args:
+            model: embedding 模型名称
+            texts: 文本列表
+            embeddings: 与 texts 一一对应的向量列表
+        """
+        if not texts:
+            return
+
+        now = time.time()
+        rows = []
+        for text, embedding in zip(texts, embeddings):
+            blob = np.asarray(embedding, dtype=np.float32).tobytes()
+            rows.append((model, self.text_hash(text), blob, len(blob), now))
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, nbytes, last_access) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        """超出容量时按 last_access 淘汰，直到降到上限的 90%（调用方需持有锁）"""
+        total = self._total_bytes_locked()
+        if total <= self.max_bytes:
+            return
+
+        target = int(self.max_bytes * 0.9)
+        cursor = self._conn.execute("SELECT model, text_hash, nbytes FROM embeddings ORDER BY last_access ASC")
+        victims = []
+        for model, text_hash, nbytes in cursor:
+            if total <= target:
+                break
+            victims.append((model, text_hash))
+            total -= nbytes
+
+        self._conn.executemany("DELETE FROM embeddings WHERE model = ? AND text_hash = ?", victims)
+        self._conn.commit()
+
+    def _total_bytes_locked(self) -> int:
+        """当前向量数据总字节数（调用方需持有锁）"""
+        return self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            包含 hits / misses / entries / bytes / max_bytes 的字典
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            total = self._total_bytes_locked()
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self) -> None:
+        """清空缓存和统计"""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+class QueryEmbeddingCache:
+    """查询 embedding 的 LRU 缓存"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, spill: Optional[EmbeddingCache] = None):
+        """
+        初始化查询缓存
+
+        Args:
+            max_entries: 内存中最多保留的条目数
+            ttl: 条目有效期（秒），<= 0 表示不过期
+            spill: 溢出存储；被 LRU 淘汰的条目写入其中，内存未命中时也会查询它
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.spill = spill
+
+        self.hits = 0
+        self.spill_hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, np.ndarray]]" = OrderedDict()
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """规范化查询文本：全角转半角、大小写折叠、合并空白"""
+        query = unicodedata.normalize("NFKC", query).casefold()
+        return re.sub(r"\s+", " ", query).strip()
+
+    def get(self, model: str, query: str) -> Optional[np.ndarray]:
+        """
+        查询缓存
+
+        Args:
+            model: embedding 模型名称
+            query: 原始查询文本
+
+        Returns:
+            命中时返回向量，否则返回 None
+        """
+        key = (model, self.normalize_query(query))
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, embedding = entry
+                if self.ttl <= 0 or now - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return embedding
+                del self._entries[key]
+
+        if self.spill is not None:
+            embedding = self.spill.get_many(model, [key[1]])[0]
+            if embedding is not None:
+                with self._lock:
+                    self.spill_hits += 1
+                    self._store_locked(key, embedding, now)
+                return embedding
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, model: str, query: str, embedding: np.ndarray) -> None:
+        """
+        写入缓存
+
+        Args:
+            model: embedding 模型名称
+            query: 原始查询文本
+            embedding: 查询向量
+        """
+        key = (model, self.normalize_query(query))
+        with self._lock:
+            self._store_locked(key, embedding, time.time())
+
+    def _store_locked(self, key: Tuple[str, str], embedding: np.ndarray, stored_at: float) -> None:
+        """写入条目并执行 LRU 淘汰（调用方需持有锁）"""
+        self._entries[key] = (stored_at, embedding)
+        self._entries.move_to_end(key)
+
+        evicted = []
+        while len(self._entries) > self.max_entries:
+            evicted.append(self._entries.popitem(last=False))
+
+        if self.spill is not None:
+            for (model, text), (_, vector) in evicted:
+                self.spill.put_many(model, [text], [vector])
+
+    def stats(self) -> Dict[str, float]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            包含 hits / spill_hits / misses / hit_rate / entries 的字典
+        """
+        with self._lock:
+            lookups = self.hits + self.spill_hits + self.misses
+            return {
+                "hits": self.hits,
+                "spill_hits": self.spill_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.spill_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+    def clear(self) -> None:
+        """清空内存条目和统计"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.spill_hits = 0
+            self.misses = 0
+
+
+# 全局 embedding 缓存实例
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    获取全局 embedding 缓存实例
+
+    通过环境变量配置：
+    - EMBEDDING_CACHE: 设为 0 / false 时禁用缓存
+    - EMBEDDING_CACHE_DIR: 缓存目录（默认 .cache/embeddings）
+    - EMBEDDING_CACHE_MAX_MB: 容量上限（默认 1024 MB）
+
+    Returns:
+        EmbeddingCache 实例，禁用时返回 None
+    """
+    global _embedding_cache
+
+    if os.getenv("EMBEDDING_CACHE", "true").lower() in ("0", "false", "no", "off"):
+        return None
+
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(
+            cache_dir=os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings"),
+            max_bytes=int(os.getenv("EMBEDDING_CACHE_MAX_MB", "1024")) * 1024 * 1024,
+        )
+    return _embedding_cache
+
+
+# 全局查询 embedding 缓存实例
+_query_embedding_cache: Optional[QueryEmbeddingCache] = None
+
+
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    """
+    获取全局查询 embedding 缓存实例
+
+    通过环境变量配置：
+    - QUERY_CACHE_SIZE: 内存条目上限（默认 1024）
+    - QUERY_CACHE_TTL: 有效期秒数（默认 3600，0 表示不过期）
+    - QUERY_CACHE_SPILL: 设为 0 / false 时不溢出到持久化 embedding 缓存
+
+    Returns:
+        QueryEmbeddingCache 实例
+    """
+    global _query_embedding_cache
+
+    if _query_embedding_cache is None:
+        spill_enabled = os.getenv("QUERY_CACHE_SPILL", "true").lower() not in ("0", "false", "no", "off")
+        _query_embedding_cache = QueryEmbeddingCache(
+            max_entries=int(os.getenv("QUERY_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("QUERY_CACHE_TTL", "3600")),
+            spill=get_embedding_cache() if spill_enabled else None,
+        )
+    return _query_embedding_cache
@@ -0,0 +1,225 @@
+"""
+代码执行结果缓存
+以 hash(规范化代码, 解释器与求解库版本, 执行环境) 为键缓存 returncode / stdout / stderr / 耗时，
+反思重试或重复提交相同的求解代码时直接返回之前的结果
+"""
+
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from importlib import metadata
+from typing import Dict, Optional
+
+from .code_workers import ExecutionResult
+
+# 参与环境指纹的包：版本变化可能改变求解结果
+FINGERPRINT_PACKAGES = ("numpy", "scipy", "pulp", "cvxpy")
+
+
+def normalize_code(code: str) -> str:
+    """
+    规范化代码：统一换行符，去掉行尾空白和首尾空行
+
+    不删除中间的空行和注释，保证缓存的 traceback 行号与代码一致。
+    """
+    lines = [line.rstrip() for line in code.replace("\r\n", "\n").replace("\r", "\n").split("\n")]
+    return "\n".join(lines).strip("\n")
+
+
+def environment_fingerprint() -> str:
+    """当前解释器和求解库版本的指纹"""
+    parts = [sys.executable, sys.version]
+    for package in FINGERPRINT_PACKAGES:
+        try:
+            parts.append(f"{package}=={metadata.version(package)}")
+        except metadata.PackageNotFoundError:
+            parts.append(f"{package}==-")
+    return "\n".join(parts)
+
+
+@dataclass
+class _Entry:
+    """一次执行的结果"""
+    returncode: int
+    stdout: str
+    stderr: str
+    duration: float
+    cpu_time: Optional[float]
+    peak_rss_mb: Optional[float]
+    stored_at: float
+
+    @property
+    def size(self) -> int:
+        return len(self.stdout) + len(self.stderr)
+
+
+class ExecutionCache:
+    """代码执行结果的 LRU 缓存，按条目数、输出总大小和有效期淘汰"""
+
+    def __init__(self, max_entries: int = 128, max_bytes: int = 16 * 1024 * 1024, ttl: float = 3600.0):
+        """
+        初始化执行结果缓存
+
+        Args:
+            max_entries: 最多保留的条目数
+            max_bytes: stdout + stderr 总字符数上限
+            ttl: 条目有效期（秒）
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.fingerprint = environment_fingerprint()
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._total_bytes = 0
+
+    def make_key(self, code: str, context: str = "") -> str:
+        """
+        计算缓存键
+
+        Args:
+            code: Python 源码（规范化后参与哈希）
+            context: 影响执行结果的其他配置（如沙箱资源限制）
+
+        Returns:
+            sha256 十六进制字符串
+        """
+        digest = hashlib.sha256()
+        for field in (self.fingerprint, context, normalize_code(code)):
+            digest.update(field.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[ExecutionResult]:
+        """
+        查询缓存
+
+        Args:
+            key: make_key 计算的键
+
+        Returns:
+            命中时返回 ExecutionResult（cached=True），否则返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry.stored_at > self.ttl:
+                self._remove_locked(key)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        return ExecutionResult(
+            [sys.executable, "<solver>"], entry.returncode, entry.stdout, entry.stderr,
+            duration=entry.duration, cpu_time=entry.cpu_time, peak_rss_mb=entry.peak_rss_mb, cached=True,
+        )
+
+    def put(self, key: str, result) -> None:
+        """
+        写入缓存
+
+        只缓存退出码为 0 的结果：失败、崩溃或超出资源限制的结果可能来自偶发状况，
+        缓存后同一段代码的反思重试会一直得到同一个错误；输出超过总大小上限的结果也不缓存。
+
+        Args:
+            key: make_key 计算的键
+            result: CompletedProcess 或 ExecutionResult
+        """
+        if result.returncode != 0:
+            return
+
+        entry = _Entry(
+            returncode=result.returncode,
+            stdout=result.stdout or "",
+            stderr=result.stderr or "",
+            duration=getattr(result, "duration", 0.0),
+            cpu_time=getattr(result, "cpu_time", None),
+            peak_rss_mb=getattr(result, "peak_rss_mb", None),
+            stored_at=time.time(),
+        )
+        if entry.size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove_locked(key)
+            self._entries[key] = entry
+            self._total_bytes += entry.size
+
+            while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                self._remove_locked(next(iter(self._entries)))
+
+    def _remove_locked(self, key: str) -> None:
+        """移除条目（调用方需持有锁）"""
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.size
+
+    def stats(self) -> Dict[str, float]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            包含 hits / misses / hit_rate / entries / bytes 的字典
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+            }
+
+    def clear(self) -> None:
+        """清空条目和统计"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+# 全局执行结果缓存实例
+_execution_cache: Optional[ExecutionCache] = None
+_execution_cache_lock = threading.Lock()
+
+
+def get_execution_cache() -> Optional[ExecutionCache]:
+    """
+    获取全局执行结果缓存实例
+
+    通过环境变量配置：
+    - CODE_EXEC_CACHE: 设为 1 / true 时启用（默认关闭；代码依赖随机数、时间、求解时限或外部文件时结果不可复用）
+    - CODE_EXEC_CACHE_SIZE: 条目上限（默认 128）
+    - CODE_EXEC_CACHE_MAX_MB: 缓存的输出总大小上限（默认 16 MB）
+    - CODE_EXEC_CACHE_TTL: 条目有效期秒数（默认 3600）
+
+    Returns:
+        ExecutionCache 实例，未启用时返回 None
+    """
+    global _execution_cache
+
+    if os.getenv("CODE_EXEC_CACHE", "false").lower() not in ("1", "true", "yes", "on"):
+        return None
+
+    with _execution_cache_lock:
+        if _execution_cache is None:
+            _execution_cache = ExecutionCache(
+                max_entries=int(os.getenv("CODE_EXEC_CACHE_SIZE", "128")),
+                max_bytes=int(float(os.getenv("CODE_EXEC_CACHE_MAX_MB", "16")) * 1024 * 1024),
+                ttl=float(os.getenv("CODE_EXEC_CACHE_TTL", "3600")),
+            )
+    return _execution_cache
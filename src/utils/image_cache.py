@@ -0,0 +1,201 @@
+"""
+生成图片缓存
+以 hash(模型, 提示词, 参考图片内容, 目标宽高比, 温度) 为键，将 PNG 保存到本地目录，按总大小做 LRU 淘汰
+"""
+
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+
+class ImageCache:
+    """内容寻址的 PNG 缓存"""
+
+    def __init__(self, cache_dir: str | Path = ".cache/images", max_bytes: int = 512 * 1024 * 1024):
+        """
+        初始化图片缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: PNG 总大小上限，超出后按最近最少使用淘汰
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._total_bytes = sum(path.stat().st_size for path in self.cache_dir.glob("*.png"))
+
+    @staticmethod
+    def make_key(model: str, prompt: str, image_paths: List[str], target_ratio: float, temperature: float) -> str:
+        """
+        计算缓存键
+
+        本地参考图片按文件内容参与哈希，URL / data URL 按字符串参与哈希。
+
+        Args:
+            model: 图片生成模型
+            prompt: 提示词
+            image_paths: 参考图片（本地路径、URL 或 data URL）
+            target_ratio: 目标宽高比
+            temperature: 采样温度
+
+        Returns:
+            sha256 十六进制字符串
+        """
+        digest = hashlib.sha256()
+        for field in (model, prompt, repr(float(target_ratio)), repr(float(temperature))):
+            digest.update(field.encode("utf-8"))
+            digest.update(b"\0")
+
+        for path in image_paths or []:
+            if path.startswith(("http://", "https://", "data:")) or not os.path.exists(path):
+                digest.update(path.encode("utf-8"))
+            else:
+                with open(path, "rb") as f:
+                    for block in iter(lambda: f.read(1024 * 1024), b""):
+                        digest.update(block)
+            digest.update(b"\0")
+
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.png"
+
+    def get(self, key: str) -> Optional[Image.Image]:
+        """
+        查询缓存
+
+        Args:
+            key: make_key 计算的键
+
+        Returns:
+            命中时返回图片，否则返回 None
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # 更新访问时间，作为 LRU 依据
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return Image.open(io.BytesIO(data)).convert("RGBA")
+
+    def put(self, key: str, image: Image.Image) -> None:
+        """
+        写入缓存
+
+        Args:
+            key: make_key 计算的键
+            image: 生成的图片
+        """
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        data = buffer.getvalue()
+
+        with self._lock:
+            path = self._path(key)
+            if path.exists():
+                self._total_bytes -= path.stat().st_size
+
+            # 先写临时文件再重命名，读取方不会看到写了一半的 PNG
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+            self._total_bytes += len(data)
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        """超出容量时按访问时间淘汰，直到降到上限的 90%（调用方需持有锁）"""
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        target = int(self.max_bytes * 0.9)
+        entries = []
+        for path in self.cache_dir.glob("*.png"):
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        for _, size, path in sorted(entries):
+            if self._total_bytes <= target:
+                break
+            path.unlink(missing_ok=True)
+            self._total_bytes -= size
+
+    def stats(self) -> Dict[str, int]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            包含 hits / misses / entries / bytes / max_bytes 的字典
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": sum(1 for _ in self.cache_dir.glob("*.png")),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        """清空缓存和统计"""
+        with self._lock:
+            for path in self.cache_dir.glob("*.png"):
+                path.unlink(missing_ok=True)
+            self._total_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+# 全局图片缓存实例
+_image_cache: Optional[ImageCache] = None
+_image_cache_lock = threading.Lock()
+
+
+def get_image_cache() -> Optional[ImageCache]:
+    """
+    获取全局图片缓存实例
+
+    通过环境变量配置：
+    - IMAGE_CACHE: 设为 0 / false 时禁用
+    - IMAGE_CACHE_DIR: 缓存目录（默认 .cache/images）
+    - IMAGE_CACHE_MAX_MB: 容量上限（默认 512 MB）
+
+    Returns:
+        ImageCache 实例，禁用时返回 None
+    """
+    global _image_cache
+
+    if os.getenv("IMAGE_CACHE", "true").lower() in ("0", "false", "no", "off"):
+        return None
+
+    with _image_cache_lock:
+        if _image_cache is None:
+            _image_cache = ImageCache(
+                cache_dir=os.getenv("IMAGE_CACHE_DIR", ".cache/images"),
+                max_bytes=int(os.getenv("IMAGE_CACHE_MAX_MB", "512")) * 1024 * 1024,
+            )
+    return _image_cache
+
+
+def image_reuse_enabled() -> bool:
+    """是否开启确定性复用（IMAGE_CACHE_REUSE，默认关闭）：开启后相同输入直接返回缓存的图片"""
+    return os.getenv("IMAGE_CACHE_REUSE", "false").lower() in ("1", "true", "yes", "on")
@@ -1,12 +1,56 @@
 """
 """
-from typing import List, Callable, TypeVar, Any
+from typing import List, Callable, TypeVar, Any, Optional
 from PIL import Image
 import functools
 
+from .image_cache import get_image_cache, image_reuse_enabled
+from .clients import get_ark_client, get_genai_client, get_http_session, get_openai_client
+
 T = TypeVar('T')
 
-def image_generation_tool(text_prompt: str, image_paths: List[str], target_ratio: float=1.0, model: str = "gemini-2.5-flash-image") -> Image.Image:
+def image_generation_tool(text_prompt: str, image_paths: List[str], target_ratio: float=1.0, model: str = "gemini-2.5-flash-image", reuse: Optional[bool] = None) -> Image.Image:
+    """
+    生成图片（带内容寻址缓存）
+
+    生成结果总会写入图片缓存；开启确定性复用时，相同的
+    (模型, 提示词, 参考图片, 宽高比, 温度) 直接返回缓存的图片，不调用后端。
+
+    Args:
+        text_prompt: 提示词
+        image_paths: 参考图片（本地路径、URL 或 data URL）
+        target_ratio: 目标宽高比
+        model: 图片生成模型
+        reuse: 是否复用缓存（None 则读取 IMAGE_CACHE_REUSE，默认关闭）
+
+    Returns:
+        生成的图片
+    """
+    import os
+
+    cache = get_image_cache()
+    if cache is None:
+        return _generate_image(text_prompt, image_paths, target_ratio, model)
+
+    temperature = float(os.getenv('IMAGE_GEN_TEMPERATURE', 0.7))
+    key = cache.make_key(model, text_prompt, image_paths, target_ratio, temperature)
+
+    if reuse if reuse is not None else image_reuse_enabled():
+        cached = cache.get(key)
+        if cached is not None:
+            try:
+                from src.utils.colored_logger import log_success
+                log_success(f"Image cache hit for model={model}")
+            except Exception:
+                pass
+            return cached
+
+    image = _generate_image(text_prompt, image_paths, target_ratio, model)
+    cache.put(key, image)
+    return image
+
+
+def _generate_image(text_prompt: str, image_paths: List[str], target_ratio: float=1.0, model: str = "gemini-2.5-flash-image") -> Image.Image:
     """
     """
     import os
@@ -168,7 +212,6 @@ def image_generation_tool(text_prompt: str, image_paths: List[str], target_ratio
     if "qwen" in model.lower() or model.lower().startswith("qwen"):
         log_debug(f"Selected backend: QWEN (model={model})")
         try:
-            import requests
             import dashscope
             from dashscope import MultiModalConversation
         except Exception as e:
@@ -225,8 +268,7 @@ def image_generation_tool(text_prompt: str, image_paths: List[str], target_ratio
         # otherwise treat as URL
         if isinstance(img_field, str) and img_field.startswith("http"):
             def _download_qwen_image():
-                import requests
-                r = requests.get(img_field, timeout=30)
+                r = get_http_session().get(img_field, timeout=30)
                 r.raise_for_status()
                 return r.content
             
@@ -244,7 +286,7 @@ def image_generation_tool(text_prompt: str, image_paths: List[str], target_ratio
     if "doubao" in model.lower() or "seedream" in model.lower():
         log_debug(f"Selected backend: Doubao/Volcengine Ark (model={model})")
         try:
-            from volcenginesdkarkruntime import Ark
+            import volcenginesdkarkruntime  # noqa: F401
         except Exception as e:
             raise RuntimeError("volcenginesdkarkruntime is required for doubao model. Install it and set ARK_API_KEY.") from e
 
@@ -253,7 +295,7 @@ def image_generation_tool(text_prompt: str, image_paths: List[str], target_ratio
             log_error("ARK_API_KEY environment variable is not set")
             raise RuntimeError("ARK_API_KEY environment variable is not set")
 
-        client = Ark(
+        client = get_ark_client(
             base_url="https://ark.cn-beijing.volces.com/api/v3", 
             api_key=ark_api_key
             )
@@ -290,8 +332,7 @@ def image_generation_tool(text_prompt: str, image_paths: List[str], target_ratio
         b64_field = getattr(data0, "b64", None) or getattr(data0, "base64", None)
         if url:
             def _download_doubao_image():
-                import requests
-                r = requests.get(url, timeout=30)
+                r = get_http_session().get(url, timeout=30)
                 r.raise_for_status()
                 return r.content
             
@@ -320,19 +361,14 @@ def image_generation_tool(text_prompt: str, image_paths: List[str], target_ratio
         log_debug(f"Selected backend: Gemini/GenAI (model={model})")
 
         try:
-            from google import genai
             from google.genai import types
-            from google.genai.types import HttpOptions, Part, FinishReason
+            from google.genai.types import Part, FinishReason
         except Exception as e:
             log_error(f"Google GenAI SDK not available: {e}")
             raise RuntimeError("Google GenAI SDK (google-genai) is required for Gemini backend") from e
 
         try:
-            if os.environ.get("GOOGLE_GENAI_USE_VERTEXAI", "False") == "True":
-                genai_client = genai.Client(http_options=HttpOptions(api_version="v1"))
-            else:
-                genai_client = genai.Client()
-                
+            genai_client = get_genai_client(vertexai=os.environ.get("GOOGLE_GENAI_USE_VERTEXAI", "False") == "True")
         except Exception as e:
             log_error(f"Failed to initialize GenAI client: {e}")
             raise RuntimeError("Failed to initialize Google GenAI client") from e
@@ -363,8 +399,7 @@ def image_generation_tool(text_prompt: str, image_paths: List[str], target_ratio
             elif isinstance(p, str) and p.startswith("http"):
                 try:
                     def _download_image_for_gemini():
-                        import requests
-                        r = requests.get(p, timeout=30)
+                        r = get_http_session().get(p, timeout=30)
                         r.raise_for_status()
                         return r.content, r.headers.get("Content-Type", "image/png")
                     
@@ -439,7 +474,7 @@ def image_generation_tool(text_prompt: str, image_paths: List[str], target_ratio
     if "openai" in model.lower() or "gpt" in model.lower() or "gpt-image" in model.lower() or "gptimage" in model.lower():
         log_debug(f"Selected backend: OpenAI/Azure (model={model})")
         try:
-            from openai import OpenAI
+            import openai  # noqa: F401
         except Exception as e:
             raise RuntimeError("openai is required for openai model. Install it and set AZURE_API_KEY.") from e
 
@@ -452,11 +487,11 @@ def image_generation_tool(text_prompt: str, image_paths: List[str], target_ratio
             log_error("AZURE_API_KEY environment variable is not set")
             raise RuntimeError("AZURE_API_KEY environment variable is not set")
 
-        # Initialize OpenAI client with Azure endpoint
-        client = OpenAI(
+        # Reuse the pooled OpenAI client for this Azure endpoint
+        client = get_openai_client(
             base_url=azure_endpoint,
             api_key=openai_api_key,
-            default_headers={"api_version": api_version}
+            api_version=api_version
         )
 
         # Map target_ratio to size options
@@ -503,8 +538,7 @@ def image_generation_tool(text_prompt: str, image_paths: List[str], target_ratio
                         image_files.append(file_obj)
                     elif isinstance(img_data_url, str) and img_data_url.startswith("http"):
                         def _download_image_for_openai():
-                            import requests
-                            r = requests.get(img_data_url, timeout=30)
+                            r = get_http_session().get(img_data_url, timeout=30)
                             r.raise_for_status()
                             return r.content, r.headers.get("Content-Type", "image/png")
                         
@@ -610,8 +644,7 @@ def image_generation_tool(text_prompt: str, image_paths: List[str], target_ratio
                     return img
                 elif hasattr(data_item, 'url') and data_item.url:
                     def _download_openai_image():
-                        import requests
-                        r = requests.get(data_item.url, timeout=30)
+                        r = get_http_session().get(data_item.url, timeout=30)
                         r.raise_for_status()
                         return r.content
                     
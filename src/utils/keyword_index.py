@@ -0,0 +1,145 @@
+"""
+关键词倒排索引
+term → postings 倒排表 + BM25 排序，支持增量添加文本块
+"""
+
+import math
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .tokenizer import Tokenizer, get_tokenizer
+
+if TYPE_CHECKING:
+    from .pdf_processor import TextChunk
+
+
+class KeywordIndex:
+    """BM25 关键词索引"""
+
+    def __init__(
+        self,
+        tokenizer: Optional[Tokenizer] = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+        phrase_boost: float = 2.0,
+    ):
+        """
+        初始化关键词索引
+
+        Args:
+            tokenizer: 分词器（None 则按 KEYWORD_TOKENIZER 创建）
+            k1: BM25 词频饱和参数
+            b: BM25 文档长度归一化参数
+            phrase_boost: 完整查询短语出现时的加分（乘以当前最高 BM25 分数）
+        """
+        self.tokenizer = tokenizer or get_tokenizer()
+        self.k1 = k1
+        self.b = b
+        self.phrase_boost = phrase_boost
+
+        self.chunks: List["TextChunk"] = []
+        self._postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self._doc_lens: List[int] = []
+        self._total_len = 0
+
+        # 查询时使用的 numpy 视图，add 之后失效并按需重建
+        self._posting_arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._length_norm: Optional[np.ndarray] = None
+
+    def add(self, chunks: List["TextChunk"]) -> None:
+        """
+        增量添加文本块
+
+        Args:
+            chunks: 文本块列表
+        """
+        for chunk in chunks:
+            doc_id = len(self.chunks)
+            self.chunks.append(chunk)
+
+            terms = self.tokenizer(chunk.content)
+            self._doc_lens.append(len(terms))
+            self._total_len += len(terms)
+
+            for term, tf in Counter(terms).items():
+                doc_ids, tfs = self._postings.setdefault(term, ([], []))
+                doc_ids.append(doc_id)
+                tfs.append(tf)
+                self._posting_arrays.pop(term, None)
+
+        if chunks:
+            self._length_norm = None
+
+    def _get_postings(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """获取 term 的 (doc_ids, tfs) 数组"""
+        arrays = self._posting_arrays.get(term)
+        if arrays is None:
+            postings = self._postings.get(term)
+            if postings is None:
+                return None
+            arrays = (np.asarray(postings[0], dtype=np.int64), np.asarray(postings[1], dtype=np.float32))
+            self._posting_arrays[term] = arrays
+        return arrays
+
+    def _get_length_norm(self) -> np.ndarray:
+        """BM25 分母中的 k1 * (1 - b + b * dl / avgdl)"""
+        if self._length_norm is None:
+            doc_lens = np.asarray(self._doc_lens, dtype=np.float32)
+            avgdl = self._total_len / len(doc_lens) if len(doc_lens) and self._total_len else 1.0
+            self._length_norm = self.k1 * (1 - self.b + self.b * doc_lens / avgdl)
+        return self._length_norm
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[float, "TextChunk"]]:
+        """
+        BM25 检索
+
+        只访问查询词的倒排表；短语加分只在 BM25 候选集上检查。
+
+        Args:
+            query: 搜索查询
+            top_k: 返回前 k 个结果
+
+        Returns:
+            (分数, 文本块) 列表，按分数降序
+        """
+        n_docs = len(self.chunks)
+        query_terms = list(dict.fromkeys(self.tokenizer.query_terms(query)))
+        if not n_docs or not query_terms or top_k <= 0:
+            return []
+
+        length_norm = self._get_length_norm()
+        scores = np.zeros(n_docs, dtype=np.float32)
+        matched = False
+
+        for term in query_terms:
+            postings = self._get_postings(term)
+            if postings is None:
+                continue
+            doc_ids, tfs = postings
+            df = len(doc_ids)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            scores[doc_ids] += idf * tfs * (self.k1 + 1) / (tfs + length_norm[doc_ids])
+            matched = True
+
+        if not matched:
+            return []
+
+        candidates = np.flatnonzero(scores)
+        # 短语加分可能改变排序，先取一个比 top_k 更大的候选集
+        n_candidates = min(len(candidates), max(top_k * 5, 50))
+        top = candidates[np.argpartition(-scores[candidates], n_candidates - 1)[:n_candidates]]
+
+        phrase = query.strip().lower()
+        if self.phrase_boost and len(query_terms) > 1 and phrase:
+            boost = self.phrase_boost * float(scores[top].max())
+            for doc_id in top:
+                if phrase in self.chunks[doc_id].content.lower():
+                    scores[doc_id] += boost
+
+        top = top[np.argsort(-scores[top], kind="stable")][:top_k]
+        return [(float(scores[i]), self.chunks[i]) for i in top]
+
+    def __len__(self) -> int:
+        return len(self.chunks)
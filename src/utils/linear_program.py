@@ -0,0 +1,474 @@
+"""
+线性规划 / 整数线性规划的进程内求解
+由 JSON 问题描述（变量、目标、约束）构造稀疏约束矩阵，用 scipy.optimize.linprog / milp（HiGHS）直接求解，
+不需要生成代码和启动子进程；也提供把文本中显式写出的线性规划解析为问题描述的简单解析器
+
+问题描述格式：
+{
+    "sense": "maximize" | "minimize",
+    "objective": {"x": 3, "y": 2},             # 变量系数，可选 "objective_constant"
+    "variables": [{"name": "x", "lower": 0, "upper": null, "integer": false}, ...],
+    "constraints": [{"name": "c1", "coefficients": {"x": 1, "y": 1}, "sense": "<=", "rhs": 4}, ...]
+}
+variables 中未给出的上下界表示无界；目标或约束中出现但未声明的变量报错
+"""
+
+import math
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+
+# linprog / milp 的状态码（两者一致）
+_STATUS = {0: "optimal", 1: "iteration_limit", 2: "infeasible", 3: "unbounded"}
+_SENSES = {"<=": "<=", "=<": "<=", "<": "<=", ">=": ">=", "=>": ">=", ">": ">=", "=": "=", "==": "="}
+
+
+class LinearProgramError(ValueError):
+    """问题描述不合法或无法解析"""
+
+
+@dataclass
+class LinearProgram:
+    """编译后的线性规划：目标向量、稀疏约束矩阵和变量上下界"""
+    variables: List[str]
+    objective: np.ndarray
+    maximize: bool
+    A_ub: sparse.csr_array
+    b_ub: np.ndarray
+    A_eq: sparse.csr_array
+    b_eq: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+    integrality: np.ndarray
+    objective_constant: float = 0.0
+    spec: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+    @property
+    def is_integer(self) -> bool:
+        return bool(self.integrality.any())
+
+    @classmethod
+    def from_spec(cls, spec: Dict[str, Any]) -> "LinearProgram":
+        """
+        由问题描述构造
+
+        Args:
+            spec: 问题描述字典（格式见模块说明）
+
+        Returns:
+            LinearProgram 实例
+
+        Raises:
+            LinearProgramError: 问题描述不合法
+        """
+        if not isinstance(spec, dict):
+            raise LinearProgramError("Problem spec must be an object")
+
+        sense = str(spec.get("sense", "minimize")).lower()
+        if sense not in ("maximize", "max", "minimize", "min"):
+            raise LinearProgramError(f"Unknown objective sense: {sense}")
+
+        declared = spec.get("variables")
+        if not isinstance(declared, list) or not declared:
+            raise LinearProgramError("Problem spec has no variables")
+
+        variables = []
+        lower, upper, integrality = [], [], []
+        for variable in declared:
+            if isinstance(variable, str):
+                variable = {"name": variable}
+            name = variable.get("name") if isinstance(variable, dict) else None
+            if not isinstance(name, str) or not name or name in variables:
+                raise LinearProgramError(f"Invalid or duplicate variable: {variable!r}")
+            variables.append(name)
+            lower.append(_bound(variable.get("lower"), -math.inf))
+            upper.append(_bound(variable.get("upper"), math.inf))
+            integrality.append(1 if _flag(variable.get("integer"), f"variable {name} integer") else 0)
+
+        index = {name: i for i, name in enumerate(variables)}
+        objective = np.zeros(len(variables))
+        for name, coefficient in _coefficients(spec.get("objective"), "objective").items():
+            objective[_column(index, name)] = coefficient
+
+        # 按 (行, 列, 系数) 收集非零元，一次构造稀疏矩阵
+        triplets = {"<=": ([], [], []), "=": ([], [], [])}
+        rhs = {"<=": [], "=": []}
+        for number, constraint in enumerate(spec.get("constraints") or []):
+            if not isinstance(constraint, dict):
+                raise LinearProgramError(f"Constraint {number} must be an object")
+            constraint_sense = _SENSES.get(str(constraint.get("sense", "")).strip())
+            if constraint_sense is None:
+                raise LinearProgramError(f"Constraint {number} has an unknown sense: {constraint.get('sense')!r}")
+            value = _number(constraint.get("rhs", 0), f"constraint {number} rhs")
+            coefficients = _coefficients(constraint.get("coefficients"), f"constraint {number}")
+
+            # >= 约束取负后作为 <= 约束
+            sign = -1.0 if constraint_sense == ">=" else 1.0
+            kind = "=" if constraint_sense == "=" else "<="
+            rows, cols, vals = triplets[kind]
+            row = len(rhs[kind])
+            for name, coefficient in coefficients.items():
+                rows.append(row)
+                cols.append(_column(index, name))
+                vals.append(sign * coefficient)
+            rhs[kind].append(sign * value)
+
+        def matrix(kind):
+            rows, cols, vals = triplets[kind]
+            shape = (len(rhs[kind]), len(variables))
+            return sparse.coo_array((vals, (rows, cols)), shape=shape).tocsr()
+
+        lower_array, upper_array = np.array(lower), np.array(upper)
+        if np.any(lower_array > upper_array):
+            raise LinearProgramError("A variable has a lower bound above its upper bound")
+
+        return cls(
+            variables=variables,
+            objective=objective,
+            maximize=sense in ("maximize", "max"),
+            A_ub=matrix("<="),
+            b_ub=np.array(rhs["<="], dtype=float),
+            A_eq=matrix("="),
+            b_eq=np.array(rhs["="], dtype=float),
+            lower=lower_array,
+            upper=upper_array,
+            integrality=np.array(integrality),
+            objective_constant=_number(spec.get("objective_constant", 0), "objective_constant"),
+            spec=spec,
+        )
+
+    def describe(self) -> str:
+        """数学模型的文本形式（用于展示）"""
+        lines = [f"{'maximize' if self.maximize else 'minimize'} {_expression(self.spec.get('objective') or {})}"
+                 + (f" + {_fmt(self.objective_constant)}" if self.objective_constant else "")]
+
+        constraints = self.spec.get("constraints") or []
+        for constraint in constraints:
+            sense = _SENSES[str(constraint["sense"]).strip()]
+            lines.append(f"{'s.t.' if constraint is constraints[0] else '    '} "
+                         f"{_expression(constraint['coefficients'])} {sense} {_fmt(float(constraint.get('rhs', 0)))}")
+
+        for name, low, high, integer in zip(self.variables, self.lower, self.upper, self.integrality):
+            if math.isfinite(low) and math.isfinite(high):
+                bound = f"{_fmt(low)} <= {name} <= {_fmt(high)}"
+            elif math.isfinite(low):
+                bound = f"{name} >= {_fmt(low)}"
+            elif math.isfinite(high):
+                bound = f"{name} <= {_fmt(high)}"
+            else:
+                bound = f"{name} free"
+            lines.append(f"     {bound}" + (", integer" if integer else ""))
+        return "\n".join(lines)
+
+
+@dataclass
+class LPSolution:
+    """求解结果"""
+    status: str  # optimal / infeasible / unbounded / iteration_limit / error
+    message: str
+    objective: Optional[float] = None
+    values: Dict[str, float] = field(default_factory=dict)
+    solve_time: float = 0.0  # 秒
+
+    @property
+    def optimal(self) -> bool:
+        return self.status == "optimal"
+
+
+def solve_linear_program(program: LinearProgram) -> LPSolution:
+    """
+    用 HiGHS 求解：含整数变量时用 milp，否则用 linprog
+
+    Args:
+        program: LinearProgram 实例
+
+    Returns:
+        LPSolution
+    """
+    started = time.perf_counter()
+    # 两个求解器都只做最小化
+    c = -program.objective if program.maximize else program.objective
+    has_ub, has_eq = program.A_ub.shape[0] > 0, program.A_eq.shape[0] > 0
+
+    if program.is_integer:
+        constraints = []
+        if has_ub:
+            constraints.append(LinearConstraint(program.A_ub, -np.inf, program.b_ub))
+        if has_eq:
+            constraints.append(LinearConstraint(program.A_eq, program.b_eq, program.b_eq))
+        result = milp(c, constraints=constraints, integrality=program.integrality,
+                      bounds=Bounds(program.lower, program.upper))
+    else:
+        result = linprog(
+            c,
+            A_ub=program.A_ub if has_ub else None, b_ub=program.b_ub if has_ub else None,
+            A_eq=program.A_eq if has_eq else None, b_eq=program.b_eq if has_eq else None,
+            bounds=np.column_stack([program.lower, program.upper]),
+            method="highs",
+        )
+
+    solution = LPSolution(
+        status=_STATUS.get(result.status, "error"),
+        message=str(result.message),
+        solve_time=time.perf_counter() - started,
+    )
+    if solution.optimal:
+        value = float(c @ result.x)
+        solution.objective = (-value if program.maximize else value) + program.objective_constant
+        solution.values = dict(zip(program.variables, map(float, result.x)))
+    return solution
+
+
+# ---------------------------------------------------------------------------
+# 文本解析：只识别显式写出的线性表达式，无法完整理解的文本返回 None，交给模型处理
+# ---------------------------------------------------------------------------
+
+_NUMBER = r"(?:\d+(?:\.\d*)?|\.\d+)"
+_TERM = re.compile(rf"([+-]?)({_NUMBER})?(\*?)([A-Za-z_][A-Za-z0-9_]*)?")
+_VARIABLE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_LIST_MARKER = re.compile(r"^(?:[-*•]\s+|\d+(?:[.)]\s+|、)|\(\d+\)\s*|（\d+）\s*)")
+_LABEL = re.compile(r"^(?:s\.\s?t\.|subject\s+to|约束条件|约束|目标函数|目标|objective)\s*[:：]?\s*", re.IGNORECASE)
+_OBJECTIVE = re.compile(
+    r"^(maximize|minimize|maximise|minimise|max|min|最大化|最小化)\s*[:：]?\s*(?:[A-Za-z_]\w*\s*=\s*)?(.+)$",
+    re.IGNORECASE,
+)
+_INTEGER = re.compile(
+    r"^([A-Za-z_]\w*(?:\s*[,，、]\s*[A-Za-z_]\w*)*)\s*(?:均为|都是|为|是|are|is|must\s+be|∈|in)?\s*"
+    r"(?:非负)?(?:整数|integers?|int|Z|ℤ)$",
+    re.IGNORECASE,
+)
+_COMPARISON = re.compile(r"(<=|>=|=<|=>|==|<|>|=)")
+_VARIABLE_LIST = re.compile(r"^[A-Za-z_]\w*(?:\s*[,，、]\s*[A-Za-z_]\w*)+$")
+
+_REPLACEMENTS = {
+    "≤": "<=", "≦": "<=", "⩽": "<=", "≥": ">=", "≧": ">=", "⩾": ">=", "＝": "=", "−": "-", "＋": "+",
+    "×": "*", "·": "*", "＜": "<", "＞": ">", "：": ":", "；": ";",
+}
+
+
+def parse_linear_program(text: str) -> Optional[Dict[str, Any]]:
+    """
+    把显式写出的线性规划解析为问题描述
+
+    支持 "最大化 z = 3x + 2y"、"x + y <= 4"、"x, y >= 0"、"x, y 为整数" 这类逐行书写的模型。
+    任何含数字或变量名的行无法识别时放弃解析（返回 None），避免遗漏约束。
+
+    Args:
+        text: 问题文本
+
+    Returns:
+        问题描述字典，无法完整解析时返回 None
+    """
+    for old, new in _REPLACEMENTS.items():
+        text = text.replace(old, new)
+
+    objective = None
+    sense = None
+    constraints: List[Dict[str, Any]] = []
+    bounds: Dict[str, List[float]] = {}
+    integers: List[str] = []
+    skipped: List[str] = []
+
+    for raw_line in text.splitlines():
+        for piece in _split_statements(raw_line):
+            line = _LABEL.sub("", _LIST_MARKER.sub("", piece.strip())).strip().rstrip("。.")
+            if not line:
+                continue
+
+            match = _OBJECTIVE.match(line)
+            if match and objective is None:
+                expression = _parse_expression(match.group(2))
+                if expression is None:
+                    return None
+                sense = "maximize" if match.group(1).lower() in ("maximize", "maximise", "max", "最大化") else "minimize"
+                objective = expression
+                continue
+
+            match = _INTEGER.match(line)
+            if match:
+                integers.extend(re.split(r"\s*[,，、]\s*", match.group(1)))
+                continue
+
+            if _COMPARISON.search(line):
+                if not _parse_comparison(line, constraints, bounds):
+                    return None
+                continue
+
+            skipped.append(line)
+
+    if objective is None:
+        return None
+
+    coefficients, objective_constant = objective
+    names = list(coefficients)
+    for constraint in constraints:
+        names.extend(constraint["coefficients"])
+    names.extend(bounds)
+    names.extend(integers)
+    names = list(dict.fromkeys(names))
+
+    # 未识别的行如果提到数字或变量，说明还有没理解的条件
+    for line in skipped:
+        if re.search(r"\d", line) or any(re.search(rf"(?<![A-Za-z0-9_]){re.escape(name)}(?![A-Za-z0-9_])", line)
+                                         for name in names):
+            return None
+
+    variables = []
+    for name in names:
+        low, high = bounds.get(name, [None, None])
+        variables.append({"name": name, "lower": low, "upper": high, "integer": name in integers})
+
+    return {
+        "sense": sense,
+        "objective": coefficients,
+        "objective_constant": objective_constant,
+        "variables": variables,
+        "constraints": constraints,
+    }
+
+
+def _split_statements(line: str) -> List[str]:
+    """按分号拆分；逗号分隔的多个比较式（"x + y <= 4, x >= 0"）也拆开，"x, y >= 0" 保持不变"""
+    pieces = []
+    for statement in line.split(";"):
+        parts = re.split(r"[,，]", statement)
+        if len(parts) > 1 and all(_COMPARISON.search(part) for part in parts):
+            pieces.extend(parts)
+        else:
+            pieces.append(statement)
+    return pieces
+
+
+def _parse_expression(expression: str) -> Optional[tuple]:
+    """解析线性表达式，返回 (变量系数字典, 常数项)；不是线性表达式时返回 None"""
+    expression = re.sub(r"\s+", "", expression)
+    if not expression:
+        return None
+
+    coefficients: Dict[str, float] = {}
+    constant = 0.0
+    position = 0
+    while position < len(expression):
+        match = _TERM.match(expression, position)
+        sign, number, star, name = match.groups()
+        if match.end() == position or (number is None and name is None) or (star and (number is None or name is None)):
+            return None
+        if position > 0 and not sign:
+            return None
+        value = float(number) if number is not None else 1.0
+        if sign == "-":
+            value = -value
+        if name is None:
+            constant += value
+        else:
+            coefficients[name] = coefficients.get(name, 0.0) + value
+        position = match.end()
+
+    return coefficients, constant
+
+
+def _parse_comparison(line: str, constraints: List[Dict[str, Any]], bounds: Dict[str, List[float]]) -> bool:
+    """解析比较式（可以是 "0 <= x <= 4" 这样的链式比较），单变量的转为上下界"""
+    parts = _COMPARISON.split(line)
+    sides, operators = parts[0::2], parts[1::2]
+
+    if len(operators) == 1 and _VARIABLE_LIST.match(sides[0].strip()):
+        # "x, y >= 0"：每个变量同一个界
+        value = _parse_expression(sides[1])
+        if value is None or value[0]:
+            return False
+        for name in re.split(r"\s*[,，、]\s*", sides[0].strip()):
+            _add_bound(bounds, name, _SENSES[operators[0]], value[1])
+        return True
+
+    expressions = [_parse_expression(side) for side in sides]
+    if any(expression is None for expression in expressions):
+        return False
+
+    for (left, left_constant), operator, (right, right_constant) in zip(expressions, operators, expressions[1:]):
+        coefficients = dict(left)
+        for name, coefficient in right.items():
+            coefficients[name] = coefficients.get(name, 0.0) - coefficient
+        coefficients = {name: coefficient for name, coefficient in coefficients.items() if coefficient != 0}
+        rhs = right_constant - left_constant
+        sense = _SENSES[operator]
+
+        if not coefficients:
+            return False
+        if len(coefficients) == 1 and sense != "=":
+            (name, coefficient), = coefficients.items()
+            if coefficient < 0:
+                sense = "<=" if sense == ">=" else ">="
+            # + 0.0 把 -0.0 规范为 0.0
+            _add_bound(bounds, name, sense, rhs / coefficient + 0.0)
+        else:
+            constraints.append({"coefficients": coefficients, "sense": sense, "rhs": rhs})
+    return True
+
+
+def _add_bound(bounds: Dict[str, List[float]], name: str, sense: str, value: float) -> None:
+    bound = bounds.setdefault(name, [None, None])
+    if sense == ">=":
+        bound[0] = value if bound[0] is None else max(bound[0], value)
+    else:
+        bound[1] = value if bound[1] is None else min(bound[1], value)
+
+
+def _bound(value: Any, default: float) -> float:
+    if value is None:
+        return default
+    return _number(value, "bound")
+
+
+def _number(value: Any, what: str) -> float:
+    if isinstance(value, bool):
+        raise LinearProgramError(f"Invalid number for {what}: {value!r}")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise LinearProgramError(f"Invalid number for {what}: {value!r}")
+    if math.isnan(number):
+        raise LinearProgramError(f"Invalid number for {what}: {value!r}")
+    return number
+
+
+def _flag(value: Any, what: str) -> bool:
+    # 只接受 JSON 布尔值（缺省为 false），"false" 之类的字符串报错而不是按真值处理
+    if value is None:
+        return False
+    if not isinstance(value, bool):
+        raise LinearProgramError(f"Invalid boolean for {what}: {value!r}")
+    return value
+
+
+def _coefficients(value: Any, what: str) -> Dict[str, float]:
+    if not isinstance(value, dict) or not value:
+        raise LinearProgramError(f"{what} must map variable names to coefficients")
+    return {str(name): _number(coefficient, what) for name, coefficient in value.items()}
+
+
+def _column(index: Dict[str, int], name: str) -> int:
+    if name not in index:
+        raise LinearProgramError(f"Undeclared variable: {name}")
+    return index[name]
+
+
+def _fmt(value: float) -> str:
+    return f"{value:g}"
+
+
+def _expression(coefficients: Dict[str, Any]) -> str:
+    """系数字典的文本形式（如 3 x + 2 y - z）"""
+    terms = []
+    for name, coefficient in coefficients.items():
+        coefficient = float(coefficient)
+        sign = "-" if coefficient < 0 else "+"
+        magnitude = abs(coefficient)
+        term = name if magnitude == 1 else f"{_fmt(magnitude)} {name}"
+        terms.append(f"{sign} {term}" if terms else ("-" if sign == "-" else "") + term)
+    return " ".join(terms)
@@ -0,0 +1,208 @@
+"""
+材料持久化存储
+将解析后的材料（文本块、页面索引、关键词索引、embedding）按文件内容 sha256 保存到磁盘，
+进程重启后可直接加载；文件修改后自动失效
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .colored_logger import log_warning
+from .pdf_processor import PDFProcessor
+from .vector_store import VectorStore
+
+# 存储格式版本，格式变化时递增以使旧数据失效
+STORE_FORMAT_VERSION = 2
+
+
+class MaterialStore:
+    """按内容哈希寻址的材料存储"""
+
+    def __init__(self, root: str | Path = ".cache/materials"):
+        """
+        初始化材料存储
+
+        Args:
+            root: 存储根目录
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.root / "manifest.json"
+        self._lock = threading.Lock()
+        self._manifest: Dict[str, Dict] = self._read_manifest()
+
+    def _read_manifest(self) -> Dict[str, Dict]:
+        """读取 路径 → (mtime, size, sha256) 清单"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write_manifest(self) -> None:
+        """原子地写回清单（调用方需持有锁）"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".json")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self._manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    @staticmethod
+    def _stat(path: Path) -> Tuple[int, int]:
+        stat = path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def fingerprint(self, material_path: str | Path) -> str:
+        """
+        计算文件内容的 sha256
+
+        mtime 和大小与清单记录一致时直接返回记录的哈希，不读取文件；
+        内容已改变时删除不再被引用的旧版本。
+
+        Args:
+            material_path: 材料文件路径
+
+        Returns:
+            sha256 十六进制字符串
+        """
+        material_path = Path(material_path).absolute()
+        key = str(material_path)
+        mtime_ns, size = self._stat(material_path)
+
+        with self._lock:
+            entry = self._manifest.get(key)
+            if entry and entry["mtime_ns"] == mtime_ns and entry["size"] == size:
+                return entry["sha256"]
+
+        digest = hashlib.sha256()
+        with open(material_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        sha256 = digest.hexdigest()
+
+        with self._lock:
+            previous = self._manifest.get(key, {}).get("sha256")
+            self._manifest[key] = {"mtime_ns": mtime_ns, "size": size, "sha256": sha256}
+            self._write_manifest()
+
+        if previous and previous != sha256:
+            self._remove_if_unreferenced(previous)
+
+        return sha256
+
+    @staticmethod
+    def _config(processor: PDFProcessor, vector_store: VectorStore) -> Dict:
+        """影响解析结果的配置；与存储时不同则视为未命中"""
+        return {
+            "format": STORE_FORMAT_VERSION,
+            "chunk_size": processor.chunk_size,
+            "chunk_overlap": processor.chunk_overlap,
+            "tokenizer": processor.tokenizer.name,
+            "embedding_model": vector_store.embedding_model,
+            "index": vector_store.index.name,
+        }
+
+    def load(self, material_path: str | Path, processor: PDFProcessor, vector_store: VectorStore) -> Optional[Tuple[PDFProcessor, VectorStore]]:
+        """
+        加载已保存的材料
+
+        Args:
+            material_path: 材料文件路径
+            processor: 提供期望配置的空处理器
+            vector_store: 用于承载向量的空向量存储
+
+        Returns:
+            (处理器, 向量存储)；未保存、文件已修改或配置不一致时返回 None
+        """
+        entry_dir = self.root / self.fingerprint(material_path)
+
+        try:
+            with open(entry_dir / "meta.json", 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta != self._config(processor, vector_store):
+                return None
+
+            with open(entry_dir / "processor.pkl", 'rb') as f:
+                stored_processor: PDFProcessor = pickle.load(f)
+
+            vector_store.load(entry_dir, stored_processor.chunks)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # 损坏或与当前代码不兼容的旧数据（如类 / 模块改名后反序列化失败），重新解析
+            log_warning(f"Stored material {entry_dir.name} is unreadable, rebuilding: {e!r}")
+            return None
+
+        return stored_processor, vector_store
+
+    def save(self, material_path: str | Path, processor: PDFProcessor, vector_store: VectorStore) -> None:
+        """
+        保存解析结果
+
+        先写入临时目录再原子重命名，多个进程同时保存同一材料也是安全的。
+
+        Args:
+            material_path: 材料文件路径
+            processor: 已加载的处理器
+            vector_store: 已生成 embedding 的向量存储
+        """
+        sha256 = self.fingerprint(material_path)
+        entry_dir = self.root / sha256
+
+        tmp_dir = Path(tempfile.mkdtemp(dir=self.root, prefix=f".{sha256[:8]}-"))
+        try:
+            with open(tmp_dir / "processor.pkl", 'wb') as f:
+                pickle.dump(processor, f, protocol=pickle.HIGHEST_PROTOCOL)
+            vector_store.save(tmp_dir)
+            with open(tmp_dir / "meta.json", 'w', encoding='utf-8') as f:
+                json.dump(self._config(processor, vector_store), f)
+
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _remove_if_unreferenced(self, sha256: str) -> None:
+        """删除不再被任何路径引用的旧版本"""
+        with self._lock:
+            referenced = any(entry["sha256"] == sha256 for entry in self._manifest.values())
+        if not referenced:
+            shutil.rmtree(self.root / sha256, ignore_errors=True)
+
+    def clear(self) -> None:
+        """删除所有已保存的材料"""
+        with self._lock:
+            shutil.rmtree(self.root, ignore_errors=True)
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._manifest = {}
+
+
+# 全局材料存储实例
+_material_store: Optional[MaterialStore] = None
+
+
+def get_material_store() -> Optional[MaterialStore]:
+    """
+    获取全局材料存储实例
+
+    通过环境变量配置：
+    - MATERIAL_STORE: 设为 0 / false 时禁用
+    - MATERIAL_STORE_DIR: 存储目录（默认 .cache/materials）
+
+    Returns:
+        MaterialStore 实例，禁用时返回 None
+    """
+    global _material_store
+
+    if os.getenv("MATERIAL_STORE", "true").lower() in ("0", "false", "no", "off"):
+        return None
+
+    if _material_store is None:
+        _material_store = MaterialStore(os.getenv("MATERIAL_STORE_DIR", ".cache/materials"))
+    return _material_store
@@ -3,24 +3,48 @@
 为 LLM agent 提供可调用的工具函数
 """
 
-from typing import List, Dict, Any, Optional
+import threading
+import uuid
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from .pdf_processor import PDFProcessor, TextChunk
 from .vector_store import VectorStore
+from .material_store import MaterialStore, get_material_store
 
 
 class MaterialManager:
     """材料管理器"""
     
-    def __init__(self):
+    SUPPORTED_SUFFIXES = ('.pdf', '.txt', '.md')
+    
+    def __init__(self, store: Optional[MaterialStore] = None):
+        """
+        初始化材料管理器
+        
+        Args:
+            store: 材料持久化存储（None 则使用全局存储，可通过 MATERIAL_STORE=0 禁用）
+        """
         self.pdf_processors: Dict[str, PDFProcessor] = {}
         self.vector_stores: Dict[str, VectorStore] = {}
         self.current_material: Optional[str] = None
+        self.store = store if store is not None else get_material_store()
+        # 实例标识（进程内唯一，不像 id() 会被回收后的新对象复用），与版本号一起作为缓存的材料版本
+        self.instance_id = uuid.uuid4().hex
+        # 已加载材料的版本号，每次（重新）加载或清除材料时递增，用于使依赖材料内容的缓存失效
+        self.version = 0
+        # 加载时文件的 (mtime_ns, size)，用于发现文件修改
+        self._file_stats: Dict[str, Tuple[int, int]] = {}
+        # 每个材料一把锁：多个会话在线程中同时加载同一文件时只解析一次
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._load_locks_guard = threading.Lock()
     
     def load_material(self, material_path: str | Path, force_reload: bool = False) -> Dict[str, Any]:
         """
         加载材料文件（带缓存）
         
+        依次查找内存缓存、磁盘存储，都未命中（或文件已修改）时才解析文件并生成 embedding。
+        
         Args:
             material_path: 材料文件路径
             force_reload: 是否强制重新加载（默认 False，使用缓存）
@@ -31,77 +55,117 @@ class MaterialManager:
         material_path = Path(material_path)
         material_key = str(material_path.absolute())  # 使用绝对路径作为 key
         
-        # 检查缓存
-        if not force_reload and material_key in self.pdf_processors:
-            # 材料已加载，返回缓存的摘要信息
+        if material_path.suffix.lower() not in self.SUPPORTED_SUFFIXES:
+            raise ValueError(f"Unsupported file type: {material_path.suffix}")
+        
+        with self._load_locks_guard:
+            load_lock = self._load_locks.setdefault(material_key, threading.Lock())
+        
+        with load_lock:
+            return self._load_material_locked(material_path, material_key, force_reload)
+    
+    def _load_material_locked(self, material_path: Path, material_key: str, force_reload: bool) -> Dict[str, Any]:
+        """load_material 的实现（调用方需持有该材料的锁）"""
+        stat = material_path.stat()
+        file_stat = (stat.st_mtime_ns, stat.st_size)
+        
+        # 检查内存缓存（文件修改后失效）
+        if (not force_reload and material_key in self.pdf_processors
+                and self._file_stats.get(material_key) == file_stat):
             self.current_material = material_key
-            processor = self.pdf_processors[material_key]
+            summary = self._build_summary(material_path, self.pdf_processors[material_key])
+            summary['cached'] = True
+            summary['cache_source'] = 'memory'
+            return summary
+        
+        processor = PDFProcessor(chunk_size=1000, chunk_overlap=200)
+        vector_store = VectorStore()
+        
+        # 检查磁盘存储（按内容哈希寻址）
+        stored = None
+        if self.store is not None and not force_reload:
+            stored = self.store.load(material_path, processor, vector_store)
+        
+        if stored is not None:
+            processor, vector_store = stored
+            summary = self._build_summary(material_path, processor)
+            summary['cached'] = True
+            summary['cache_source'] = 'disk'
+        else:
+            failures = self._ingest(material_path, processor, vector_store)
+            # 有 embedding 失败时不落盘，下次加载重试
+            if self.store is not None and failures == 0:
+                self.store.save(material_path, processor, vector_store)
+            summary = self._build_summary(material_path, processor)
+            summary['cached'] = False
+            summary['embedding_failures'] = failures
+        
+        self.pdf_processors[material_key] = processor
+        self.vector_stores[material_key] = vector_store
+        self._file_stats[material_key] = file_stat
+        self.current_material = material_key
+        self._bump_version()
+        
+        return summary
+    
+    @staticmethod
+    def _ingest(material_path: Path, processor: PDFProcessor, vector_store: VectorStore) -> int:
+        """
+        解析材料文件并生成 embedding
+        
+        Args:
+            material_path: 材料文件路径
+            processor: 空处理器
+            vector_store: 空向量存储
             
-            if material_path.suffix.lower() == '.pdf':
-                summary = processor.get_summary()
-                summary['file_name'] = material_path.name
-                summary['file_type'] = 'pdf'
-                summary['cached'] = True
-                return summary
-            else:
-                return {
-                    'file_name': material_path.name,
-                    'file_type': material_path.suffix[1:],
-                    'total_chunks': len(processor.chunks),
-                    'total_characters': len(processor.full_text),
-                    'cached': True
-                }
-        
-        # 未缓存，需要加载
+        Returns:
+            embedding 失败的文本块数量
+        """
         if material_path.suffix.lower() == '.pdf':
-            # 加载 PDF
-            processor = PDFProcessor(chunk_size=1000, chunk_overlap=200)
-            full_text = processor.load_pdf(material_path)
+            # 边提取边生成 embedding：攒够一轮并发批次再提交，避免小分片产生大量小请求
+            pending: List[TextChunk] = []
+            failures = 0
+            flush_size = vector_store.batch_size * vector_store.max_concurrency
             
-            # 创建向量存储
-            vector_store = VectorStore()
-            vector_store.add_chunks(processor.chunks)
+            def embed_pending(force: bool = False):
+                nonlocal failures
+                if pending and (force or len(pending) >= flush_size):
+                    failures += vector_store.add_chunks(pending).failed
+                    pending.clear()
             
-            self.pdf_processors[material_key] = processor
-            self.vector_stores[material_key] = vector_store
-            self.current_material = material_key
+            def on_chunks(new_chunks: List[TextChunk]):
+                pending.extend(new_chunks)
+                embed_pending()
             
+            processor.load_pdf(material_path, on_chunks=on_chunks)
+            embed_pending(force=True)
+            return failures
+        
+        # 加载文本文件
+        with open(material_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        # 简单分块，模拟单页 PDF
+        processor.chunks = processor._create_chunks([(1, content)])
+        processor.full_text = content
+        
+        return vector_store.add_chunks(processor.chunks).failed
+    
+    @staticmethod
+    def _build_summary(material_path: Path, processor: PDFProcessor) -> Dict[str, Any]:
+        """构建材料摘要信息"""
+        if material_path.suffix.lower() == '.pdf':
             summary = processor.get_summary()
             summary['file_name'] = material_path.name
             summary['file_type'] = 'pdf'
-            summary['cached'] = False
-            
             return summary
         
-        elif material_path.suffix.lower() in ['.txt', '.md']:
-            # 加载文本文件
-            with open(material_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # 简单分块
-            processor = PDFProcessor(chunk_size=1000, chunk_overlap=200)
-            # 模拟单页 PDF
-            processor.chunks = processor._create_chunks([(1, content)])
-            processor.full_text = content
-            
-            # 创建向量存储
-            vector_store = VectorStore()
-            vector_store.add_chunks(processor.chunks)
-            
-            self.pdf_processors[material_key] = processor
-            self.vector_stores[material_key] = vector_store
-            self.current_material = material_key
-            
-            return {
-                'file_name': material_path.name,
-                'file_type': material_path.suffix[1:],
-                'total_chunks': len(processor.chunks),
-                'total_characters': len(content),
-                'cached': False
-            }
-        
-        else:
-            raise ValueError(f"Unsupported file type: {material_path.suffix}")
+        return {
+            'file_name': material_path.name,
+            'file_type': material_path.suffix[1:],
+            'total_chunks': len(processor.chunks),
+            'total_characters': len(processor.full_text),
+        }
     
     def keyword_search(self, query: str, top_k: int = 3, material_key: Optional[str] = None) -> List[Dict[str, Any]]:
         """
@@ -147,6 +211,66 @@ class MaterialManager:
         
         return [self._chunk_to_dict(chunk) for chunk in chunks]
     
+    def hybrid_search(
+        self,
+        query: str,
+        top_k: int = 5,
+        material_key: Optional[str] = None,
+        rrf_k: int = 60,
+    ) -> List[Dict[str, Any]]:
+        """
+        混合检索：并发执行关键词（BM25）和语义检索，用倒数排名融合（RRF）合并
+        
+        Args:
+            query: 搜索查询
+            top_k: 返回的文本块数量
+            material_key: 材料标识（None 则使用当前材料）
+            rrf_k: RRF 平滑常数，score = Σ 1 / (rrf_k + rank)
+            
+        Returns:
+            按页分组的结果列表，每组包含 page_num、score 和该页命中的 chunks，按 score 降序
+        """
+        material_key = material_key or self.current_material
+        
+        if not material_key or material_key not in self.pdf_processors:
+            return []
+        
+        processor = self.pdf_processors[material_key]
+        vector_store = self.vector_stores.get(material_key)
+        # 每路多取一些候选，融合后再截断
+        depth = max(top_k * 3, 10)
+        
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            keyword_future = executor.submit(processor.keyword_search, query, depth)
+            semantic_future = executor.submit(vector_store.semantic_search, query, depth) if vector_store else None
+            rankings = {"keyword": keyword_future.result()}
+            if semantic_future is not None:
+                rankings["semantic"] = semantic_future.result()
+        
+        # 按 chunk_id 去重并累加 RRF 分数
+        fused: Dict[int, Dict[str, Any]] = {}
+        for source, chunks in rankings.items():
+            for rank, chunk in enumerate(chunks, start=1):
+                entry = fused.setdefault(chunk.chunk_id, {"chunk": chunk, "score": 0.0, "sources": []})
+                entry["score"] += 1.0 / (rrf_k + rank)
+                entry["sources"].append(source)
+        
+        top = sorted(fused.values(), key=lambda e: e["score"], reverse=True)[:top_k]
+        
+        # 按页分组，组内按分数排序
+        pages: Dict[int, Dict[str, Any]] = {}
+        for entry in top:
+            chunk = entry["chunk"]
+            group = pages.setdefault(chunk.page_num, {"page_num": chunk.page_num, "score": 0.0, "chunks": []})
+            group["score"] = max(group["score"], entry["score"])
+            group["chunks"].append({
+                **self._chunk_to_dict(chunk),
+                "score": entry["score"],
+                "sources": entry["sources"],
+            })
+        
+        return sorted(pages.values(), key=lambda g: g["score"], reverse=True)
+    
     def get_page_content(self, page_num: int, material_key: Optional[str] = None) -> str:
         """
         获取指定页面内容
@@ -221,6 +345,7 @@ class MaterialManager:
             # 清除所有缓存
             self.pdf_processors.clear()
             self.vector_stores.clear()
+            self._file_stats.clear()
             self.current_material = None
         else:
             # 清除指定材料
@@ -231,10 +356,18 @@ class MaterialManager:
                 del self.pdf_processors[material_key]
             if material_key in self.vector_stores:
                 del self.vector_stores[material_key]
+            self._file_stats.pop(material_key, None)
             
             if self.current_material == material_key:
                 # 如果清除的是当前材料，切换到其他材料或 None
                 self.current_material = next(iter(self.pdf_processors.keys()), None)
+        
+        self._bump_version()
+    
+    def _bump_version(self):
+        """材料变化后递增版本号"""
+        with self._load_locks_guard:
+            self.version += 1
     
     @staticmethod
     def _chunk_to_dict(chunk: TextChunk) -> Dict[str, Any]:
@@ -4,9 +4,14 @@ PDF 处理工具
 """
 
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, Iterator, List, Dict, Optional, Tuple
+import math
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass
+from .keyword_index import KeywordIndex
+from .tokenizer import Tokenizer, get_tokenizer
 
 
 @dataclass
@@ -18,70 +23,226 @@ class TextChunk:
     metadata: Dict = None
 
 
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """
+    提取 [start, end) 范围内页面的文本（在子进程中运行，需为模块级函数）
+    
+    Args:
+        pdf_path: PDF 文件路径
+        start: 起始页索引（从 0 开始）
+        end: 结束页索引（不含）
+        
+    Returns:
+        (页码, 文本) 列表，页码从 1 开始
+    """
+    import PyPDF2
+    
+    with open(pdf_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        return [(i + 1, pdf_reader.pages[i].extract_text() or "") for i in range(start, end)]
+
+
 class PDFProcessor:
     """PDF 处理器"""
     
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, tokenizer: Optional[Tokenizer] = None):
         """
         初始化 PDF 处理器
         
         Args:
             chunk_size: 每个文本块的字符数
             chunk_overlap: 文本块之间的重叠字符数
+            tokenizer: 关键词索引使用的分词器（None 则按 KEYWORD_TOKENIZER 创建，默认中英文混合）
         """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.tokenizer = tokenizer or get_tokenizer()
         self.chunks: List[TextChunk] = []
         self.full_text: str = ""
+        self.keyword_index = KeywordIndex(self.tokenizer)
         
-    def load_pdf(self, pdf_path: str | Path) -> str:
+        # 查找索引，随文本块的创建一起维护
+        self._chunk_by_id: Dict[int, TextChunk] = {}
+        self._page_ranges: Dict[int, Tuple[int, int]] = {}  # 页码 → chunks 中的 [start, end)
+        self._page_texts: Dict[int, str] = {}
+        self._chunk_chars = 0
+        
+    def load_pdf(
+        self,
+        pdf_path: str | Path,
+        workers: Optional[int] = None,
+        on_chunks: Optional[Callable[[List[TextChunk]], None]] = None,
+    ) -> str:
         """
         加载 PDF 文件并提取文本
         
+        页数较多时按页范围分片，由进程池并行提取；分片按页序依次分块，
+        每完成一个分片就把新文本块交给 on_chunks（例如送去生成 embedding），
+        此时其余分片仍在后台提取。
+        
         Args:
             pdf_path: PDF 文件路径
+            workers: 提取进程数（None 则读取 PDF_EXTRACT_WORKERS，默认 CPU 核数）
+            on_chunks: 每批新文本块的回调
             
         Returns:
             提取的全文
         """
         try:
             import PyPDF2
+        except ImportError:
+            raise ImportError("PyPDF2 is required. Install it with: pip install PyPDF2")
+        
+        pdf_path = Path(pdf_path)
+        if not pdf_path.exists():
+            raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+        
+        self.chunks = []
+        self.keyword_index = KeywordIndex(self.tokenizer)
+        self._reset_lookup()
+        texts = []
+        
+        for pages in self.iter_pages(pdf_path, workers=workers):
+            text_by_page = [(page_num, text) for page_num, text in pages if text.strip()]
+            texts.extend(text for _, text in text_by_page)
             
-            pdf_path = Path(pdf_path)
-            if not pdf_path.exists():
-                raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+            # 创建文本块
+            new_chunks = self._append_pages(text_by_page)
+            if on_chunks and new_chunks:
+                on_chunks(new_chunks)
+        
+        self.full_text = "\n\n".join(texts)
+        
+        return self.full_text
+    
+    def iter_pages(self, pdf_path: str | Path, workers: Optional[int] = None) -> Iterator[List[Tuple[int, str]]]:
+        """
+        按页序逐个分片地提取页面文本
+        
+        Args:
+            pdf_path: PDF 文件路径
+            workers: 提取进程数（None 则读取 PDF_EXTRACT_WORKERS，默认 CPU 核数）
             
-            text_by_page = []
+        Yields:
+            每个分片的 (页码, 文本) 列表，分片之间严格按页序
+        """
+        import PyPDF2
+        
+        pdf_path = str(pdf_path)
+        with open(pdf_path, 'rb') as file:
+            total_pages = len(PyPDF2.PdfReader(file).pages)
+        
+        workers = workers or int(os.getenv("PDF_EXTRACT_WORKERS", "0")) or os.cpu_count() or 1
+        min_pages = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "32"))
+        
+        # 小文件的进程启动开销大于收益，直接顺序提取
+        if workers <= 1 or total_pages < min_pages:
+            yield _extract_page_range(pdf_path, 0, total_pages)
+            return
+        
+        # 分片数为进程数的数倍，便于负载均衡和尽早产出第一个分片
+        shard_size = max(4, min(32, math.ceil(total_pages / (workers * 4))))
+        shards = [(start, min(start + shard_size, total_pages)) for start in range(0, total_pages, shard_size)]
+        
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as executor:
+            futures = {
+                executor.submit(_extract_page_range, pdf_path, start, end): i
+                for i, (start, end) in enumerate(shards)
+            }
             
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                for page_num, page in enumerate(pdf_reader.pages, start=1):
-                    text = page.extract_text()
-                    if text.strip():
-                        text_by_page.append((page_num, text))
+            # 乱序完成的分片先缓存，按顺序产出
+            done: Dict[int, List[Tuple[int, str]]] = {}
+            next_shard = 0
+            for future in as_completed(futures):
+                done[futures[future]] = future.result()
+                while next_shard in done:
+                    yield done.pop(next_shard)
+                    next_shard += 1
+    
+    def _create_chunks(self, text_by_page: List[Tuple[int, str]]) -> List[TextChunk]:
+        """
+        将文本分块，并重建关键词索引
+        
+        Args:
+            text_by_page: (页码, 文本) 列表
             
-            # 创建文本块
-            self.chunks = self._create_chunks(text_by_page)
-            self.full_text = "\n\n".join([text for _, text in text_by_page])
+        Returns:
+            文本块列表
+        """
+        chunks = self._split_pages(text_by_page, start_id=0)
+        
+        # 构建关键词倒排索引和查找索引
+        self.keyword_index = KeywordIndex(self.tokenizer)
+        self.keyword_index.add(chunks)
+        self._reset_lookup()
+        self._index_chunks(chunks, offset=0)
+        
+        return chunks
+    
+    def _append_pages(self, text_by_page: List[Tuple[int, str]]) -> List[TextChunk]:
+        """
+        将后续页面分块并追加到已有文本块和关键词索引
+        
+        Args:
+            text_by_page: (页码, 文本) 列表，页码需位于已有页面之后
             
-            return self.full_text
+        Returns:
+            新增的文本块列表
+        """
+        offset = len(self.chunks)
+        chunks = self._split_pages(text_by_page, start_id=offset)
+        self.chunks.extend(chunks)
+        self.keyword_index.add(chunks)
+        self._index_chunks(chunks, offset=offset)
+        return chunks
+    
+    def _reset_lookup(self) -> None:
+        """清空查找索引"""
+        self._chunk_by_id = {}
+        self._page_ranges = {}
+        self._page_texts = {}
+        self._chunk_chars = 0
+    
+    def _index_chunks(self, chunks: List[TextChunk], offset: int) -> None:
+        """
+        将新文本块加入查找索引
+        
+        文本块按页序生成，同一页的块在 chunks 中连续，因此每页可用一个区间表示。
+        
+        Args:
+            chunks: 新文本块（按页序）
+            offset: 第一个新文本块在 self.chunks 中的位置
+        """
+        touched_pages = []
+        for i, chunk in enumerate(chunks, start=offset):
+            self._chunk_by_id[chunk.chunk_id] = chunk
+            self._chunk_chars += len(chunk.content)
             
-        except ImportError:
-            raise ImportError("PyPDF2 is required. Install it with: pip install PyPDF2")
+            start, _ = self._page_ranges.get(chunk.page_num, (i, i))
+            self._page_ranges[chunk.page_num] = (start, i + 1)
+            if not touched_pages or touched_pages[-1] != chunk.page_num:
+                touched_pages.append(chunk.page_num)
+        
+        # 预先拼接页面文本（一页不会跨越两次调用，页面的全部块都在 chunks 中）
+        for page_num in touched_pages:
+            start, end = self._page_ranges[page_num]
+            self._page_texts[page_num] = "\n\n".join(
+                chunk.content for chunk in chunks[start - offset:end - offset]
+            )
     
-    def _create_chunks(self, text_by_page: List[Tuple[int, str]]) -> List[TextChunk]:
+    def _split_pages(self, text_by_page: List[Tuple[int, str]], start_id: int) -> List[TextChunk]:
         """
-        将文本分块
+        按段落将每页文本分块
         
         Args:
             text_by_page: (页码, 文本) 列表
+            start_id: 第一个文本块的 ID
             
         Returns:
             文本块列表
         """
         chunks = []
-        chunk_id = 0
+        chunk_id = start_id
         
         for page_num, page_text in text_by_page:
             # 按段落分割
@@ -128,7 +289,7 @@ class PDFProcessor:
     
     def keyword_search(self, query: str, top_k: int = 5) -> List[TextChunk]:
         """
-        关键词搜索
+        关键词搜索（BM25，完整查询短语出现时加分）
         
         Args:
             query: 搜索查询
@@ -137,29 +298,7 @@ class PDFProcessor:
         Returns:
             匹配的文本块列表
         """
-        query_lower = query.lower()
-        query_terms = set(re.findall(r'\w+', query_lower))
-        
-        # 计算每个块的相关性分数
-        scored_chunks = []
-        for chunk in self.chunks:
-            content_lower = chunk.content.lower()
-            
-            # 计算匹配的关键词数量
-            chunk_terms = set(re.findall(r'\w+', content_lower))
-            matching_terms = query_terms & chunk_terms
-            
-            # 计算分数：匹配词数 + 完整查询出现次数 * 10
-            score = len(matching_terms)
-            score += content_lower.count(query_lower) * 10
-            
-            if score > 0:
-                scored_chunks.append((score, chunk))
-        
-        # 按分数排序
-        scored_chunks.sort(key=lambda x: x[0], reverse=True)
-        
-        return [chunk for _, chunk in scored_chunks[:top_k]]
+        return [chunk for _, chunk in self.keyword_index.search(query, top_k)]
     
     def get_page_content(self, page_num: int) -> str:
         """
@@ -171,8 +310,7 @@ class PDFProcessor:
         Returns:
             页面内容
         """
-        page_chunks = [chunk for chunk in self.chunks if chunk.page_num == page_num]
-        return "\n\n".join([chunk.content for chunk in page_chunks])
+        return self._page_texts.get(page_num, "")
     
     def get_chunk_by_id(self, chunk_id: int) -> Optional[TextChunk]:
         """
@@ -184,10 +322,7 @@ class PDFProcessor:
         Returns:
             文本块
         """
-        for chunk in self.chunks:
-            if chunk.chunk_id == chunk_id:
-                return chunk
-        return None
+        return self._chunk_by_id.get(chunk_id)
     
     def get_summary(self) -> Dict:
         """
@@ -196,11 +331,9 @@ class PDFProcessor:
         Returns:
             摘要信息字典
         """
-        pages = set(chunk.page_num for chunk in self.chunks)
-        
         return {
             "total_chunks": len(self.chunks),
-            "total_pages": len(pages),
+            "total_pages": len(self._page_ranges),
             "total_characters": len(self.full_text),
-            "avg_chunk_size": sum(len(c.content) for c in self.chunks) // len(self.chunks) if self.chunks else 0
+            "avg_chunk_size": self._chunk_chars // len(self.chunks) if self.chunks else 0
         }
@@ -0,0 +1,90 @@
+"""
+关键词索引分词器
+- WordTokenizer: 按 \\w+ 切分，适用于纯拉丁文本
+- CJKTokenizer: 拉丁文本按单词切分，中日韩文本按字符 bigram 切分
+"""
+
+import os
+import re
+import unicodedata
+from typing import List
+
+
+class Tokenizer:
+    """分词器基类：索引文档和解析查询可以使用不同的切分方式"""
+
+    name = "base"
+
+    def __call__(self, text: str) -> List[str]:
+        """切分待索引的文档"""
+        raise NotImplementedError
+
+    def query_terms(self, query: str) -> List[str]:
+        """切分查询，默认与文档相同"""
+        return self(query)
+
+
+class WordTokenizer(Tokenizer):
+    """按 \\w+ 切分并转小写"""
+
+    name = "word"
+
+    def __call__(self, text: str) -> List[str]:
+        return re.findall(r'\w+', text.lower())
+
+
+# 中日韩统一表意文字、扩展 A、兼容表意文字、日文假名、韩文音节
+_CJK_RANGES = "㐀-䶿一-鿿豈-﫿぀-ヿ가-힯"
+_CJK_OR_WORD = re.compile(f"([{_CJK_RANGES}]+)|([^\\W{_CJK_RANGES}]+)")
+
+
+class CJKTokenizer(Tokenizer):
+    """
+    中英文混合分词器
+
+    拉丁字母和数字按单词切分；连续的中日韩字符切成重叠的字符 bigram，
+    文档侧额外保留单字，以便单字查询也能命中。
+    """
+
+    name = "cjk"
+
+    def _split(self, text: str, with_unigrams: bool) -> List[str]:
+        text = unicodedata.normalize("NFKC", text).lower()
+        tokens = []
+        for cjk, word in _CJK_OR_WORD.findall(text):
+            if word:
+                tokens.append(word)
+                continue
+            if len(cjk) == 1 or with_unigrams:
+                tokens.extend(cjk)
+            tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+        return tokens
+
+    def __call__(self, text: str) -> List[str]:
+        return self._split(text, with_unigrams=True)
+
+    def query_terms(self, query: str) -> List[str]:
+        # 查询中多字的中文片段只用 bigram，避免高频单字稀释分数
+        return self._split(query, with_unigrams=False)
+
+
+_TOKENIZERS = {
+    WordTokenizer.name: WordTokenizer,
+    CJKTokenizer.name: CJKTokenizer,
+}
+
+
+def get_tokenizer(name: str | None = None) -> Tokenizer:
+    """
+    按名称创建分词器
+
+    Args:
+        name: word / cjk（None 则读取 KEYWORD_TOKENIZER，默认 cjk）
+
+    Returns:
+        Tokenizer 实例
+    """
+    name = (name or os.getenv("KEYWORD_TOKENIZER", "cjk")).lower()
+    if name not in _TOKENIZERS:
+        raise ValueError(f"Unsupported tokenizer: {name}")
+    return _TOKENIZERS[name]()
@@ -0,0 +1,404 @@
+"""
+向量索引
+为 VectorStore 提供可替换的相似度检索后端：
+- ExactIndex: 暴力精确检索（矩阵-向量乘积）
+- IVFIndex: 倒排文件近似检索（球面 k-means 聚类 + 多簇探测），纯 NumPy 实现
+"""
+
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """
+    按行 L2 归一化并转为 float32
+
+    Args:
+        vectors: (n, d) 或 (d,) 数组
+
+    Returns:
+        归一化后的数组
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """返回分数最高的 k 个位置（按分数降序）"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+class _GrowableMatrix:
+    """按容量倍增追加行的 float32 矩阵"""
+
+    def __init__(self, dim: Optional[int] = None):
+        self.dim = dim
+        self._data: Optional[np.ndarray] = None
+        self.size = 0
+
+    def append(self, block: np.ndarray) -> None:
+        if len(block) == 0:
+            return
+        if self.dim is None:
+            self.dim = block.shape[1]
+
+        needed = self.size + len(block)
+        if self._data is None or needed > len(self._data):
+            capacity = max(needed, 2 * (len(self._data) if self._data is not None else 0), 256)
+            data = np.empty((capacity, self.dim), dtype=np.float32)
+            if self.size:
+                data[:self.size] = self._data[:self.size]
+            self._data = data
+
+        self._data[self.size:needed] = block
+        self.size = needed
+
+    @property
+    def view(self) -> np.ndarray:
+        if self._data is None:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return self._data[:self.size]
+
+
+class VectorIndex(ABC):
+    """
+    向量索引接口
+
+    向量按加入顺序获得从 0 开始的连续 id；add 接收未归一化的向量，
+    search 以余弦相似度返回 (ids, scores)。
+    """
+
+    name: str = "base"
+
+    @abstractmethod
+    def add(self, vectors: np.ndarray) -> None:
+        """追加向量"""
+
+    @abstractmethod
+    def search(self, query: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """检索与 query 最相似的 top_k 个向量"""
+
+    def build(self) -> None:
+        """（重新）构建索引结构；精确索引无需构建"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """清空全部向量（保留索引参数）"""
+
+    @abstractmethod
+    def save(self, path: str | Path) -> None:
+        """保存到 .npz 文件"""
+
+    @classmethod
+    @abstractmethod
+    def load(cls, path: str | Path) -> "VectorIndex":
+        """从 .npz 文件加载"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """向量数量"""
+
+
+class ExactIndex(VectorIndex):
+    """精确检索：预归一化矩阵上的一次矩阵-向量乘积 + argpartition"""
+
+    name = "exact"
+
+    def __init__(self):
+        self._vectors = _GrowableMatrix()
+
+    def add(self, vectors: np.ndarray) -> None:
+        self._vectors.append(normalize_rows(np.atleast_2d(vectors)))
+
+    def search(self, query: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if not len(self):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        scores = self._vectors.view @ normalize_rows(query)
+        top = _top_k(scores, top_k)
+        return top, scores[top]
+
+    def clear(self) -> None:
+        self._vectors = _GrowableMatrix()
+
+    @classmethod
+    def from_normalized(cls, vectors: np.ndarray) -> "ExactIndex":
+        """
+        直接采用已归一化的 float32 矩阵（可为只读 memmap），不复制数据
+
+        Args:
+            vectors: (n, d) 归一化矩阵
+
+        Returns:
+            ExactIndex 实例；之后追加向量时才会复制到新的缓冲区
+        """
+        index = cls()
+        index._vectors.dim = vectors.shape[1]
+        index._vectors._data = vectors
+        index._vectors.size = len(vectors)
+        return index
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """归一化后的全部向量"""
+        return self._vectors.view
+
+    def save(self, path: str | Path) -> None:
+        np.savez(path, backend=self.name, vectors=self._vectors.view)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "ExactIndex":
+        data = np.load(path)
+        index = cls()
+        index._vectors.append(data["vectors"])
+        return index
+
+    def __len__(self) -> int:
+        return self._vectors.size
+
+
+class IVFIndex(VectorIndex):
+    """
+    倒排文件（IVF）近似检索
+
+    用球面 k-means 将向量划分到 nlist 个簇，查询时只扫描与 query 最接近的
+    nprobe 个簇。未训练前（向量数少于 train_threshold）退化为精确检索；
+    训练后新增向量直接分配到最近的簇，无需重建。
+    """
+
+    name = "ivf"
+
+    def __init__(
+        self,
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        train_threshold: int = 20000,
+        kmeans_iters: int = 10,
+        seed: int = 0,
+    ):
+        """
+        初始化 IVF 索引
+
+        Args:
+            nlist: 簇数量（None 则构建时取 4 * sqrt(n)）
+            nprobe: 查询时探测的簇数量，越大召回越高、延迟越大
+            train_threshold: 向量数达到该值时自动训练
+            kmeans_iters: k-means 迭代次数
+            seed: 随机种子
+        """
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_threshold = train_threshold
+        self.kmeans_iters = kmeans_iters
+        self.seed = seed
+
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[_GrowableMatrix] = []
+        self._list_ids: List[List[int]] = []
+        self._list_id_arrays: List[Optional[np.ndarray]] = []
+        self._pending = _GrowableMatrix()
+        self._size = 0
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def add(self, vectors: np.ndarray) -> None:
+        vectors = normalize_rows(np.atleast_2d(vectors))
+        if not len(vectors):
+            return
+        ids = np.arange(self._size, self._size + len(vectors))
+        self._size += len(vectors)
+
+        if not self.is_trained:
+            self._pending.append(vectors)
+            if self._pending.size >= self.train_threshold:
+                self.build()
+            return
+
+        self._assign(vectors, ids)
+
+    def build(self) -> None:
+        """用当前全部向量训练聚类中心并重新分配倒排列表"""
+        vectors = self._all_vectors()
+        if not len(vectors):
+            return
+
+        nlist = self.nlist or max(1, int(4 * np.sqrt(len(vectors))))
+        nlist = min(nlist, len(vectors))
+        self.centroids = self._train_kmeans(vectors, nlist)
+        self._lists = [_GrowableMatrix(vectors.shape[1]) for _ in range(nlist)]
+        self._list_ids = [[] for _ in range(nlist)]
+        self._list_id_arrays = [None] * nlist
+        self._pending = _GrowableMatrix()
+        self._assign(vectors, np.arange(len(vectors)))
+
+    def clear(self) -> None:
+        self.centroids = None
+        self._lists = []
+        self._list_ids = []
+        self._list_id_arrays = []
+        self._pending = _GrowableMatrix()
+        self._size = 0
+
+    def _all_vectors(self) -> np.ndarray:
+        """按 id 顺序返回全部向量"""
+        if not self.is_trained:
+            return self._pending.view.copy()
+        dim = self.centroids.shape[1]
+        out = np.empty((self._size, dim), dtype=np.float32)
+        for vectors, ids in zip(self._lists, self._list_ids):
+            if ids:
+                out[ids] = vectors.view
+        return out
+
+    def _train_kmeans(self, vectors: np.ndarray, nlist: int) -> np.ndarray:
+        """在采样向量上训练球面 k-means"""
+        rng = np.random.default_rng(self.seed)
+        sample_size = max(nlist, min(len(vectors), nlist * 32, 100000))
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(self.kmeans_iters):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            # 按簇排序后用 reduceat 分段求和，比 np.add.at 快一个数量级
+            order = np.argsort(assign, kind="stable")
+            sorted_assign = assign[order]
+            starts = np.flatnonzero(np.r_[True, np.diff(sorted_assign) != 0])
+            sums = sample[rng.choice(sample_size, nlist, replace=False)].copy()  # 空簇重新随机初始化
+            sums[sorted_assign[starts]] = np.add.reduceat(sample[order], starts, axis=0)
+            centroids = normalize_rows(sums)
+
+        return centroids
+
+    def _assign(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        """将向量分配到最近的簇"""
+        assign = np.argmax(vectors @ self.centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        boundaries = np.flatnonzero(np.diff(assign[order])) + 1
+        for group in np.split(order, boundaries):
+            c = int(assign[group[0]])
+            self._lists[c].append(vectors[group])
+            self._list_ids[c].extend(ids[group].tolist())
+            self._list_id_arrays[c] = None
+
+    def search(self, query: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        query = normalize_rows(query)
+
+        if not self.is_trained:
+            if not self._pending.size:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            scores = self._pending.view @ query
+            top = _top_k(scores, top_k)
+            return top, scores[top]
+
+        probes = _top_k(self.centroids @ query, self.nprobe)
+        all_ids, all_scores = [], []
+        for c in probes:
+            if not self._list_ids[c]:
+                continue
+            if self._list_id_arrays[c] is None:
+                self._list_id_arrays[c] = np.asarray(self._list_ids[c], dtype=np.int64)
+            all_ids.append(self._list_id_arrays[c])
+            all_scores.append(self._lists[c].view @ query)
+
+        if not all_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        ids = np.concatenate(all_ids)
+        scores = np.concatenate(all_scores)
+        top = _top_k(scores, top_k)
+        return ids[top], scores[top]
+
+    def save(self, path: str | Path) -> None:
+        params = np.array([self.nlist or 0, self.nprobe, self.train_threshold, self.kmeans_iters, self.seed])
+        if not self.is_trained:
+            np.savez(path, backend=self.name, params=params, pending=self._pending.view)
+            return
+
+        offsets = np.cumsum([0] + [len(ids) for ids in self._list_ids])
+        np.savez(
+            path,
+            backend=self.name,
+            params=params,
+            centroids=self.centroids,
+            vectors=np.concatenate([m.view for m in self._lists]),
+            ids=np.concatenate([np.asarray(ids, dtype=np.int64) for ids in self._list_ids]),
+            offsets=offsets,
+        )
+
+    @classmethod
+    def load(cls, path: str | Path) -> "IVFIndex":
+        data = np.load(path)
+        nlist, nprobe, train_threshold, kmeans_iters, seed = (int(v) for v in data["params"])
+        index = cls(nlist=nlist or None, nprobe=nprobe, train_threshold=train_threshold,
+                    kmeans_iters=kmeans_iters, seed=seed)
+
+        if "centroids" not in data:
+            index._pending.append(data["pending"])
+            index._size = index._pending.size
+            return index
+
+        index.centroids = data["centroids"]
+        vectors, ids, offsets = data["vectors"], data["ids"], data["offsets"]
+        dim = index.centroids.shape[1]
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            matrix = _GrowableMatrix(dim)
+            matrix.append(vectors[start:end])
+            index._lists.append(matrix)
+            index._list_ids.append(ids[start:end].tolist())
+            index._list_id_arrays.append(ids[start:end].copy())
+        index._size = len(ids)
+        return index
+
+    def __len__(self) -> int:
+        return self._size
+
+
+_INDEX_BACKENDS = {
+    ExactIndex.name: ExactIndex,
+    IVFIndex.name: IVFIndex,
+}
+
+
+def create_index(backend: Optional[str] = None, **kwargs) -> VectorIndex:
+    """
+    创建向量索引
+
+    Args:
+        backend: 后端名称 exact / ivf（None 则读取 VECTOR_INDEX_BACKEND，默认 exact）
+        **kwargs: 传给具体后端的参数
+
+    Returns:
+        VectorIndex 实例
+    """
+    backend = (backend or os.getenv("VECTOR_INDEX_BACKEND", "exact")).lower()
+    if backend not in _INDEX_BACKENDS:
+        raise ValueError(f"Unsupported vector index backend: {backend}")
+    if backend == IVFIndex.name:
+        kwargs.setdefault("nprobe", int(os.getenv("VECTOR_INDEX_NPROBE", "8")))
+    return _INDEX_BACKENDS[backend](**kwargs)
+
+
+def load_index(path: str | Path) -> VectorIndex:
+    """
+    从文件加载向量索引，根据保存的 backend 字段选择实现
+
+    Args:
+        path: .npz 文件路径
+
+    Returns:
+        VectorIndex 实例
+    """
+    with np.load(path) as data:
+        backend = str(data["backend"])
+    return _INDEX_BACKENDS[backend].load(path)
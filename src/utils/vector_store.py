@@ -4,9 +4,16 @@
 """
 
 from typing import List, Dict, Optional
+from pathlib import Path
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from .pdf_processor import TextChunk
+from .embedding_cache import EmbeddingCache, QueryEmbeddingCache, get_embedding_cache, get_query_embedding_cache
+from .vector_index import ExactIndex, VectorIndex, create_index, load_index, normalize_rows
+from .colored_logger import log_warning
 
 
 @dataclass
@@ -16,18 +23,59 @@ class VectorChunk:
     embedding: np.ndarray
 
 
+@dataclass
+class EmbeddingReport:
+    """Embedding 批量生成结果"""
+    total: int = 0
+    embedded: int = 0
+    failed_chunk_ids: List[int] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def failed(self) -> int:
+        """失败的文本块数量"""
+        return len(self.failed_chunk_ids)
+
+    @property
+    def ok(self) -> bool:
+        """是否全部成功"""
+        return not self.failed_chunk_ids
+
+
 class VectorStore:
     """向量存储"""
     
-    def __init__(self, embedding_model: str = "models/text-embedding-004"):
+    def __init__(
+        self,
+        embedding_model: str = "models/text-embedding-004",
+        batch_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        cache: Optional[EmbeddingCache] = None,
+        index: Optional[VectorIndex] = None,
+        query_cache: Optional[QueryEmbeddingCache] = None,
+    ):
         """
         初始化向量存储
         
         Args:
             embedding_model: Gemini embedding 模型名称
+            batch_size: 每次请求包含的文本块数量（None 则读取 EMBED_BATCH_SIZE，默认 50）
+            max_concurrency: 并发请求数上限（None 则读取 EMBED_MAX_CONCURRENCY，默认 4）
+            max_retries: 每个批次的最大重试次数（None 则读取 EMBED_MAX_RETRIES，默认 3）
+            cache: 持久化 embedding 缓存（None 则使用全局缓存，可通过 EMBEDDING_CACHE=0 禁用）
+            index: 向量索引后端（None 则按 VECTOR_INDEX_BACKEND 创建，默认精确检索）
+            query_cache: 查询 embedding 缓存（None 则使用全局缓存）
         """
         self.embedding_model = embedding_model
+        self.batch_size = max(1, batch_size or int(os.getenv("EMBED_BATCH_SIZE", "50")))
+        self.max_concurrency = max(1, max_concurrency or int(os.getenv("EMBED_MAX_CONCURRENCY", "4")))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("EMBED_MAX_RETRIES", "3"))
+        self.cache = cache if cache is not None else get_embedding_cache()
         self.vector_chunks: List[VectorChunk] = []
+        # 索引中第 i 个向量对应 vector_chunks[i]
+        self.index = index if index is not None else create_index()
+        self.query_cache = query_cache if query_cache is not None else get_query_embedding_cache()
         self._client = None
     
     def _get_client(self):
@@ -38,33 +86,109 @@ class VectorStore:
             self._client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
         return self._client
     
-    def add_chunks(self, chunks: List[TextChunk]) -> None:
+    def add_chunks(self, chunks: List[TextChunk]) -> EmbeddingReport:
         """
         添加文本块并生成 embedding
         
+        已在持久化缓存中的块直接复用；其余文本块按 batch_size 分批，每批一次请求，
+        批次之间以有限并发发送，单个批次失败会按指数退避重试，最终失败的块记录在返回的报告中。
+        
         Args:
             chunks: 文本块列表
+            
+        Returns:
+            本次添加的结果报告
+        """
+        report = EmbeddingReport(total=len(chunks))
+        if not chunks:
+            return report
+        
+        # 先查持久化缓存，只为未命中的块调用 API
+        if self.cache is not None:
+            embeddings: List[Optional[np.ndarray]] = self.cache.get_many(
+                self.embedding_model, [c.content for c in chunks]
+            )
+        else:
+            embeddings = [None] * len(chunks)
+        
+        pending = [i for i, e in enumerate(embeddings) if e is None]
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        
+        if batches:
+            workers = min(self.max_concurrency, len(batches))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(self._embed_batch, [chunks[i].content for i in batch])
+                    for batch in batches
+                ]
+                
+                for batch, future in zip(batches, futures):
+                    try:
+                        batch_embeddings = future.result()
+                    except Exception as e:
+                        ids = [chunks[i].chunk_id for i in batch]
+                        report.failed_chunk_ids.extend(ids)
+                        report.errors.append(f"chunks {ids[0]}-{ids[-1]}: {e}")
+                        continue
+                    
+                    for i, embedding in zip(batch, batch_embeddings):
+                        embeddings[i] = embedding
+                    if self.cache is not None:
+                        self.cache.put_many(
+                            self.embedding_model,
+                            [chunks[i].content for i in batch],
+                            batch_embeddings,
+                        )
+        
+        # 按原始顺序写入，保证 vector_chunks 的顺序与输入一致
+        added = [
+            VectorChunk(chunk=chunk, embedding=embedding)
+            for chunk, embedding in zip(chunks, embeddings)
+            if embedding is not None
+        ]
+        self.vector_chunks.extend(added)
+        if added:
+            self.index.add(np.vstack([vc.embedding for vc in added]))
+        report.embedded = len(added)
+        
+        if not report.ok:
+            log_warning(
+                f"Failed to embed {report.failed}/{report.total} chunks "
+                f"({len(report.errors)} batch(es)): {report.errors[0]}"
+            )
+        
+        return report
+    
+    def _embed_batch(self, texts: List[str]) -> List[np.ndarray]:
+        """
+        为一批文本生成 embedding（带指数退避重试）
+        
+        Args:
+            texts: 文本列表
+            
+        Returns:
+            与 texts 一一对应的 embedding 列表
         """
         client = self._get_client()
+        delay = 1.0
         
-        for chunk in chunks:
+        for attempt in range(self.max_retries + 1):
             try:
-                # 生成 embedding - 使用正确的 API 格式
                 result = client.models.embed_content(
                     model=self.embedding_model,
-                    contents=chunk.content  # 注意：是 contents 不是 content
+                    contents=texts  # 注意：是 contents 不是 content
                 )
-                
-                embedding = np.array(result.embeddings[0].values)
-                
-                self.vector_chunks.append(VectorChunk(
-                    chunk=chunk,
-                    embedding=embedding
-                ))
-                
-            except Exception as e:
-                print(f"Warning: Failed to embed chunk {chunk.chunk_id}: {e}")
-                continue
+                if len(result.embeddings) != len(texts):
+                    raise RuntimeError(
+                        f"expected {len(texts)} embeddings, got {len(result.embeddings)}"
+                    )
+                return [np.asarray(e.values, dtype=np.float32) for e in result.embeddings]
+            
+            except Exception:
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(delay)
+                delay = min(delay * 2, 30.0)
     
     def semantic_search(self, query: str, top_k: int = 5) -> List[TextChunk]:
         """
@@ -80,45 +204,95 @@ class VectorStore:
         if not self.vector_chunks:
             return []
         
-        client = self._get_client()
-        
         try:
-            # 生成查询的 embedding - 使用正确的 API 格式
-            result = client.models.embed_content(
-                model=self.embedding_model,
-                contents=query  # 注意：是 contents 不是 content
-            )
-            query_embedding = np.array(result.embeddings[0].values)
-            
-            # 计算余弦相似度
-            similarities = []
-            for vec_chunk in self.vector_chunks:
-                similarity = self._cosine_similarity(query_embedding, vec_chunk.embedding)
-                similarities.append((similarity, vec_chunk.chunk))
-            
-            # 排序并返回 top_k
-            similarities.sort(key=lambda x: x[0], reverse=True)
+            query_embedding = self._embed_query(query)
+            ids, _ = self.index.search(query_embedding, top_k)
             
-            return [chunk for _, chunk in similarities[:top_k]]
+            return [self.vector_chunks[i].chunk for i in ids]
             
         except Exception as e:
             print(f"Error in semantic search: {e}")
             return []
     
-    @staticmethod
-    def _cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    def _embed_query(self, query: str) -> np.ndarray:
         """
-        计算余弦相似度
+        生成查询的 embedding，优先使用查询缓存
         
         Args:
-            a: 向量 a
-            b: 向量 b
+            query: 搜索查询
             
         Returns:
-            余弦相似度
+            查询向量
+        """
+        if self.query_cache is not None:
+            cached = self.query_cache.get(self.embedding_model, query)
+            if cached is not None:
+                return cached
+        
+        # 生成查询的 embedding - 使用正确的 API 格式
+        result = self._get_client().models.embed_content(
+            model=self.embedding_model,
+            contents=query  # 注意：是 contents 不是 content
+        )
+        query_embedding = np.asarray(result.embeddings[0].values, dtype=np.float32)
+        
+        if self.query_cache is not None:
+            self.query_cache.put(self.embedding_model, query, query_embedding)
+        
+        return query_embedding
+    
+    def save(self, directory: str | Path) -> None:
         """
-        return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+        保存向量到目录
+        
+        写入 embeddings.npy（归一化的 float32 矩阵）和 chunk_ids.npy；
+        非精确索引额外写入 index.npz，避免加载时重新训练。
+        
+        Args:
+            directory: 目标目录
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        
+        if self.vector_chunks:
+            vectors = normalize_rows(np.vstack([vc.embedding for vc in self.vector_chunks]))
+        else:
+            vectors = np.empty((0, 0), dtype=np.float32)
+        np.save(directory / "embeddings.npy", vectors)
+        np.save(directory / "chunk_ids.npy", np.array([vc.chunk.chunk_id for vc in self.vector_chunks], dtype=np.int64))
+        
+        if not isinstance(self.index, ExactIndex):
+            self.index.save(directory / "index.npz")
+    
+    def load(self, directory: str | Path, chunks: List[TextChunk]) -> None:
+        """
+        从目录加载向量（embedding 以 memmap 方式按需读取）
+        
+        Args:
+            directory: save 写入的目录
+            chunks: 文本块列表，按 chunk_id 与保存的向量对应
+        """
+        directory = Path(directory)
+        vectors = np.load(directory / "embeddings.npy", mmap_mode="r")
+        chunk_ids = np.load(directory / "chunk_ids.npy")
+        chunk_by_id = {chunk.chunk_id: chunk for chunk in chunks}
+        
+        self.vector_chunks = [
+            VectorChunk(chunk=chunk_by_id[int(chunk_id)], embedding=vectors[i])
+            for i, chunk_id in enumerate(chunk_ids)
+        ]
+        
+        index_path = directory / "index.npz"
+        if isinstance(self.index, ExactIndex):
+            self.index = ExactIndex.from_normalized(vectors) if len(vectors) else ExactIndex()
+        elif index_path.exists():
+            self.index = load_index(index_path)
+        else:
+            self.index.clear()
+            if len(vectors):
+                self.index.add(vectors)
     
     def clear(self) -> None:
         """清空向量存储"""
         self.vector_chunks = []
+        self.index.clear()
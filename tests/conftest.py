@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 测试从仓库根目录以 src.* 导入
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
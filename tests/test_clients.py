@@ -0,0 +1,25 @@
+"""后端客户端注册表"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("requests")
+
+from src.utils import clients  # noqa: E402
+
+
+def test_http_session_is_per_thread():
+    main_session = clients.get_http_session()
+    assert clients.get_http_session() is main_session
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        sessions = list(executor.map(lambda _: id(clients.get_http_session()), range(8)))
+    assert id(main_session) not in sessions
+    assert 1 <= len(set(sessions)) <= 2
+
+
+def test_close_clients_replaces_sessions():
+    session = clients.get_http_session()
+    clients.close_clients()
+    assert clients.get_http_session() is not session
@@ -0,0 +1,111 @@
+"""预热的代码执行 worker 池"""
+
+import subprocess
+import threading
+import time
+
+import pytest
+
+from src.utils.code_workers import CodeWorkerPool, ResourceLimits
+
+pytestmark = pytest.mark.skipif(not hasattr(__import__("os"), "fork"), reason="worker pool requires fork")
+
+
+@pytest.fixture
+def pool():
+    pool = CodeWorkerPool(size=1, max_runs=3, preimports=["json"])
+    yield pool
+    pool.shutdown()
+
+
+def test_runs_code_and_captures_output(pool):
+    result = pool.run("import sys\nprint('hello')\nprint('oops', file=sys.stderr)", timeout=10)
+
+    assert result.returncode == 0
+    assert result.stdout == "hello\n"
+    assert result.stderr == "oops\n"
+    assert result.cpu_time is not None
+
+
+def test_exceptions_and_exit_codes(pool):
+    result = pool.run("x = 1\nraise ValueError('bad')", timeout=10)
+    assert result.returncode == 1
+    assert 'File "<solver>", line 2' in result.stderr
+    assert "ValueError: bad" in result.stderr
+
+    assert pool.run("import sys\nsys.exit(3)", timeout=10).returncode == 3
+
+
+def test_module_state_does_not_leak_between_runs(pool):
+    # json 已在 worker 中预导入；修改模块属性、全局变量和工作目录都不应影响下一次执行
+    first = pool.run("import json, os\njson.dumps = None\njson.MARKER = 1\nos.chdir('/')\nleaked = 1", timeout=10)
+    assert first.returncode == 0
+
+    second = pool.run(
+        "import json, os\nprint(json.dumps([1]), hasattr(json, 'MARKER'), 'leaked' in globals())",
+        timeout=10,
+    )
+    assert second.returncode == 0
+    assert second.stdout == "[1] False False\n"
+    assert pool.stats()["recycled"] == 0
+
+
+def test_timeout_kills_worker_and_pool_recovers(pool):
+    with pytest.raises(subprocess.TimeoutExpired):
+        pool.run("while True:\n    pass", timeout=0.5)
+
+    assert pool.stats()["timeouts"] == 1
+    assert pool.run("print(1)", timeout=10).stdout == "1\n"
+
+
+def test_crash_returns_exit_code_and_output(pool):
+    result = pool.run("import os, sys\nprint('before', flush=True)\nos._exit(7)", timeout=10)
+    assert result.returncode == 7
+    assert result.stdout == "before\n"
+
+    result = pool.run("import os, signal\nos.kill(os.getpid(), signal.SIGSEGV)", timeout=10)
+    assert result.returncode == -11
+
+    assert pool.run("print(2)", timeout=10).stdout == "2\n"
+
+
+def test_worker_recycled_after_max_runs(pool):
+    pids = [pool.run("import os\nprint(os.getppid())", timeout=10).stdout for _ in range(4)]
+
+    assert len(set(pids[:3])) == 1
+    assert pids[3] != pids[0]
+    assert pool.stats()["recycled"] == 1
+
+
+def test_cancel_terminates_execution(pool):
+    cancel_event = threading.Event()
+    threading.Timer(0.3, cancel_event.set).start()
+    started = time.monotonic()
+    with pytest.raises(Exception):
+        pool.run("import time\ntime.sleep(30)", timeout=30, cancel_event=cancel_event)
+
+    assert time.monotonic() - started < 5
+    assert pool.run("print(3)", timeout=10).stdout == "3\n"
+
+
+def test_sandbox_memory_limit():
+    pool = CodeWorkerPool(size=1, preimports=[], limits=ResourceLimits(memory_mb=256, cpu_seconds=10))
+    try:
+        result = pool.run("x = bytearray(1024 * 1024 * 1024)", timeout=10)
+        assert result.returncode == 1
+        assert "MemoryError" in result.stderr
+        assert result.peak_rss_mb is not None
+    finally:
+        pool.shutdown()
+
+
+def test_sandbox_runs_in_scratch_directory():
+    pool = CodeWorkerPool(size=1, preimports=[], limits=ResourceLimits())
+    try:
+        code = "import os, tempfile\nopen('out.txt', 'w').write('x')\nprint(os.getcwd() == tempfile.gettempdir())"
+        first = pool.run(code, timeout=10)
+        assert first.stdout == "True\n"
+        second = pool.run("import os\nprint(os.path.exists('out.txt'))", timeout=10)
+        assert second.stdout == "False\n"
+    finally:
+        pool.shutdown()
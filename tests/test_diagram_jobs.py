@@ -0,0 +1,66 @@
+"""后台图表生成队列"""
+
+import threading
+
+import pytest
+
+from src.utils import image_generation
+from src.utils.diagram_jobs import DiagramJobQueue, DiagramQuotaExceeded
+
+
+class FakeLogger:
+    def __init__(self, session_id="session"):
+        self.session_id = session_id
+        self.attached = {}
+
+    def add_pending_image(self, job_id):
+        pass
+
+    def save_image(self, image, description):
+        return f"/tmp/{description}.png"
+
+    def attach_image(self, job_id, image_path):
+        self.attached[job_id] = image_path
+
+
+@pytest.fixture
+def release(monkeypatch):
+    event = threading.Event()
+
+    def fake_generate(text_prompt, image_paths, model):
+        event.wait(5)
+        if "fail" in text_prompt:
+            raise RuntimeError("quota")
+        return object()
+
+    monkeypatch.setattr(image_generation, "image_generation_tool", fake_generate)
+    return event
+
+
+def test_finished_jobs_are_pruned(release):
+    queue = DiagramJobQueue(max_concurrency=2, session_cap=0)
+    logger = FakeLogger()
+    done = queue.submit("graph", "chart", logger, model="test")
+    failed = queue.submit("fail", "chart", logger, model="test")
+    assert len(queue.jobs("session")) == 2
+
+    release.set()
+    assert queue.wait("session", timeout=5)
+
+    assert queue.jobs("session") == []
+    assert queue._jobs_by_session == {}
+    assert logger.attached == {done.job_id: "/tmp/chart.png", failed.job_id: None}
+
+
+def test_session_cap_counts_finished_jobs(release):
+    release.set()
+    queue = DiagramJobQueue(session_cap=2)
+    logger = FakeLogger()
+    for _ in range(2):
+        queue.submit("graph", "chart", logger, model="test")
+    queue.wait("session", timeout=5)
+
+    with pytest.raises(DiagramQuotaExceeded):
+        queue.submit("graph", "chart", logger, model="test")
+    # 其他会话不受影响
+    queue.submit("graph", "chart", FakeLogger("other"), model="test")
@@ -0,0 +1,88 @@
+"""embedding 持久化缓存与查询 embedding LRU"""
+
+import numpy as np
+import pytest
+
+from src.utils import embedding_cache
+from src.utils.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: now[0])
+    return now
+
+
+def _vector(value, dim=4):
+    return np.full(dim, value, dtype=np.float32)
+
+
+def test_round_trip_is_keyed_by_model_and_text(tmp_path):
+    cache = EmbeddingCache(tmp_path)
+    cache.put_many("model-a", ["x", "y"], [_vector(1), _vector(2)])
+
+    hits = cache.get_many("model-a", ["y", "z", "x", "y"])
+    assert [None if v is None else float(v[0]) for v in hits] == [2.0, None, 1.0, 2.0]
+    assert cache.get_many("model-b", ["x"]) == [None]
+    assert cache.stats()["hits"] == 3
+    cache.close()
+
+    # 持久化：重新打开后仍然命中
+    reopened = EmbeddingCache(tmp_path)
+    assert float(reopened.get_many("model-a", ["x"])[0][0]) == 1.0
+    reopened.close()
+
+
+def test_eviction_drops_least_recently_used(tmp_path, clock):
+    vector_bytes = _vector(0).nbytes
+    cache = EmbeddingCache(tmp_path, max_bytes=3 * vector_bytes)
+    for i, text in enumerate(["a", "b", "c"]):
+        clock[0] += 1
+        cache.put_many("m", [text], [_vector(i)])
+    clock[0] += 1
+    cache.get_many("m", ["a"])
+
+    clock[0] += 1
+    cache.put_many("m", ["d"], [_vector(3)])
+
+    present = [text for text, v in zip("abcd", cache.get_many("m", list("abcd"))) if v is not None]
+    # 超出上限后淘汰到上限的 90% 以下：最久未访问的 b、c 被淘汰，最近读取过的 a 保留
+    assert present == ["a", "d"]
+    assert cache.stats()["bytes"] <= 3 * vector_bytes
+    cache.close()
+
+
+def test_query_cache_lru_and_normalization():
+    cache = QueryEmbeddingCache(max_entries=2, ttl=0)
+    cache.put("m", "Linear  Program", _vector(1))
+    cache.put("m", "dual", _vector(2))
+
+    assert cache.get("m", "ＬＩＮＥＡＲ program ") is not None
+    cache.put("m", "simplex", _vector(3))
+
+    assert cache.get("m", "dual") is None
+    assert cache.get("m", "linear program") is not None
+    assert cache.stats()["entries"] == 2
+
+
+def test_query_cache_ttl(clock):
+    cache = QueryEmbeddingCache(max_entries=8, ttl=10)
+    cache.put("m", "dual", _vector(1))
+    clock[0] += 9
+    assert cache.get("m", "dual") is not None
+    clock[0] += 2
+    assert cache.get("m", "dual") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_query_cache_spills_evicted_entries(tmp_path):
+    spill = EmbeddingCache(tmp_path)
+    cache = QueryEmbeddingCache(max_entries=1, ttl=0, spill=spill)
+    cache.put("m", "first", _vector(1))
+    cache.put("m", "second", _vector(2))
+
+    embedding = cache.get("m", "First")
+    assert float(embedding[0]) == 1.0
+    assert cache.stats()["spill_hits"] == 1
+    spill.close()
@@ -0,0 +1,67 @@
+"""代码执行结果缓存"""
+
+import subprocess
+
+from src.utils import execution_cache
+from src.utils.execution_cache import ExecutionCache
+
+
+def _result(returncode=0, stdout="ok\n"):
+    return subprocess.CompletedProcess(["python"], returncode, stdout, "")
+
+
+def test_normalized_code_shares_key():
+    cache = ExecutionCache()
+    assert cache.make_key("print(1)  \r\n\n") == cache.make_key("print(1)")
+    assert cache.make_key("print(1)", "pool") != cache.make_key("print(1)", "subprocess")
+
+
+def test_only_successful_results_are_cached():
+    cache = ExecutionCache()
+    for returncode in (1, -9):
+        key = cache.make_key(f"exit({returncode})")
+        cache.put(key, _result(returncode))
+        assert cache.get(key) is None
+
+    key = cache.make_key("print('ok')")
+    cache.put(key, _result())
+    hit = cache.get(key)
+    assert hit.cached and hit.returncode == 0 and hit.stdout == "ok\n"
+
+
+def test_lru_and_size_eviction():
+    cache = ExecutionCache(max_entries=2, max_bytes=10)
+    keys = [cache.make_key(str(i)) for i in range(3)]
+    cache.put(keys[0], _result(stdout="a"))
+    cache.put(keys[1], _result(stdout="b"))
+    cache.get(keys[0])
+    cache.put(keys[2], _result(stdout="c"))
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+
+    cache.put(keys[1], _result(stdout="x" * 9))
+    assert cache.stats()["bytes"] <= 10
+    # 超过总大小上限的结果不缓存
+    big = cache.make_key("big")
+    cache.put(big, _result(stdout="x" * 11))
+    assert cache.get(big) is None
+
+
+def test_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(execution_cache.time, "time", lambda: now[0])
+    cache = ExecutionCache(ttl=10)
+    key = cache.make_key("print(1)")
+    cache.put(key, _result())
+    now[0] += 5
+    assert cache.get(key) is not None
+    now[0] += 6
+    assert cache.get(key) is None
+
+
+def test_cache_is_opt_in(monkeypatch):
+    monkeypatch.setattr(execution_cache, "_execution_cache", None)
+    monkeypatch.delenv("CODE_EXEC_CACHE", raising=False)
+    assert execution_cache.get_execution_cache() is None
+    monkeypatch.setenv("CODE_EXEC_CACHE", "true")
+    assert isinstance(execution_cache.get_execution_cache(), ExecutionCache)
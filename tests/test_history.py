@@ -0,0 +1,89 @@
+"""tutor 工具调用历史的去重与压缩"""
+
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("google.genai")
+
+from src.agent.history import ToolHistoryCompactor  # noqa: E402
+from src.agent.tools import format_hybrid_results, format_search_results  # noqa: E402
+
+
+def _call(name, **args):
+    return SimpleNamespace(name=name, args=args)
+
+
+def _response(name, result):
+    return {"name": name, "response": {"result": result}}
+
+
+def _add(compactor, name, result, **args):
+    response = _response(name, result)
+    compactor.add([_call(name, **args)], [response])
+    return response["response"]["result"]
+
+
+PREVIEW = "[1] Dantzig 1947 提出单纯形法\n[2, 3] 见第 9 页\n[[1, 0], [0, 1]]"
+
+
+def test_repeated_chunk_keeps_only_result_header():
+    compactor = ToolHistoryCompactor(token_budget=10_000)
+    results = format_search_results([{"page_num": 4, "preview": PREVIEW, "chunk_id": 7}])
+
+    assert _add(compactor, "keyword_search", results, query="单纯形") == results
+    deduped = _add(compactor, "keyword_search", results, query="simplex")
+
+    assert deduped.splitlines() == ["[结果 1] 第 4 页", "(chunk_7 已在之前的结果中出现，内容省略)"]
+    assert compactor.entries[-1].pages == [4]
+
+
+def test_material_lines_starting_with_bracket_are_not_headers():
+    compactor = ToolHistoryCompactor(token_budget=10_000)
+    groups = [{"page_num": 2, "chunks": [
+        {"preview": PREVIEW, "chunk_id": 1, "sources": ["keyword"]},
+        {"preview": "[注] 对偶问题", "chunk_id": 2, "sources": ["semantic"]},
+    ]}]
+    results = format_hybrid_results(groups)
+    _add(compactor, "hybrid_search", results, query="对偶")
+
+    # 新出现的块 3 不受影响，正文中 "[...]" 开头的行不会被当作标题保留
+    groups[0]["chunks"].append({"preview": "[1] 新内容", "chunk_id": 3, "sources": ["keyword"]})
+    deduped = _add(compactor, "hybrid_search", format_hybrid_results(groups), query="dual")
+
+    assert "Dantzig" not in deduped and "[1] Dantzig" not in deduped and "[注]" not in deduped
+    assert "[1] 新内容" in deduped
+    assert deduped.count("[第 2 页]") == 1
+    # 正文中的 "第 9 页" 不计入结果涉及的页码
+    assert compactor.entries[0].pages == [2]
+
+
+def test_full_chunk_and_page_dedup():
+    compactor = ToolHistoryCompactor(token_budget=10_000)
+    chunk = "第 3 页的内容：\n约束条件 ... 第 8 页"
+    _add(compactor, "get_chunk_by_id", chunk, chunk_id=5)
+
+    assert _add(compactor, "get_chunk_by_id", chunk, chunk_id=5).startswith("第 3 页的 chunk_5")
+    assert compactor.entries[0].pages == [3]
+    assert _add(compactor, "get_chunk_by_id", "未找到指定的文本块", chunk_id=99) == "未找到指定的文本块"
+
+    _add(compactor, "get_page_content", "页面正文", page_num=6)
+    assert "已在之前的结果中给出" in _add(compactor, "get_page_content", "页面正文", page_num=6)
+
+
+def test_compact_summarizes_oldest_results_over_budget():
+    compactor = ToolHistoryCompactor(token_budget=50, keep_recent_turns=1)
+    long_preview = "线性规划" * 100
+    first = format_search_results([{"page_num": 1, "preview": long_preview, "chunk_id": 1}])
+    second = format_search_results([{"page_num": 2, "preview": long_preview, "chunk_id": 2}])
+    first_response = _response("keyword_search", first)
+    compactor.add([_call("keyword_search", query="a")], [first_response])
+    _add(compactor, "keyword_search", second, query="b")
+
+    assert compactor.compact() > 0
+    summary = first_response["response"]["result"]
+    assert summary.startswith("[已压缩的早期结果] keyword_search(query='a')")
+    assert "第 1 页" in summary and "chunk_1" in summary
+    # 最近一轮保留原文；压缩后的块再次出现时返回原文
+    assert compactor.entries[1].response["response"]["result"] == second
+    assert _add(compactor, "keyword_search", first, query="c") == first
@@ -0,0 +1,68 @@
+"""BM25 关键词索引"""
+
+from src.utils.keyword_index import KeywordIndex
+from src.utils.pdf_processor import TextChunk
+from src.utils.tokenizer import CJKTokenizer, WordTokenizer
+
+
+def _chunks(texts):
+    return [TextChunk(content=text, page_num=i + 1, chunk_id=i) for i, text in enumerate(texts)]
+
+
+def _ids(results):
+    return [chunk.chunk_id for _, chunk in results]
+
+
+def test_bm25_prefers_rare_terms_and_short_documents():
+    index = KeywordIndex(tokenizer=WordTokenizer(), phrase_boost=0)
+    index.add(_chunks([
+        "the simplex method",
+        "the the the the method",
+        "duality relates a linear program and its dual with many more words",
+        "the dual",
+    ]))
+
+    # "simplex" 比高频的 "the" 罕见，只出现一次也排在前面
+    assert _ids(index.search("the simplex", top_k=2)) == [0, 1]
+    # 同样命中一次时较短的文档得分更高
+    assert _ids(index.search("dual")) == [3, 2]
+    assert index.search("interior point") == []
+
+
+def test_phrase_boost_promotes_exact_phrase():
+    chunks = _chunks([
+        "program program linear linear",
+        "a linear program",
+    ])
+    plain = KeywordIndex(tokenizer=WordTokenizer(), phrase_boost=0)
+    plain.add(chunks)
+    boosted = KeywordIndex(tokenizer=WordTokenizer(), phrase_boost=2.0)
+    boosted.add(chunks)
+
+    assert _ids(plain.search("linear program"))[0] == 0
+    assert _ids(boosted.search("Linear Program"))[0] == 1
+
+
+def test_incremental_add_updates_statistics():
+    index = KeywordIndex(tokenizer=WordTokenizer(), phrase_boost=0)
+    index.add(_chunks(["alpha beta"]))
+    assert _ids(index.search("beta")) == [0]
+
+    index.add([TextChunk(content="beta beta gamma", page_num=2, chunk_id=1)])
+    assert len(index) == 2
+    assert _ids(index.search("beta")) == [1, 0]
+    assert _ids(index.search("gamma")) == [1]
+
+
+def test_cjk_search():
+    index = KeywordIndex(tokenizer=CJKTokenizer())
+    index.add(_chunks([
+        "线性规划的标准形式",
+        "对偶问题与对偶定理：每个线性规划都有对应的对偶问题",
+        "单纯形法的迭代步骤",
+    ]))
+
+    assert _ids(index.search("对偶问题"))[0] == 1
+    assert _ids(index.search("单纯形")) == [2]
+    assert set(_ids(index.search("线性规划"))) == {0, 1}
+    assert index.search("整数") == []
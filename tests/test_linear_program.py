@@ -0,0 +1,131 @@
+"""线性规划文本解析、问题描述校验与求解"""
+
+import pytest
+
+from src.utils.linear_program import (
+    LinearProgram,
+    LinearProgramError,
+    parse_linear_program,
+    solve_linear_program,
+)
+
+
+def _solve(spec):
+    return solve_linear_program(LinearProgram.from_spec(spec))
+
+
+def test_parse_textbook_model():
+    spec = parse_linear_program(
+        "某工厂生产两种产品。\n"
+        "最大化 z = 3x + 2y\n"
+        "约束条件：\n"
+        "1. x + y ≤ 4\n"
+        "2. x + 3y ≤ 6\n"
+        "x, y ≥ 0"
+    )
+
+    assert spec["sense"] == "maximize"
+    assert spec["objective"] == {"x": 3.0, "y": 2.0}
+    assert spec["constraints"] == [
+        {"coefficients": {"x": 1.0, "y": 1.0}, "sense": "<=", "rhs": 4.0},
+        {"coefficients": {"x": 1.0, "y": 3.0}, "sense": "<=", "rhs": 6.0},
+    ]
+    assert spec["variables"] == [
+        {"name": "x", "lower": 0.0, "upper": None, "integer": False},
+        {"name": "y", "lower": 0.0, "upper": None, "integer": False},
+    ]
+
+    solution = _solve(spec)
+    assert solution.optimal
+    assert solution.objective == pytest.approx(12.0)
+    assert solution.values == pytest.approx({"x": 4.0, "y": 0.0})
+
+
+def test_parse_min_chained_bounds_and_integers():
+    spec = parse_linear_program(
+        "min: 2a - b + 1\n"
+        "s.t. a + b >= 3; 2a - b = 1\n"
+        "0 <= a <= 8\n"
+        "-b >= -5\n"
+        "a, b 为整数"
+    )
+
+    assert spec["sense"] == "minimize"
+    assert spec["objective"] == {"a": 2.0, "b": -1.0}
+    assert spec["objective_constant"] == 1.0
+    assert spec["constraints"] == [
+        {"coefficients": {"a": 1.0, "b": 1.0}, "sense": ">=", "rhs": 3.0},
+        {"coefficients": {"a": 2.0, "b": -1.0}, "sense": "=", "rhs": 1.0},
+    ]
+    assert spec["variables"] == [
+        {"name": "a", "lower": 0.0, "upper": 8.0, "integer": True},
+        {"name": "b", "lower": None, "upper": 5.0, "integer": True},
+    ]
+
+    solution = _solve(spec)
+    assert solution.optimal
+    assert solution.values == pytest.approx({"a": 2.0, "b": 3.0})
+    assert solution.objective == pytest.approx(2.0)
+
+
+@pytest.mark.parametrize("text", [
+    # 没有目标函数
+    "x + y <= 4\nx, y >= 0",
+    # 非线性项
+    "max z = x*y\nx + y <= 4",
+    # 幂次
+    "min z = x^2 + y\nx + y >= 1",
+    # 无法识别但提到变量的条件
+    "max z = 3x + 2y\nx + y <= 4\ny 不超过 x 的两倍",
+    # 无法识别但含数字的条件
+    "max z = 3x + 2y\nx + y <= 4\n总工时不超过 40 小时",
+    # 常数之间的比较
+    "max z = x\n1 <= 2",
+])
+def test_parse_rejects_incomplete_models(text):
+    assert parse_linear_program(text) is None
+
+
+def test_parse_ignores_prose_without_numbers_or_variables():
+    spec = parse_linear_program("请求解下面的问题。\nmax z = x\nx <= 3\n谢谢！")
+    assert spec is not None
+    assert spec["variables"] == [{"name": "x", "lower": None, "upper": 3.0, "integer": False}]
+
+
+@pytest.mark.parametrize("spec, message", [
+    ([], "must be an object"),
+    ({"sense": "maximum", "variables": ["x"], "objective": {"x": 1}}, "Unknown objective sense"),
+    ({"variables": [], "objective": {"x": 1}}, "no variables"),
+    ({"variables": ["x", "x"], "objective": {"x": 1}}, "duplicate variable"),
+    ({"variables": ["x"], "objective": {"y": 1}}, "Undeclared variable"),
+    ({"variables": ["x"], "objective": {"x": "a lot"}}, "Invalid number"),
+    ({"variables": [{"name": "x", "integer": "false"}], "objective": {"x": 1}}, "Invalid boolean"),
+    ({"variables": [{"name": "x", "lower": True}], "objective": {"x": 1}}, "Invalid number"),
+    ({"variables": [{"name": "x", "lower": 2, "upper": 1}], "objective": {"x": 1}}, "lower bound above"),
+    ({"variables": ["x"], "objective": {"x": 1},
+      "constraints": [{"coefficients": {"x": 1}, "sense": "!=", "rhs": 1}]}, "unknown sense"),
+])
+def test_from_spec_rejects_invalid_specs(spec, message):
+    with pytest.raises(LinearProgramError, match=message):
+        LinearProgram.from_spec(spec)
+
+
+def test_solve_infeasible_and_unbounded():
+    infeasible = _solve({
+        "sense": "maximize",
+        "objective": {"x": 1},
+        "variables": [{"name": "x", "lower": 0}],
+        "constraints": [{"coefficients": {"x": 1}, "sense": ">=", "rhs": 5},
+                        {"coefficients": {"x": 1}, "sense": "<=", "rhs": 3}],
+    })
+    assert infeasible.status == "infeasible"
+    assert infeasible.objective is None and infeasible.values == {}
+
+    unbounded = _solve({
+        "sense": "maximize",
+        "objective": {"x": 1, "y": 1},
+        "variables": [{"name": "x", "lower": 0}, {"name": "y", "lower": 0}],
+        "constraints": [{"coefficients": {"x": 1, "y": -1}, "sense": "<=", "rhs": 1}],
+    })
+    assert unbounded.status == "unbounded"
+    assert not unbounded.optimal
@@ -0,0 +1,128 @@
+"""材料持久化存储的往返与失效"""
+
+import os
+
+import numpy as np
+import pytest
+
+from src.utils.embedding_cache import QueryEmbeddingCache
+from src.utils.material_store import MaterialStore
+from src.utils.pdf_processor import PDFProcessor
+from src.utils.tokenizer import WordTokenizer
+from src.utils.vector_index import ExactIndex
+from src.utils.vector_store import VectorStore
+
+PAGES = [
+    (1, "Linear programming maximizes a linear objective."),
+    (2, "The dual problem gives an upper bound on the primal."),
+]
+
+
+class FakeVectorStore(VectorStore):
+    """用文本哈希生成确定性 embedding，不访问 API"""
+
+    def __init__(self):
+        super().__init__(
+            batch_size=8,
+            max_concurrency=1,
+            max_retries=0,
+            cache=None,
+            index=ExactIndex(),
+            query_cache=QueryEmbeddingCache(),
+        )
+
+    def _embed_batch(self, texts):
+        return [np.random.default_rng(abs(hash(text)) % 2**32).normal(size=8).astype(np.float32) for text in texts]
+
+
+@pytest.fixture(autouse=True)
+def no_embedding_cache(monkeypatch):
+    monkeypatch.setenv("EMBEDDING_CACHE", "0")
+
+
+def _processor(chunk_size=1000):
+    return PDFProcessor(chunk_size=chunk_size, chunk_overlap=100, tokenizer=WordTokenizer())
+
+
+def _build(pages=PAGES):
+    processor = _processor()
+    processor.chunks = processor._create_chunks(pages)
+    vector_store = FakeVectorStore()
+    assert vector_store.add_chunks(processor.chunks).ok
+    return processor, vector_store
+
+
+def _material(tmp_path, content=b"version 1"):
+    path = tmp_path / "material.pdf"
+    path.write_bytes(content)
+    return path
+
+
+def test_round_trip(tmp_path):
+    material = _material(tmp_path)
+    processor, vector_store = _build()
+    MaterialStore(tmp_path / "store").save(material, processor, vector_store)
+
+    # 新实例从磁盘读取清单，相当于进程重启
+    stored = MaterialStore(tmp_path / "store").load(material, _processor(), FakeVectorStore())
+    assert stored is not None
+    loaded_processor, loaded_store = stored
+
+    assert [c.content for c in loaded_processor.chunks] == [c.content for c in processor.chunks]
+    assert loaded_processor.get_page_content(2) == processor.get_page_content(2)
+    assert [c.chunk_id for c in loaded_processor.keyword_search("dual")] == [c.chunk_id for c in processor.keyword_search("dual")]
+
+    assert len(loaded_store.index) == len(vector_store.index)
+    for loaded, original in zip(loaded_store.vector_chunks, vector_store.vector_chunks):
+        assert loaded.chunk is loaded_processor.get_chunk_by_id(original.chunk.chunk_id)
+        np.testing.assert_allclose(loaded.embedding * np.linalg.norm(original.embedding), original.embedding, rtol=1e-5)
+
+
+def test_missing_material_is_a_miss(tmp_path):
+    store = MaterialStore(tmp_path / "store")
+    assert store.load(_material(tmp_path), _processor(), FakeVectorStore()) is None
+
+
+def test_content_change_invalidates_and_removes_old_version(tmp_path):
+    material = _material(tmp_path)
+    store = MaterialStore(tmp_path / "store")
+    store.save(material, *_build())
+    old_sha = store.fingerprint(material)
+
+    material.write_bytes(b"version 2, longer")
+    assert store.load(material, _processor(), FakeVectorStore()) is None
+
+    store.save(material, *_build(PAGES[:1]))
+    stored = store.load(material, _processor(), FakeVectorStore())
+    assert stored is not None and len(stored[0].chunks) == 1
+    assert not (tmp_path / "store" / old_sha).exists()
+
+
+def test_touch_without_content_change_still_hits(tmp_path):
+    material = _material(tmp_path)
+    store = MaterialStore(tmp_path / "store")
+    store.save(material, *_build())
+
+    stat = material.stat()
+    os.utime(material, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert store.load(material, _processor(), FakeVectorStore()) is not None
+
+
+def test_config_change_is_a_miss(tmp_path):
+    material = _material(tmp_path)
+    store = MaterialStore(tmp_path / "store")
+    store.save(material, *_build())
+
+    assert store.load(material, _processor(chunk_size=500), FakeVectorStore()) is None
+
+
+def test_corrupt_entry_is_rebuilt(tmp_path):
+    material = _material(tmp_path)
+    store = MaterialStore(tmp_path / "store")
+    store.save(material, *_build())
+
+    (tmp_path / "store" / store.fingerprint(material) / "processor.pkl").write_bytes(b"not a pickle")
+    assert store.load(material, _processor(), FakeVectorStore()) is None
+
+    store.save(material, *_build())
+    assert store.load(material, _processor(), FakeVectorStore()) is not None
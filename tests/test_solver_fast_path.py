@@ -0,0 +1,85 @@
+"""solver_node 中快速路径与代码生成的并发"""
+
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip("langgraph")
+pytest.importorskip("google.genai")
+
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from src.agent import graph  # noqa: E402
+
+QUESTION = "A factory makes two products with a nonlinear profit function ..."
+
+
+def _run(monkeypatch, fast_path, code_delay=0.05):
+    cancelled = []
+
+    async def code_solver_node(state, writer, prompt):
+        try:
+            writer({"type": "token", "node": "solver", "text": "import pulp"})
+            await asyncio.sleep(code_delay)
+            state["messages"].append({"role": "assistant", "content": "code"})
+            state["result"] = "code result"
+            return state
+        except asyncio.CancelledError:
+            cancelled.append("code")
+            raise
+
+    monkeypatch.setattr(graph, "SOLVER_FAST_PATH", True)
+    monkeypatch.setattr(graph, "parse_linear_program", lambda question: None)
+    monkeypatch.setattr(graph, "model_fast_path", fast_path)
+    monkeypatch.setattr(graph, "code_solver_node", code_solver_node)
+
+    events = []
+    state = {"question": QUESTION, "messages": []}
+    state = asyncio.run(graph.solver_node(state, events.append))
+    return state, events, cancelled
+
+
+def test_fast_path_win_discards_code_generation_output(monkeypatch):
+    async def fast_path(question, writer):
+        await asyncio.sleep(0.01)
+        return "fast report"
+
+    state, events, cancelled = _run(monkeypatch, fast_path, code_delay=1.0)
+
+    assert state["result"] == "fast report"
+    assert [message["content"] for message in state["messages"]] == ["fast report"]
+    assert not [event for event in events if event["type"] == "token"]
+    assert cancelled == ["code"]
+
+
+def test_fast_path_miss_uses_code_generation(monkeypatch):
+    async def fast_path(question, writer):
+        return None
+
+    state, events, cancelled = _run(monkeypatch, fast_path)
+
+    assert state["result"] == "code result"
+    assert [event["text"] for event in events if event["type"] == "token"] == ["import pulp"]
+    assert not cancelled
+
+
+def test_fast_path_exception_is_treated_as_miss(monkeypatch):
+    async def fast_path(question, writer):
+        raise RuntimeError("unexpected response")
+
+    state, events, _ = _run(monkeypatch, fast_path)
+
+    assert state["result"] == "code result"
+    assert [event["text"] for event in events if event["type"] == "token"] == ["import pulp"]
+
+
+def test_code_generation_finishing_first_wins(monkeypatch):
+    async def fast_path(question, writer):
+        await asyncio.sleep(1.0)
+        return "fast report"
+
+    state, events, _ = _run(monkeypatch, fast_path, code_delay=0.01)
+
+    assert state["result"] == "code result"
+    assert [event["text"] for event in events if event["type"] == "token"] == ["import pulp"]
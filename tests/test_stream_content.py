@@ -0,0 +1,87 @@
+"""stream_content 在服务端缓存失效时的回退"""
+
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("langgraph")
+genai_errors = pytest.importorskip("google.genai.errors")
+
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from src.agent import graph  # noqa: E402
+from src.utils.context_cache import ContextCache  # noqa: E402
+
+STALE = "cachedContents/stale"
+
+
+class FakeModels:
+    """generate_content_stream 与 google-genai 一致：返回的异步生成器在第一次迭代时才发出请求"""
+
+    def __init__(self, status: int):
+        self.status = status
+        self.requests = []
+
+    async def generate_content_stream(self, model, contents, config):
+        cached = config.cached_content
+
+        async def stream():
+            self.requests.append(cached)
+            if cached:
+                raise genai_errors.ClientError(self.status, {"error": {"code": self.status, "message": "stale"}})
+            for text in ("a", "b", "c"):
+                yield text
+
+        return stream()
+
+
+def _patch(monkeypatch, status):
+    models = FakeModels(status)
+    fake_client = SimpleNamespace(aio=SimpleNamespace(models=models))
+    context_cache = ContextCache(fake_client)
+    context_cache._entries["key"] = (STALE, float("inf"))
+    monkeypatch.setattr(graph, "client", fake_client)
+    monkeypatch.setattr(graph, "get_context_cache", lambda client: context_cache)
+    return models, context_cache
+
+
+async def _collect(**kwargs):
+    model_config = SimpleNamespace(model="gemini-test", temperature=0.0)
+    return [chunk async for chunk in graph.stream_content(model_config, [], **kwargs)]
+
+
+@pytest.mark.parametrize("status", [400, 404])
+def test_stale_cached_content_falls_back_to_full_prompt(monkeypatch, status):
+    models, context_cache = _patch(monkeypatch, status)
+
+    chunks = asyncio.run(_collect(system_instruction="sys", cached_content=STALE))
+
+    assert chunks == ["a", "b", "c"]
+    assert models.requests == [STALE, None]
+    # 失效的缓存名被移除，下一轮会重新创建
+    assert context_cache.stats()["entries"] == 0
+
+
+def test_client_error_without_cached_content_is_raised(monkeypatch):
+    models, _ = _patch(monkeypatch, 400)
+
+    async def failing(model, contents, config):
+        async def stream():
+            raise genai_errors.ClientError(400, {"error": {"code": 400, "message": "bad request"}})
+            yield
+
+        return stream()
+
+    monkeypatch.setattr(models, "generate_content_stream", failing)
+    with pytest.raises(genai_errors.ClientError):
+        asyncio.run(_collect())
+
+
+def test_stream_without_cache(monkeypatch):
+    models, context_cache = _patch(monkeypatch, 404)
+
+    assert asyncio.run(_collect()) == ["a", "b", "c"]
+    assert models.requests == [None]
+    assert context_cache.stats()["entries"] == 1
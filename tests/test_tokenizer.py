@@ -0,0 +1,33 @@
+"""关键词索引分词器"""
+
+import pytest
+
+from src.utils.tokenizer import CJKTokenizer, WordTokenizer, get_tokenizer
+
+
+def test_word_tokenizer():
+    assert WordTokenizer()("Linear-Programming, LP 2x") == ["linear", "programming", "lp", "2x"]
+
+
+def test_cjk_document_tokens_include_unigrams_and_bigrams():
+    assert CJKTokenizer()("对偶问题") == ["对", "偶", "问", "题", "对偶", "偶问", "问题"]
+
+
+def test_cjk_query_terms_use_bigrams_only():
+    tokenizer = CJKTokenizer()
+    assert tokenizer.query_terms("对偶问题") == ["对偶", "偶问", "问题"]
+    # 单字查询保留单字
+    assert tokenizer.query_terms("解") == ["解"]
+
+
+def test_cjk_mixed_text_and_normalization():
+    tokens = CJKTokenizer()("ＬＰ的对偶 Simplex法")
+    assert tokens == ["lp", "的", "对", "偶", "的对", "对偶", "simplex", "法"]
+
+
+def test_get_tokenizer(monkeypatch):
+    monkeypatch.delenv("KEYWORD_TOKENIZER", raising=False)
+    assert isinstance(get_tokenizer(), CJKTokenizer)
+    assert isinstance(get_tokenizer("word"), WordTokenizer)
+    with pytest.raises(ValueError):
+        get_tokenizer("jieba")
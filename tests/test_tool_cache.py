@@ -0,0 +1,68 @@
+"""execute_tool_call 的工具结果缓存"""
+
+import uuid
+
+import pytest
+
+pytest.importorskip("google.genai")
+
+from src.agent import tools  # noqa: E402
+from src.agent.tools import ToolResultCache, execute_tool_call  # noqa: E402
+from src.utils.conversation_logger import ConversationLogger  # noqa: E402
+
+
+class FakeManager:
+    def __init__(self, text="result"):
+        self.instance_id = uuid.uuid4().hex
+        self.version = 1
+        self.current_material = "notes"
+        self.text = text
+        self.queries = []
+
+    def keyword_search(self, query, top_k):
+        self.queries.append(query)
+        return [{"page_num": 1, "preview": f"{self.text}: {query}", "chunk_id": 0}]
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(tools, "_tool_result_cache", ToolResultCache(max_entries=16))
+
+
+def test_tool_receives_original_args_and_cache_key_is_normalized():
+    manager = FakeManager()
+
+    first = execute_tool_call("keyword_search", {"query": "Simplex  Method"}, manager)
+    second = execute_tool_call("keyword_search", {"query": "simplex method", "top_k": 3.0}, manager)
+
+    assert manager.queries == ["Simplex  Method"]
+    assert first == second
+
+
+def test_results_are_scoped_to_the_material_manager():
+    first, second = FakeManager("first"), FakeManager("second")
+
+    assert "first" in execute_tool_call("keyword_search", {"query": "dual"}, first)
+    assert "second" in execute_tool_call("keyword_search", {"query": "dual"}, second)
+
+
+def test_material_version_change_invalidates_results():
+    manager = FakeManager()
+    execute_tool_call("keyword_search", {"query": "dual"}, manager)
+    manager.version += 1
+    execute_tool_call("keyword_search", {"query": "dual"}, manager)
+
+    assert manager.queries == ["dual", "dual"]
+
+
+def test_logger_counts_only_cacheable_calls(tmp_path, monkeypatch):
+    logger = ConversationLogger(session_id="test", output_dir=str(tmp_path))
+    manager = FakeManager()
+    monkeypatch.setattr(tools, "_run_tool", lambda *args: "ok")
+
+    execute_tool_call("keyword_search", {"query": "dual"}, manager, logger)
+    execute_tool_call("keyword_search", {"query": "dual"}, manager, logger)
+    execute_tool_call("generate_diagram", {"description": "graph"}, manager, logger)
+
+    summary = logger.get_session_summary()
+    assert (summary["tool_calls"], summary["tool_cache_hits"], summary["tool_cache_misses"]) == (3, 1, 1)
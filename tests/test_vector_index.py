@@ -0,0 +1,92 @@
+"""向量索引：精确检索与 IVF 近似检索"""
+
+import numpy as np
+import pytest
+
+from src.utils.vector_index import ExactIndex, IVFIndex, create_index, load_index
+
+
+def _clustered(n, dim=32, clusters=40, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(clusters, size=n)
+    return (centers[labels] + 0.3 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+@pytest.fixture(scope="module")
+def data():
+    vectors = _clustered(5000)
+    queries = _clustered(100, seed=1)
+    exact = ExactIndex()
+    exact.add(vectors)
+    return vectors, queries, exact
+
+
+def _recall(index, exact, queries, k=10):
+    found = 0
+    for query in queries:
+        expected = set(exact.search(query, k)[0].tolist())
+        found += len(expected & set(index.search(query, k)[0].tolist()))
+    return found / (k * len(queries))
+
+
+def test_exact_index_matches_brute_force(data):
+    vectors, queries, exact = data
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    for query in queries[:10]:
+        scores = normalized @ (query / np.linalg.norm(query))
+        ids, found_scores = exact.search(query, 5)
+        assert ids.tolist() == np.argsort(-scores)[:5].tolist()
+        np.testing.assert_allclose(found_scores, scores[ids], rtol=1e-5)
+
+
+def test_ivf_recall_against_exact(data):
+    vectors, queries, exact = data
+    index = IVFIndex(nlist=64, nprobe=8, train_threshold=1000)
+    index.add(vectors)
+
+    assert index.is_trained and len(index) == len(vectors)
+    assert _recall(index, exact, queries) >= 0.9
+
+
+def test_ivf_probing_every_list_is_exact(data):
+    vectors, queries, exact = data
+    index = IVFIndex(nlist=16, nprobe=16, train_threshold=1000)
+    index.add(vectors)
+
+    assert _recall(index, exact, queries) == 1.0
+
+
+def test_ivf_before_training_is_exact(data):
+    vectors, queries, exact = data
+    index = IVFIndex(train_threshold=len(vectors) + 1)
+    index.add(vectors)
+
+    assert not index.is_trained
+    assert _recall(index, exact, queries) == 1.0
+
+
+def test_ivf_ids_stay_stable_across_adds_and_save(tmp_path, data):
+    vectors, queries, _ = data
+    index = IVFIndex(nlist=32, nprobe=32, train_threshold=2000)
+    for start in range(0, len(vectors), 700):
+        index.add(vectors[start:start + 700])
+
+    # 每个向量都能以自己的 id 检索到
+    for i in (0, 1999, 2000, 4999):
+        assert index.search(vectors[i], 1)[0][0] == i
+
+    path = tmp_path / "index.npz"
+    index.save(path)
+    loaded = load_index(path)
+    assert isinstance(loaded, IVFIndex) and len(loaded) == len(index)
+    for query in queries[:10]:
+        assert loaded.search(query, 10)[0].tolist() == index.search(query, 10)[0].tolist()
+
+
+def test_create_index_backend(monkeypatch):
+    monkeypatch.setenv("VECTOR_INDEX_BACKEND", "ivf")
+    assert isinstance(create_index(), IVFIndex)
+    assert isinstance(create_index("exact"), ExactIndex)
+    with pytest.raises(ValueError):
+        create_index("hnsw")